@@ -1,7 +1,10 @@
 import os
+import time
+from contextlib import contextmanager
 
 from envgenehelper import logger
 from envgenehelper.git_helper import GitRepoManager
+from envgenehelper.repo_paths import clear_written_paths, is_git_commit_fast_mode, read_written_paths
 
 from minimize_cred_diffs import minimize_cred_diffs
 
@@ -26,18 +29,65 @@ def build_commit_message() -> str:
     return message
 
 
+@contextmanager
+def timed_phase(timings: dict, phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = time.perf_counter() - start
+
+
+def log_timings(timings: dict) -> None:
+    logger.info(f"git_commit timings: {', '.join(f'{phase} {elapsed:.2f}s' for phase, elapsed in timings.items())}")
+
+
+def get_written_paths(repo_manager: GitRepoManager) -> list[str] | None:
+    if not is_git_commit_fast_mode():
+        return None
+    written_paths = read_written_paths(repo_manager.repo.working_tree_dir)
+    if written_paths is None:
+        logger.warning("GIT_COMMIT_FAST_MODE is set, but build steps recorded no written paths, "
+                       "staging all sparse checkout paths")
+        return None
+    # steps that do not record their paths must not lose changes, such changes disable fast mode
+    unrecorded_changes = repo_manager.get_unrecorded_changes(written_paths)
+    if unrecorded_changes:
+        logger.warning(f"GIT_COMMIT_FAST_MODE is set, but {len(unrecorded_changes)} changed files are not under "
+                       f"recorded written paths, staging all sparse checkout paths: "
+                       f"{', '.join(unrecorded_changes[:10])}")
+        clear_written_paths(repo_manager.repo.working_tree_dir)
+        return None
+    return written_paths
+
+
 def git_commit() -> None:
     repo_manager = GitRepoManager()
     repo_manager.configure()
+    written_paths = get_written_paths(repo_manager)
+    timings = {}
 
-    logger.info("Minimizing credential file diffs...")
-    minimize_cred_diffs()
-    if not repo_manager.stage_changes():
-        logger.info("No changes. Skip.")
-        return
-    message = build_commit_message()
-    sha = repo_manager.create_detached_commit(message)
-    repo_manager.retry_cherry_pick_and_push(sha)
+    try:
+        logger.info("Minimizing credential file diffs...")
+        with timed_phase(timings, "minimize_cred_diffs"):
+            minimize_cred_diffs(written_paths)
+        with timed_phase(timings, "stage"):
+            if written_paths is None:
+                has_changes = repo_manager.stage_changes()
+            else:
+                has_changes = repo_manager.stage_written_paths(written_paths)
+        if has_changes:
+            message = build_commit_message()
+            with timed_phase(timings, "commit"):
+                sha = repo_manager.create_detached_commit(message)
+            with timed_phase(timings, "cherry_pick_and_push"):
+                repo_manager.retry_cherry_pick_and_push(sha)
+        else:
+            logger.info("No changes. Skip.")
+    finally:
+        log_timings(timings)
+    if written_paths is not None:
+        clear_written_paths(repo_manager.repo.working_tree_dir)
 
 
 if __name__ == '__main__':
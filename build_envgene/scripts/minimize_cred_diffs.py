@@ -1,7 +1,11 @@
 import hashlib
 import os
 import shutil
+import subprocess
 import tempfile
+import time
+from dataclasses import dataclass
+from functools import partial
 from os import getenv
 from pathlib import Path
 
@@ -10,56 +14,124 @@
 from envgenehelper import decrypt_file, encrypt_file
 from envgenehelper.crypt import get_crypt, is_cred_file
 from envgenehelper.logger import logger
+from envgenehelper.parallel_helper import run_in_parallel
 
+MINIMIZE_PARALLEL_THRESHOLD = 4
 
-def _minimize_single_cred_file(
-    repo: Repo,
-    base_dir: Path,
-    rel_path: str,
-    cache_dir: Path,
-) -> None:
-    full_path = base_dir / rel_path
-    try:
-        head_blob = repo.head.commit.tree[rel_path]
-        head_blob_sha = head_blob.hexsha
-        head_content = head_blob.data_stream.read()
-    except KeyError:
-        logger.debug(f'Skipping minimize for new cred file: {rel_path}')
-        return
-    except (GitCommandError, OSError) as exc:
-        logger.warning(f'Cannot read credential file at HEAD, skipping minimize for {rel_path}: {exc}')
-        return
 
-    if not full_path.is_file():
-        logger.debug(f'Skipping minimize for missing working-tree cred file: {rel_path}')
-        return
+@dataclass
+class _ChangedCredFile:
+    rel_path: str
+    head_blob_sha: str
+    cached_path: Path
+    head_content: bytes | None = None
+
+
+def _read_blobs(repo: Repo, blob_shas: list[str]) -> dict[str, bytes]:
+    """Reads blobs with a single git cat-file --batch process, missing blobs are not returned"""
+    if not blob_shas:
+        return {}
+    result = subprocess.run(['git', 'cat-file', '--batch'], cwd=repo.working_tree_dir,
+                            input=''.join(f'{sha}\n' for sha in blob_shas).encode(), capture_output=True, check=True)
+    blobs = {}
+    output = result.stdout
+    pos = 0
+    while pos < len(output):
+        header_end = output.index(b'\n', pos)
+        header = output[pos:header_end].decode().split()
+        pos = header_end + 1
+        if len(header) != 3:
+            # "<sha> missing"
+            continue
+        size = int(header[2])
+        blobs[header[0]] = output[pos:pos + size]
+        pos += size + 1
+    return blobs
 
-    source_sha = hashlib.sha256(full_path.read_bytes()).hexdigest()
-    cred_path = Path(rel_path)
-    cached_path = cache_dir / cred_path.parent / f'{cred_path.name}.{head_blob_sha}.{source_sha}'
-    if cached_path.is_file():
-        shutil.copy2(cached_path, full_path)
-        logger.debug(f'Restored minimized cred from cache: {rel_path}')
-        return
 
+def _store_in_cache(full_path: Path, cached_path: Path) -> None:
+    # cache may be shared by concurrent jobs, entries appear atomically
+    cached_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cached_path.with_name(f'{cached_path.name}.{os.getpid()}.tmp')
+    shutil.copy2(full_path, tmp_path)
+    os.replace(tmp_path, cached_path)
+
+
+def _minimize_single_cred_file(base_dir: Path, cred_file: _ChangedCredFile) -> None:
+    full_path = base_dir / cred_file.rel_path
     old_tmp = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=cred_path.suffix) as old_tmp_obj:
-            old_tmp_obj.write(head_content)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(cred_file.rel_path).suffix) as old_tmp_obj:
+            old_tmp_obj.write(cred_file.head_content)
             old_tmp = Path(old_tmp_obj.name)
 
         decrypt_file(str(full_path), in_place=True)
         encrypt_file(str(full_path), in_place=True, minimize_diff=True, old_file_path=str(old_tmp))
-        logger.debug(f'Minimized cred diff vs HEAD: {rel_path}')
+        logger.debug(f'Minimized cred diff vs HEAD: {cred_file.rel_path}')
 
-        cached_path.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(full_path, cached_path)
+        _store_in_cache(full_path, cred_file.cached_path)
     finally:
         if old_tmp is not None:
             old_tmp.unlink(missing_ok=True)
 
 
-def minimize_cred_diffs() -> None:
+def _minimize_cred_files(base_dir: Path, cred_files: list[_ChangedCredFile]) -> None:
+    if len(cred_files) < MINIMIZE_PARALLEL_THRESHOLD:
+        for cred_file in cred_files:
+            _minimize_single_cred_file(base_dir, cred_file)
+        return
+
+    run_in_parallel(partial(_minimize_single_cred_file, base_dir), cred_files, "Credential diff minimization",
+                    describe=lambda cred_file: cred_file.rel_path)
+
+
+def _collect_cred_files_to_minimize(repo: Repo, base_dir: Path, changed_paths: list[str],
+                                    cache_dir: Path) -> list[_ChangedCredFile]:
+    """Restores cached results, returns changed cred files that have to be minimized"""
+    to_minimize = []
+    for rel_path in changed_paths:
+        full_path = base_dir / rel_path
+        try:
+            head_blob_sha = repo.head.commit.tree[rel_path].hexsha
+        except KeyError:
+            logger.debug(f'Skipping minimize for new cred file: {rel_path}')
+            continue
+        except (GitCommandError, OSError) as exc:
+            logger.warning(f'Cannot read credential file at HEAD, skipping minimize for {rel_path}: {exc}')
+            continue
+
+        if not full_path.is_file():
+            logger.debug(f'Skipping minimize for missing working-tree cred file: {rel_path}')
+            continue
+
+        source_sha = hashlib.sha256(full_path.read_bytes()).hexdigest()
+        cred_path = Path(rel_path)
+        cached_path = cache_dir / cred_path.parent / f'{cred_path.name}.{head_blob_sha}.{source_sha}'
+        if cached_path.is_file():
+            shutil.copy2(cached_path, full_path)
+            logger.debug(f'Restored minimized cred from cache: {rel_path}')
+            continue
+        to_minimize.append(_ChangedCredFile(rel_path, head_blob_sha, cached_path))
+
+    try:
+        blobs = _read_blobs(repo, sorted({cred_file.head_blob_sha for cred_file in to_minimize}))
+    except (subprocess.CalledProcessError, OSError) as exc:
+        logger.warning(f'Cannot read credential files at HEAD, skipping minimize: {exc}')
+        return []
+    for cred_file in to_minimize:
+        cred_file.head_content = blobs.get(cred_file.head_blob_sha)
+        if cred_file.head_content is None:
+            logger.warning(f'Cannot read credential file at HEAD, skipping minimize for {cred_file.rel_path}')
+    return [cred_file for cred_file in to_minimize if cred_file.head_content is not None]
+
+
+def _get_cache_dir(repo: Repo) -> Path:
+    # results depend only on content of the files, so the cache is kept in the repository between jobs
+    return Path(getenv('MINIMIZE_CRED_DIFF_CACHE_DIR') or Path(repo.git_dir) / 'envgene' / 'minimize_cred_diff_cache')
+
+
+def minimize_cred_diffs(paths: list[str] | None = None) -> None:
+    """Minimizes diffs of changed credential files, only under given repository paths if they are passed"""
     if not get_crypt():
         logger.info("'crypt' is disabled, skipping credential diff minimization")
         return
@@ -67,21 +139,20 @@ def minimize_cred_diffs() -> None:
     base_dir = Path(getenv('CI_PROJECT_DIR', os.getcwd()))
     repo = Repo(base_dir)
 
-    job_id = getenv('CI_JOB_ID') or getenv('GITHUB_RUN_ID') or str(os.getpid())
-    cache_dir = Path(getenv('MINIMIZE_CRED_DIFF_CACHE_DIR') or f"/tmp/minimize_cred_diff_cache_{job_id}")
+    cache_dir = _get_cache_dir(repo)
     cache_dir.mkdir(parents=True, exist_ok=True)
 
     try:
-        changed_paths = repo.git.diff('--name-only', 'HEAD').splitlines()
+        changed_paths = repo.git.diff('--name-only', 'HEAD', '--', *(paths or [])).splitlines()
     except GitCommandError as exc:
         message = f'git diff against HEAD failed in {base_dir}: {exc}'
         logger.error(message)
         raise RuntimeError(message) from exc
 
-    for rel_path in changed_paths:
-        rel_path = rel_path.strip()
-        if not rel_path:
-            continue
-        if not is_cred_file(str(base_dir / rel_path)):
-            continue
-        _minimize_single_cred_file(repo, base_dir, rel_path, cache_dir)
+    start = time.perf_counter()
+    changed_cred_paths = [rel_path.strip() for rel_path in changed_paths
+                          if rel_path.strip() and is_cred_file(str(base_dir / rel_path.strip()))]
+    cred_files = _collect_cred_files_to_minimize(repo, base_dir, changed_cred_paths, cache_dir)
+    _minimize_cred_files(base_dir, cred_files)
+    logger.info(f'Minimized diffs of {len(cred_files)} of {len(changed_cred_paths)} changed credential files '
+                f'in {time.perf_counter() - start:.2f}s')
@@ -1,3 +1,6 @@
+from unittest.mock import MagicMock, patch
+
+import git_commit
 from git_commit import build_commit_message
 
 
@@ -38,3 +41,55 @@ def test_empty_ticket_no_leading_space(self, monkeypatch):
 
         assert not msg.startswith(" ")
         assert msg == '[ci_skip] Update "c/e" environment'
+
+
+class TestGitCommit:
+    def _run(self, monkeypatch, tmp_path, has_changes=True, unrecorded_changes=()):
+        manager = MagicMock()
+        manager.repo.working_tree_dir = str(tmp_path)
+        manager.get_unrecorded_changes.return_value = list(unrecorded_changes)
+        manager.stage_changes.return_value = has_changes
+        manager.stage_written_paths.return_value = has_changes
+        manager.create_detached_commit.return_value = "deadbeef"
+        with patch.object(git_commit, "GitRepoManager", return_value=manager), \
+                patch.object(git_commit, "minimize_cred_diffs") as minimize:
+            git_commit.git_commit()
+        return manager, minimize
+
+    def test_fast_mode_stages_written_paths(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("GIT_COMMIT_FAST_MODE", "true")
+        written_paths_file = tmp_path / ".git" / "envgene" / "written_paths"
+        written_paths_file.parent.mkdir(parents=True)
+        written_paths_file.write_text("environments/cluster/env\n")
+
+        manager, minimize = self._run(monkeypatch, tmp_path)
+
+        minimize.assert_called_once_with(["environments/cluster/env"])
+        manager.stage_written_paths.assert_called_once_with(["environments/cluster/env"])
+        manager.stage_changes.assert_not_called()
+        manager.retry_cherry_pick_and_push.assert_called_once_with("deadbeef")
+        assert not written_paths_file.exists()
+
+    def test_fast_mode_with_unrecorded_changes_stages_sparse_paths(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("GIT_COMMIT_FAST_MODE", "true")
+        written_paths_file = tmp_path / ".git" / "envgene" / "written_paths"
+        written_paths_file.parent.mkdir(parents=True)
+        written_paths_file.write_text("environments/cluster/env\n")
+
+        manager, minimize = self._run(monkeypatch, tmp_path,
+                                      unrecorded_changes=["environments/cluster/credentials/credentials.yml"])
+
+        manager.get_unrecorded_changes.assert_called_once_with(["environments/cluster/env"])
+        minimize.assert_called_once_with(None)
+        manager.stage_changes.assert_called_once_with()
+        manager.stage_written_paths.assert_not_called()
+        assert not written_paths_file.exists()
+
+    def test_fast_mode_without_written_paths_stages_sparse_paths(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("GIT_COMMIT_FAST_MODE", "true")
+
+        manager, minimize = self._run(monkeypatch, tmp_path, has_changes=False)
+
+        minimize.assert_called_once_with(None)
+        manager.stage_changes.assert_called_once_with()
+        manager.create_detached_commit.assert_not_called()
@@ -222,3 +222,46 @@ def test_separate_cache_dirs_do_not_share_entries(self, cred_repo, tmp_path, mon
         assert cache_a_files
         assert _cache_files(cache_b)
         assert _cache_files(cache_b) != cache_a_files
+
+    @pytest.mark.unit
+    def test_many_cred_files_are_minimized_in_parallel(self, cred_repo):
+        repo, tmp_path, _ = cred_repo
+        cred_paths = [tmp_path / f'environments/cluster/env-{i}/Credentials/credentials.yml'
+                      for i in range(mcd.MINIMIZE_PARALLEL_THRESHOLD + 1)]
+        for cred_path in cred_paths:
+            cred_path.parent.mkdir(parents=True)
+            writeToFile(cred_path, CRED_CONTENT)
+            _encrypt_cred(cred_path)
+        repo.git.add('-A')
+        repo.index.commit('add more encrypted creds')
+        heads_encrypted = [openYaml(str(cred_path)) for cred_path in cred_paths]
+        for cred_path in cred_paths:
+            _simulate_pipeline_cred_update(cred_path, 'updated-secret')
+        pre_minimised_inputs = [cred_path.read_bytes() for cred_path in cred_paths]
+
+        with patch.object(mcd, '_read_blobs', wraps=mcd._read_blobs) as read_blobs:
+            mcd.minimize_cred_diffs()
+
+        assert read_blobs.call_count == 1
+        for head_encrypted, cred_path in zip(heads_encrypted, cred_paths):
+            _assert_only_first_cred_secret_and_mac_differ_from_head(head_encrypted, cred_path)
+
+        first_pass = [cred_path.read_bytes() for cred_path in cred_paths]
+        for cred_path, pre_minimised_input in zip(cred_paths, pre_minimised_inputs):
+            cred_path.write_bytes(pre_minimised_input)
+        with patch.object(mcd, '_minimize_single_cred_file') as minimize_single:
+            mcd.minimize_cred_diffs()
+
+        minimize_single.assert_not_called()
+        assert [cred_path.read_bytes() for cred_path in cred_paths] == first_pass
+
+    @pytest.mark.unit
+    def test_cache_is_kept_in_git_dir_by_default(self, cred_repo, monkeypatch):
+        repo, _, cred_path = cred_repo
+        monkeypatch.delenv('MINIMIZE_CRED_DIFF_CACHE_DIR')
+        _simulate_pipeline_cred_update(cred_path, 'updated-secret')
+
+        mcd.minimize_cred_diffs()
+
+        assert _cache_files(Path(repo.git_dir) / 'envgene' / 'minimize_cred_diff_cache')
+        assert repo.git.status('--porcelain', '--untracked-files=all').splitlines() == [f' M {CRED_REL_PATH}']
@@ -1,6 +1,6 @@
 from typing import Optional, Dict, List, Any
 from models import PayloadEntry, RotationResult, ParameterReference, CredMap
-from utils.search_utils import get_ns_content, get_app_content, resolve_param, search_yaml_files
+from utils.search_utils import EntityIndex, resolve_param, search_yaml_files
 from utils.cred_utils import extract_credential
 from utils.error_constants import  *
 import envgenehelper.logger as logger
@@ -12,7 +12,7 @@ def process_entry_in_payload(
     cluster_name: str,
     shared_cred_content: Dict[str, Any],
     env_cred_content: Dict[str, Any],
-    entity_files_map: Dict[str, Dict[str, Any]],
+    entity_index: EntityIndex,
     processed_cred_and_files: Dict[str, List[CredMap]]
 ) -> Optional[RotationResult]:
 
@@ -23,9 +23,9 @@ def process_entry_in_payload(
     logger.info(f"Processing namespace={entry.namespace}, application={entry.application}, param_key={entry.parameter_key}, context={entry.context}")
     #Get target application or namespace file
     if entry.application:
-        target = get_app_content(entity_files_map, entry.namespace, entry.application, env)
+        target = entity_index.get_app_content(entry.namespace, entry.application, env)
     else:
-        target = get_ns_content(entity_files_map, entry.namespace, env)
+        target = entity_index.get_ns_content(entry.namespace, env)
 
     if not target:
         raise ReferenceError(ErrorMessages.ENTITY_FILE_NOT_FOUND.format(param_key=entry.parameter_key), error_code=ErrorCodes.FILE_NOT_FOUND_CODE)
@@ -63,7 +63,7 @@ def process_entry_in_payload(
     # Collect affected parameters
     affected = search_yaml_files(
         value_to_search,
-        entity_files_map,
+        entity_index,
         cred_id,
         cluster_name,
         shared_match_files,
@@ -9,15 +9,16 @@
 from envgenehelper.errors import RuntimeError, ValidationError, ValueError
 from models import PayloadEntry, RotationResult, EnvConfig
 from utils.cred_utils import (
+    RotationSession,
     collect_shared_credentials,
     decrypt_file,
-    read_env_cred_files,
-    read_shared_cred_files,
+    find_shared_cred_files,
     update_cred_content,
     write_updated_cred_into_file,
 )
 from utils.error_constants import *
 from utils.file_utils import scan_and_get_yaml_files, write_cred_file_path
+from utils.search_utils import EntityIndex
 from utils.yaml_utils import convert_json_to_yaml, write_yaml_to_file
 
 def validate_env_vars(is_encrypted: bool, encrypt_type: str):
@@ -46,13 +47,13 @@ def check_env(var_name):
                 ErrorMessages.INVALID_ENCRYPT_TYPE,
                 error_code=ErrorCodes.INVALID_CONFIG_CODE,
             )
-        elif encrypt_type == "SOPS":
+        elif encrypt_type in crypt.SOPS_BACKENDS:
             # Decrypt the Payload file if encrypted with SOPS
             convert_json_to_yaml(creds_path, cred_payload)
             payload_data = decrypt_file(
                 creds_path,
                 True,
-                "SOPS",
+                encrypt_type,
                 ErrorMessages.PAYLOAD_DECRYPT_ERROR,
                 ErrorCodes.INVALID_CONFIG_CODE,
             )
@@ -133,72 +134,78 @@ def cred_rotation():
     logger.info(f"base env path is {base_env_path}")
 
    
-    fileread = time.time()
-    # Scan and read all required files
-    entity_files_map, env_files_map, env_creds_files = scan_and_get_yaml_files(
-        cluster_path
-    )
-    shared_creds = collect_shared_credentials(env_files_map)
-    shared_content_map = read_shared_cred_files(
-        shared_creds, cluster_path, config.work_dir, is_encrypted
-    )
-    env_cred_map = read_env_cred_files(
-        env_creds_files, is_encrypted
-    )
-    logger.info(f"✅ Fileread Completed in {round(time.time() - fileread, 2)} seconds.")
-
-    payload_raw = config.payload_data.get("rotation_items", [])
-    payload_objects: List[PayloadEntry] = [
-        PayloadEntry.from_dict(entry) for entry in payload_raw
-    ]
-
-    final_result: List[RotationResult] = []
-    processed_cred_and_files = {}
-    # Collect affected parameters from ns and app files
-    for entry in payload_objects:
-        try:
-            result = process_entry_in_payload(
-                entry,
-                config.env_name,
-                config.cluster_name,
-                shared_content_map,
-                env_cred_map,
-                entity_files_map,
-                processed_cred_and_files,
+    with RotationSession(is_encrypted) as session:
+        fileread = time.time()
+        # Scan and read all required files
+        with session.phase("Entity files scan"):
+            entity_files_map, env_files_map, env_creds_files = scan_and_get_yaml_files(
+                cluster_path
+            )
+            entity_index = EntityIndex(entity_files_map)
+        with session.phase("Shared credentials read"):
+            shared_creds = collect_shared_credentials(env_files_map)
+            shared_content_map = session.read_cred_files(
+                find_shared_cred_files(shared_creds, cluster_path, config.work_dir)
+            )
+        with session.phase("Environment credentials read"):
+            env_cred_map = session.read_cred_files(env_creds_files)
+        logger.info(f"✅ Fileread Completed in {round(time.time() - fileread, 2)} seconds.")
+
+        payload_raw = config.payload_data.get("rotation_items", [])
+        payload_objects: List[PayloadEntry] = [
+            PayloadEntry.from_dict(entry) for entry in payload_raw
+        ]
+
+        final_result: List[RotationResult] = []
+        processed_cred_and_files = {}
+        # Collect affected parameters from ns and app files
+        with session.phase("Payload processing"):
+            for entry in payload_objects:
+                try:
+                    result = process_entry_in_payload(
+                        entry,
+                        config.env_name,
+                        config.cluster_name,
+                        shared_content_map,
+                        env_cred_map,
+                        entity_index,
+                        processed_cred_and_files,
+                    )
+                    if result:
+                        final_result.append(result)
+                except Exception as e:
+                    raise RuntimeError(f"Failed to process the payload {entry} due to {e}")
+        if final_result:
+            write_yaml_to_file(output_path, [r.to_dict() for r in final_result])
+        else:
+            raise ValidationError(
+                ErrorMessages.EMPTY_PARAM, error_code=ErrorCodes.INVALID_STATE_CODE
             )
-            if result:
-                final_result.append(result)
-        except Exception as e:
-            raise RuntimeError(f"Failed to process the payload {entry} due to {e}")
-    if final_result:
-        write_yaml_to_file(output_path, [r.to_dict() for r in final_result])
-    else:
-        raise ValidationError(
-            ErrorMessages.EMPTY_PARAM, error_code=ErrorCodes.INVALID_STATE_CODE
-        )
 
-    if not config.creds_rotation_enabled:
-        logger.info(
-            f"✅ Cred Rotation without file updation completed in {round(time.time() - start, 2)} seconds."
-        )
-        raise ValidationError(
-            ErrorMessages.CRED_UPDATION_FALSE.format(file=output_path),
-            error_code=ErrorCodes.INVALID_STATE_CODE,
-        )
-    if processed_cred_and_files:
-        updated_content, original_content = update_cred_content(
-            processed_cred_and_files
-        )
-        write_updated_cred_into_file(
-            updated_content, original_content, is_encrypted
-        )
-        write_cred_file_path(
-            list(processed_cred_and_files.keys()), f"{config.work_dir}/environments"
-        )
-    else:
-        logger.error(
-            "Credential IDs are not found in environment and shared credential files. Please check the files"
-        )
+        if not config.creds_rotation_enabled:
+            logger.info(
+                f"✅ Cred Rotation without file updation completed in {round(time.time() - start, 2)} seconds."
+            )
+            raise ValidationError(
+                ErrorMessages.CRED_UPDATION_FALSE.format(file=output_path),
+                error_code=ErrorCodes.INVALID_STATE_CODE,
+            )
+        if processed_cred_and_files:
+            with session.phase("Credential files update"):
+                updated_content, original_content = update_cred_content(
+                    processed_cred_and_files
+                )
+                write_updated_cred_into_file(
+                    updated_content, original_content, is_encrypted, session
+                )
+                write_cred_file_path(
+                    list(processed_cred_and_files.keys()), f"{config.work_dir}/environments"
+                )
+        else:
+            logger.error(
+                "Credential IDs are not found in environment and shared credential files. Please check the files"
+            )
+        logger.info(f"Rotation phase timings (seconds): {session.timings}")
 
     logger.info(
         f"✅ Cred Rotation completed in {round(time.time() - start, 2)} seconds."
@@ -0,0 +1,55 @@
+import os
+
+from envgenehelper import openYaml, writeYamlToFile
+from utils import cred_utils
+from utils.cred_utils import RotationSession
+
+
+def write_cred_files(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"creds-{i}.yml"
+        writeYamlToFile(path, {f"cred-{i}": {"type": "secret", "data": {"secret": f"value-{i}"}}})
+        paths.append(str(path))
+    return paths
+
+
+def test_each_file_is_decrypted_once(tmp_path, monkeypatch):
+    shared, env = write_cred_files(tmp_path, 2)
+    link = tmp_path / "link.yml"
+    os.symlink(shared, link)
+    decrypted = []
+    original = cred_utils.decrypt_and_get_content
+
+    def counting_decrypt(is_encrypted, filepath):
+        decrypted.append(filepath)
+        return original(is_encrypted, filepath)
+
+    monkeypatch.setattr(cred_utils, "decrypt_and_get_content", counting_decrypt)
+    with RotationSession(False) as session:
+        shared_map = session.read_cred_files([shared])
+        env_map = session.read_cred_files([str(link), env])
+
+    assert sorted(decrypted) == sorted([shared, env])
+    assert env_map[str(link)] is shared_map[shared]
+    assert env_map[env]["cred-1"]["data"]["secret"] == "value-1"
+    assert session._contents == {}
+
+
+def test_worker_pool_is_shared_by_read_and_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(cred_utils, "PARALLEL_THRESHOLD", 1)
+    paths = write_cred_files(tmp_path, 3)
+
+    with RotationSession(False, max_workers=2) as session:
+        with session.phase("read"):
+            contents = session.read_cred_files(paths)
+        executor = session._executor
+        assert executor is not None
+        updated = {p: {**c, "new-cred": {"type": "secret"}} for p, c in contents.items()}
+        with session.phase("write"):
+            session.write_cred_files(updated)
+        assert session._executor is executor
+
+    assert session._executor is None
+    assert set(session.timings) == {"read", "write"}
+    assert all("new-cred" in openYaml(p) for p in paths)
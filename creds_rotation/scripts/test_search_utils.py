@@ -0,0 +1,66 @@
+import pytest
+
+from envgenehelper.errors import ReferenceError
+from utils.search_utils import EntityIndex, search_yaml_files
+
+ENV_DIR = "/work/environments/cluster-01/env-01"
+PASSWORD_MACRO = '${creds.get("db-cred").password}'
+
+
+@pytest.fixture
+def entity_index():
+    entity_files_map = {
+        f"{ENV_DIR}/Namespaces/core/namespace.yml": {
+            "name": "env-01-core",
+            "deployParameters": {"DB_PASSWORD": PASSWORD_MACRO, "DB_USER": '${creds.get("db-cred").username}'},
+        },
+        f"{ENV_DIR}/Namespaces/core/Applications/app.yml": {
+            "name": "app",
+            "deployParameters": {"nested": {"urls": ["plain", f"jdbc:{PASSWORD_MACRO}"]}},
+            "technicalConfigurationParameters": {"DB_PASSWORD": PASSWORD_MACRO},
+        },
+        f"{ENV_DIR}/Namespaces/broken/Applications/orphan.yml": {"name": "orphan"},
+        "/work/environments/cluster-01/env-02/Namespaces/core/namespace.yml": {
+            "name": "env-02-core",
+            "e2eParameters": {"DB_PASSWORD": PASSWORD_MACRO},
+        },
+    }
+    return EntityIndex(entity_files_map)
+
+
+def test_entities_are_found_by_name(entity_index):
+    ns_file, ns_content = entity_index.get_ns_content("env-01-core", "env-01")
+    assert ns_file == f"{ENV_DIR}/Namespaces/core/namespace.yml"
+    assert ns_content["name"] == "env-01-core"
+    assert entity_index.get_app_content("env-01-core", "app", "env-01")[0] == f"{ENV_DIR}/Namespaces/core/Applications/app.yml"
+    assert entity_index.get_ns_content("env-02-core", "env-01") is None
+    assert entity_index.get_app_content("env-01-core", "missing", "env-01") is None
+    with pytest.raises(ReferenceError):
+        entity_index.get_app_content("env-01-core", "orphan", "env-01")
+
+
+def test_references_exclude_target_parameter(entity_index):
+    target_file = f"{ENV_DIR}/Namespaces/core/namespace.yml"
+    references = entity_index.find_references(PASSWORD_MACRO, target_file, "DB_PASSWORD", "deployParameters")
+
+    assert references == {
+        f"{ENV_DIR}/Namespaces/core/Applications/app.yml": {
+            "deployParameters": ["nested.urls[1]"],
+            "technicalConfigurationParameters": ["DB_PASSWORD"],
+        },
+        "/work/environments/cluster-01/env-02/Namespaces/core/namespace.yml": {"e2eParameters": ["DB_PASSWORD"]},
+    }
+
+
+def test_affected_parameters(entity_index):
+    target_file = f"{ENV_DIR}/Namespaces/core/namespace.yml"
+    affected = search_yaml_files(PASSWORD_MACRO, entity_index, "db-cred", "cluster-01", [],
+                                 [f"{ENV_DIR}/Credentials/credentials.yml"], "DB_PASSWORD", "deployParameters",
+                                 target_file)
+
+    assert [(a.environment, a.namespace, a.application, a.context, a.parameter_key) for a in affected] == [
+        ("env-01", "env-01-core", "app", "deployment", "nested.urls[1]"),
+        ("env-01", "env-01-core", "app", "runtime", "DB_PASSWORD"),
+        ("env-02", "env-02-core", "", "pipeline", "DB_PASSWORD"),
+    ]
+    assert affected[0].environment_cred_filepath == ["environments/cluster-01/env-01/Credentials/credentials.yml"]
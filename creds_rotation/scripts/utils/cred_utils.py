@@ -2,7 +2,9 @@
 import os
 import copy
 import re
+import time
 from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from typing import Any, Dict, List, Tuple, Optional, Set
 from models import CredMap
 from .yaml_utils import get_nested_target_key
@@ -12,7 +14,9 @@
 import envgenehelper.logger as logger
 from utils.error_constants import  *
 from envgenehelper.errors import ValidationError, ValueError
-from multiprocessing import Pool, cpu_count
+
+# below this number of files they are decrypted or encrypted in current process
+PARALLEL_THRESHOLD = 8
 
 pattern  = re.compile(r"\$\{creds\.get\([\"']([^\"']+)[\"']\)\.(username|password|secret)\}")
 
@@ -45,7 +49,63 @@ def extract_credential(target_key: str, yaml_content: Dict[str, Any]) -> Tuple[O
         return match.group(0), match.group(1), match.group(2)
     return None
 
-def read_shared_cred_files(shared_creds: Set[str], cluster_dir: str, work_dir: str,  is_encrypted: str):
+class RotationSession:
+    """
+    Credential files of one rotation run.
+    Each file is decrypted once (deduplicated by real path), its content is kept in memory only until the session is
+    closed, and one worker pool is shared by decryption and re-encryption. Duration of each phase is kept in timings.
+    """
+
+    def __init__(self, is_encrypted, max_workers: Optional[int] = None):
+        self.is_encrypted = is_encrypted
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.timings: Dict[str, float] = {}
+        self._contents: Dict[str, Any] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _map(self, func, args_list):
+        if len(args_list) < PARALLEL_THRESHOLD:
+            return [func(args) for args in args_list]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return list(self._executor.map(func, args_list))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.time() - start, 2)
+            logger.info(f"✅ {name} completed in {self.timings[name]} seconds.")
+
+    def read_cred_files(self, creds_files) -> Dict[str, Any]:
+        real_paths = {filepath: os.path.realpath(filepath) for filepath in creds_files}
+        to_decrypt = sorted({p for p in real_paths.values() if p not in self._contents})
+        if to_decrypt:
+            logger.info(f"Reading {len(to_decrypt)} credential files")
+            results = self._map(decrypt_task, [(self.is_encrypted, filepath) for filepath in to_decrypt])
+            self._contents.update(results)
+        return {filepath: self._contents[real_path] for filepath, real_path in real_paths.items()}
+
+    def write_cred_files(self, files_to_update: Dict[str, Any]):
+        args_list = [(cred_file, creds, self.is_encrypted) for cred_file, creds in files_to_update.items()]
+        self._map(write_and_encrypt_args_task, args_list)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._contents.clear()
+
+    def __enter__(self) -> "RotationSession":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def find_shared_cred_files(shared_creds: Set[str], cluster_dir: str, work_dir: str) -> Set[str]:
     shared_creds_files_set = set()
     dirs_to_scan = [f'{work_dir}/environments', f'{work_dir}/environments/credentials', f'{work_dir}/environments/Credentials']
     allowed_exts = ('.yml', '.yaml', '.json')
@@ -53,6 +113,11 @@ def read_shared_cred_files(shared_creds: Set[str], cluster_dir: str, work_dir: s
     scan_dir_for_creds(source_path, shared_creds, shared_creds_files_set)
     files = [entry.path for d in dirs_to_scan if os.path.exists(d) for entry in os.scandir(d) if entry.is_file() and entry.name.endswith(allowed_exts) and os.path.splitext(entry.name)[0] in shared_creds]
     shared_creds_files_set.update(files)
+    return shared_creds_files_set
+
+
+def read_shared_cred_files(shared_creds: Set[str], cluster_dir: str, work_dir: str,  is_encrypted: str):
+    shared_creds_files_set = find_shared_cred_files(shared_creds, cluster_dir, work_dir)
     shared_content_map = read_env_cred_files(shared_creds_files_set, is_encrypted)
     return shared_content_map
 
@@ -74,25 +139,13 @@ def decrypt_task(args):
     return filepath, content
 
 def read_env_cred_files(creds_files, is_encrypted):
-    # Use multiprocessing only if heavy workload
-    parallel_threshold = 8
-    use_parallel = len(creds_files) >= parallel_threshold
-
-    if use_parallel:
-        args_list = [(is_encrypted, filepath) for filepath in creds_files]
-        with Pool(min(len(creds_files), cpu_count())) as pool:
-            results = pool.map(decrypt_task, args_list)
-        return dict(results)
-
-    # Fall back to sequential for small workloads
-    result = {}
-    for filepath in creds_files:
-        result[filepath] = decrypt_and_get_content(is_encrypted, filepath)
-    return result
+    with RotationSession(is_encrypted) as session:
+        return session.read_cred_files(creds_files)
 
 def decrypt_and_get_content(is_encrypted, filepath):
     if is_encrypted:
-        return decrypt_file( filepath, True, 'SOPS', ErrorMessages.FILE_DECRYPT_ERROR, ErrorCodes.INVALID_CONFIG_CODE)
+        # decrypted content is only returned, the file itself stays encrypted
+        return decrypt_file(filepath, False, get_sops_crypt_backend(), ErrorMessages.FILE_DECRYPT_ERROR, ErrorCodes.INVALID_CONFIG_CODE)
     try:
         if filepath.endswith(".json"):
             content = openJson(filepath)
@@ -103,6 +156,13 @@ def decrypt_and_get_content(is_encrypted, filepath):
         raise ValidationError(ErrorMessages.FILE_READ_ERROR.format(file=filepath, e=str(e)), error_code=ErrorCodes.INVALID_CONFIG_CODE)
 
 
+def get_sops_crypt_backend():
+    crypt_backend = crypt.get_crypt_backend()
+    if crypt_backend not in crypt.SOPS_BACKENDS:
+        raise ValidationError(ErrorMessages.INVALID_ENCRYPT_TYPE, error_code=ErrorCodes.INVALID_CONFIG_CODE)
+    return crypt_backend
+
+
 def decrypt_file(file_path, in_place, crypt_backend, error_msg, error_code):
     try:
         return crypt.decrypt_file(file_path, in_place=in_place, ignore_is_crypt=True, crypt_backend=crypt_backend)
@@ -145,25 +205,26 @@ def update_cred_content(
     return updated_files, original_files
 
 
-def write_updated_cred_into_file(updated_files, original_files, is_encrypted):
+def write_updated_cred_into_file(updated_files, original_files, is_encrypted, session: Optional[RotationSession] = None):
     try:
         # All files processed without errors, now write and encrypt if needed
-        update_file(updated_files, is_encrypted)
+        update_file(updated_files, is_encrypted, session)
     except Exception as e:
         logger.error(f"Updation of credential file failed {e} \n Hence reverting the change")
-        update_file(original_files, is_encrypted)
+        update_file(original_files, is_encrypted, session)
         logger.info("No creds changes are updated. Files are restored to original state")
 
 
-def update_file(files_to_update, is_encrypted):
-    futures = []
-    with ProcessPoolExecutor(max_workers=min(os.cpu_count(), len(files_to_update))) as executor:
-            for cred_file, creds in files_to_update.items():
-                futures.append(
-                    executor.submit(write_and_encrypt_task, cred_file, creds, is_encrypted)
-                )
-    for future in futures:
-        future.result()
+def update_file(files_to_update, is_encrypted, session: Optional[RotationSession] = None):
+    if session is not None:
+        session.write_cred_files(files_to_update)
+        return
+    with RotationSession(is_encrypted) as session:
+        session.write_cred_files(files_to_update)
+
+
+def write_and_encrypt_args_task(args):
+    return write_and_encrypt_task(*args)
 
 
 def write_and_encrypt_task(cred_file, creds, is_encrypted):
@@ -174,7 +235,7 @@ def write_and_encrypt_task(cred_file, creds, is_encrypted):
         try:
             crypt.encrypt_file(
                 cred_file, in_place=True, ignore_is_crypt=True,
-                crypt_backend='SOPS'
+                crypt_backend=get_sops_crypt_backend()
             )
         except Exception as e:
            raise ValidationError(ErrorMessages.FILE_ENCRYPT_ERROR.format(file=cred_file, e=str(e)), error_code=ErrorCodes.INVALID_CONFIG_CODE)
@@ -28,81 +28,107 @@ def resolve_context(context: str) -> str:
     return REVERSE_CONTEXT_MAP.get(context.lower(), "")
 
 
-def find_matching_keys(data: dict, search_pattern: str, is_target: bool,
-                       context: str, target_key: str, target_context: str) -> list[str]:
-    results: List[str] = []
+CRED_MACRO_PATTERN = re.compile(r"\$\{creds\.get\([\"']([^\"']+)[\"']\)\.(username|password|secret)\}")
 
+
+def iter_string_params(data: dict):
+    """Yields (key path, value) of all string values of parameters block, lists are addressed as key[idx]."""
     def recurse(obj, path):
         if isinstance(obj, dict):
             for k, v in obj.items():
-                recurse(v, path + [k])
+                yield from recurse(v, path + [k])
         elif isinstance(obj, list):
             for idx, item in enumerate(obj):
                if path:
                     base_path = path[:-1]
                     last_key_with_index = f"{path[-1]}[{idx}]"
-                    recurse(item, base_path + [last_key_with_index])
+                    yield from recurse(item, base_path + [last_key_with_index])
                else:
-                    recurse(item, [f"[{idx}]"])
-        elif isinstance(obj, str) and search_pattern in obj:
-            final_key = ".".join(path)
-            if  is_target and context == target_context and final_key == target_key:
-                logger.debug("skipping target param")
-            else:
-                results.append(final_key)
-    recurse(data, [])
-    return results
-
-
-def find_in_yaml(data: dict, search_pattern: str, is_target: bool, target_key: str, target_context: str) -> Dict[str, List[str]]:
-    matches = {}
-    for context in CONTEXT_MAP.values():
-        params = data.get(context, {})
-        if params and search_pattern in str(params):
-            affected_params = find_matching_keys(params, search_pattern, is_target, context, target_key, target_context)
-            if affected_params:
-                matches[context] = affected_params
-    return matches
-
-
-def get_ns_content(
-    yaml_content_map: Dict[str, Dict[str, Any]],
-    namespace: str,
-    env_name: str
-) -> Optional[Tuple[str, Dict[str, Any]]]:
-    for file_path, content in yaml_content_map.items():
-        if f"/{env_name}/Namespaces" not in file_path.replace("\\", "/"):
-            continue
-        if file_path.endswith(("namespace.yml", "namespace.yaml")) and content:
-            if namespace == content.get("name"):
-                return file_path, content
-    return None
-
-
-def get_app_content(
-    yaml_content_map: Dict[str, Dict[str, Any]],
-    namespace: str,
-    app: str,
-    env_name: str
-) -> Optional[Tuple[str, Dict[str, Any]]]:
-    for file_path, content in yaml_content_map.items():
-        if file_path.endswith(("namespace.yml", "namespace.yaml")) or content is None or f"/{env_name}/Namespaces" not in file_path.replace("\\", "/"):
-            continue
-
-        if app != content.get("name"):
-            continue
-
+                    yield from recurse(item, [f"[{idx}]"])
+        elif isinstance(obj, str):
+            yield ".".join(path), obj
+    yield from recurse(data, [])
+
+
+def get_env_name_of_entity(file_path: str) -> Optional[str]:
+    parts = PurePath(file_path.replace("\\", "/")).parts
+    if "Namespaces" not in parts:
+        return None
+    idx = parts.index("Namespaces")
+    return parts[idx - 1] if idx > 0 else None
+
+
+class EntityIndex:
+    """
+    Index of loaded namespace and application files, built once per rotation.
+    Maps (env, namespace[, application]) to entity file and each credential macro to the parameters referring to it,
+    so that payload entries are resolved without scanning all entity files.
+    """
+
+    def __init__(self, entity_files_map: Dict[str, Dict[str, Any]]):
+        self.entity_files_map = entity_files_map
+        self._namespaces: Dict[Tuple[str, str], str] = {}
+        self._applications: Dict[Tuple[str, str, str], str] = {}
+        # applications which namespace file is not found: (env, application) -> expected namespace file
+        self._orphan_applications: Dict[Tuple[str, str], str] = {}
+        # credential macro -> [(file, context, parameter key)]
+        self._cred_references: Dict[str, List[Tuple[str, str, str]]] = {}
+
+        for file_path, content in entity_files_map.items():
+            if not isinstance(content, dict):
+                continue
+            self._index_entity(file_path, content)
+            self._index_cred_references(file_path, content)
+
+    def _index_entity(self, file_path: str, content: Dict[str, Any]):
+        env_name = get_env_name_of_entity(file_path)
+        if env_name is None:
+            return
+        if file_path.endswith(("namespace.yml", "namespace.yaml")):
+            self._namespaces.setdefault((env_name, content.get("name")), file_path)
+            return
         parent_dir = Path(file_path).parent.parent
         ns_files = [parent_dir / "namespace.yaml", parent_dir / "namespace.yml"]
-        ns_content = find_namespace(yaml_content_map, ns_files)
-
+        ns_content = find_namespace(self.entity_files_map, ns_files)
         if ns_content is None:
-            raise ReferenceError(ErrorMessages.NS_FILE_NOT_FOUND.format(file=str(ns_files[0]).removesuffix("namespace.yaml")), error_code=ErrorCodes.FILE_NOT_FOUND_CODE)
-
-        if ns_content and ns_content.get("name") == namespace:
-            return file_path, content
-
-    return None
+            self._orphan_applications.setdefault((env_name, content.get("name")), str(ns_files[0]))
+            return
+        self._applications.setdefault((env_name, ns_content.get("name"), content.get("name")), file_path)
+
+    def _index_cred_references(self, file_path: str, content: Dict[str, Any]):
+        for context in CONTEXT_MAP.values():
+            params = content.get(context)
+            if not params:
+                continue
+            for key, value in iter_string_params(params):
+                if "creds.get" not in value:
+                    continue
+                for macro in dict.fromkeys(m.group(0) for m in CRED_MACRO_PATTERN.finditer(value)):
+                    self._cred_references.setdefault(macro, []).append((file_path, context, key))
+
+    def get_ns_content(self, namespace: str, env_name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        file_path = self._namespaces.get((env_name, namespace))
+        return (file_path, self.entity_files_map[file_path]) if file_path else None
+
+    def get_app_content(self, namespace: str, app: str, env_name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        file_path = self._applications.get((env_name, namespace, app))
+        if file_path:
+            return file_path, self.entity_files_map[file_path]
+        ns_file = self._orphan_applications.get((env_name, app))
+        if ns_file:
+            raise ReferenceError(ErrorMessages.NS_FILE_NOT_FOUND.format(file=ns_file.removesuffix("namespace.yaml")), error_code=ErrorCodes.FILE_NOT_FOUND_CODE)
+        return None
+
+    def find_references(self, cred_macro: str, target_file: str, target_key: str,
+                        target_context: str) -> Dict[str, Dict[str, List[str]]]:
+        """Parameters referring to credential macro grouped by file and context, except the target parameter itself."""
+        matches: Dict[str, Dict[str, List[str]]] = {}
+        for file_path, context, key in self._cred_references.get(cred_macro, []):
+            if file_path == target_file and context == target_context and key == target_key:
+                logger.debug("skipping target param")
+                continue
+            matches.setdefault(file_path, {}).setdefault(context, []).append(key)
+        return matches
 
 
 def get_app_and_ns(filename: str, content: dict, entity_files_map: Dict[str, Dict[str, Any]]) -> Tuple[str, Optional[str]]:
@@ -174,15 +200,13 @@ def get_affected_param_map(
     return result
 
 
-def search_yaml_files(search_string: str, entity_files_map: Dict[str, Dict[str, Any]], cred_id: str, cluster_name: str, shared_cred_files: List[str], env_cred_files : List[str], target_key: str,
+def search_yaml_files(search_string: str, entity_index: EntityIndex, cred_id: str, cluster_name: str, shared_cred_files: List[str], env_cred_files : List[str], target_key: str,
  target_context: str, target_file: str) -> List[AffectedParameter]:
     affected: List[AffectedParameter] = []
 
-    for filename, content in entity_files_map.items():
-        is_target = filename == target_file
-        matches = find_in_yaml(content, search_string, is_target, target_key, target_context)
-        if matches:
-            affected.extend(get_affected_param_map(
-            cred_id, cluster_name, shared_cred_files, env_cred_files, filename, content, matches, entity_files_map
-            ))
+    references = entity_index.find_references(search_string, target_file, target_key, target_context)
+    for filename, matches in references.items():
+        affected.extend(get_affected_param_map(
+        cred_id, cluster_name, shared_cred_files, env_cred_files, filename, entity_index.entity_files_map[filename], matches, entity_index.entity_files_map
+        ))
     return affected
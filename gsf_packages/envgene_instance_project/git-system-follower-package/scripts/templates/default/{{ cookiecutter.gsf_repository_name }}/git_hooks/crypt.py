@@ -14,6 +14,9 @@
 SECRET_KEY_ID = "SECRET_KEY"
 FERNET_ID = "Fernet"
 SOPS_ID = "SOPS"
+SOPS_NATIVE_ID = "SOPSNative"
+# SOPSNative writes the same file format as the sops CLI
+SOPS_BACKENDS = (SOPS_ID, SOPS_NATIVE_ID)
 ENVGENE_AGE_PUBLIC_KEY_ID = "ENVGENE_AGE_PUBLIC_KEY"
 ENVGENE_AGE_PRIVATE_KEY_ID = "SOPS_AGE_KEY_FILE"
 UNENCRYPTED_REGEX_STR = "^type$"
@@ -78,7 +81,7 @@ def decrypt_file(secret_key, age_private_key_file, cred_file, crypt_backend):
     config_path = f"{script_path}/../configuration/config.yml"
     validateConfigFile(config_path, crypt_backend, secret_key,"","decrypt")
     logging.debug(f'Try to decrypt data from {cred_file} file')
-    if crypt_backend == SOPS_ID:
+    if crypt_backend in SOPS_BACKENDS:
         decrypted_data = decode_sensitive_sops(cred_file)
     else:
         cipher = Fernet(secret_key)
@@ -172,14 +175,14 @@ def encrypt_file(secret_key, age_public_key, cred_file, crypt_enabled, crypt_bac
         validateConfigFile(config_path, crypt_backend, secret_key, age_public_key, "encrypt")
         logging.info(f'Try to encrypt data from {cred_file} file')
         if isinstance(sensitive_data, dict):
-            if crypt_backend == SOPS_ID:
+            if crypt_backend in SOPS_BACKENDS:
                 encrypted_data = encrypt_sensitive_sops(cred_file, age_public_key)
             else:
                 cipher = Fernet(secret_key)
                 encrypted_data = encrypt_sensitive(cipher, sensitive_data)
             logging.info(f'Try to write data to {cred_file} file')
             write_yaml_to_file(cred_file, encrypted_data)
-            if crypt_backend != SOPS_ID:
+            if crypt_backend not in SOPS_BACKENDS:
                 sortYaml(cred_file)
             logging.info(f'The {cred_file} file has been encrypted')
         else:
@@ -247,13 +250,13 @@ def validateConfigFile(yaml_file, crypt_backend, secret_key, age_public_key, mod
     if crypt_backend == FERNET_ID and not secret_key:
         raise Exception(f'Following CI/CD variables are not set: \n{SECRET_KEY_ID}.\nThis variable is mandatory for crypt_backend: {FERNET_ID}')
     empty_parameters = []
-    if crypt_backend == SOPS_ID and mode == "encrypt" and not age_public_key:
+    if crypt_backend in SOPS_BACKENDS and mode == "encrypt" and not age_public_key:
         empty_parameters.append(ENVGENE_AGE_PUBLIC_KEY_ID)
-    if crypt_backend == SOPS_ID and mode == "decrypt" and not getenv(ENVGENE_AGE_PRIVATE_KEY_ID,""):
+    if crypt_backend in SOPS_BACKENDS and mode == "decrypt" and not getenv(ENVGENE_AGE_PRIVATE_KEY_ID,""):
         empty_parameters.append(ENVGENE_AGE_PRIVATE_KEY_ID)
 
     if empty_parameters:
-        raise Exception(f'Following CI/CD variables are not set: \n{empty_parameters}.\nThese variables are mandatory for crypt_backend: {SOPS_ID}')
+        raise Exception(f'Following CI/CD variables are not set: \n{empty_parameters}.\nThese variables are mandatory for crypt_backend: {crypt_backend}')
 
 if __name__ == '__main__':
     jschon.create_catalog('2020-12')
@@ -1,5 +1,6 @@
 import asyncio
 import base64
+import hashlib
 import os
 import re
 import shutil
@@ -10,16 +11,17 @@
 from typing import Any, Optional
 from urllib.parse import urljoin, urlparse, urlunparse
 from zipfile import ZipFile
-from collections import defaultdict
 
-import aiohttp
-import requests
-from artifact_searcher.utils.constants import DEFAULT_REQUEST_TIMEOUT, TCP_CONNECTION_LIMIT, METADATA_XML
+from artifact_searcher.registry_client import DOWNLOAD_TIMEOUT, get_http_session, get_registry_client
+from artifact_searcher.utils.constants import (DEFAULT_REQUEST_TIMEOUT, DOWNLOAD_CHUNK_SIZE, METADATA_XML,
+                                               VERIFY_DOWNLOAD_CHECKSUM)
 from artifact_searcher.utils.models import Registry, RegistryV2, Application, FileExtension, Credentials, ArtifactInfo, Provider, MavenConfig
 from envgenehelper import logger
 
 WORKSPACE = os.getenv("WORKSPACE", Path(tempfile.gettempdir()) / "zips")
 TIMESTAMPED_VERSION_PATTERN = re.compile(r"-\d{8}\.\d{6}-\d+$")
+# checksum files looked up next to the artifact, in order of preference
+CHECKSUM_ALGORITHMS = ("sha256", "sha1")
 
 
 def convert_nexus_repo_url_to_index_view(url: str) -> str:
@@ -157,6 +159,38 @@ def _create_candidate_urls_from_coordinates(repo_url: str, group_id: str, artifa
     return urls
 
 
+def _normalize_coordinates(repo_url: str, group_id: str) -> tuple[str, str]:
+    """Returns repository URL artifacts are checked in and group id as URL path"""
+    if MavenConfig.is_nexus(repo_url):
+        repo_url = convert_nexus_repo_url_to_index_view(repo_url)
+    return repo_url, group_id.replace(".", "/")
+
+
+def _snapshot_base_path(repo_url: str, group_path: str, artifact_id: str, version: str) -> str:
+    return urljoin(repo_url.rstrip("/") + "/", f"{group_path}/{artifact_id}/{version}/")
+
+
+def _select_found_artifact_url(repo_url: str, group_path: str, artifact_id: str, version: str,
+                               candidate_results: list[tuple[str, int | None, Exception | None]]) -> str | None:
+    for full_url, status, _ in candidate_results:
+        if status == 200:
+            logger.info(
+                f"[Repository: {repo_url}] [Artifact: {group_path}:{artifact_id}:{version}] - Artifact found: {full_url}"
+            )
+            return full_url
+
+    for full_url, status, error in candidate_results:
+        if error:
+            logger.warning(
+                f"[Repository: {repo_url}] [Artifact: {group_path}:{artifact_id}:{version}] - Error checking artifact URL {full_url}: {error}"
+            )
+        else:
+            logger.warning(
+                f"[Repository: {repo_url}] [Artifact: {group_path}:{artifact_id}:{version}] - Artifact not found at URL {full_url}, status: {status}"
+            )
+    return None
+
+
 async def _check_candidate_url_async(session, full_url: str) -> tuple[str, int | None, Exception | None]:
     try:
         async with session.head(full_url) as response:
@@ -167,7 +201,7 @@ async def _check_candidate_url_async(session, full_url: str) -> tuple[str, int |
 
 def _check_candidate_url(full_url: str, auth_headers: dict | None = None) -> tuple[str, int | None, Exception | None]:
     try:
-        response = requests.head(full_url, headers=auth_headers, timeout=DEFAULT_REQUEST_TIMEOUT)
+        response = get_http_session().head(full_url, headers=auth_headers, timeout=DEFAULT_REQUEST_TIMEOUT)
         return full_url, response.status_code, None
     except Exception as e:
         return full_url, None, e
@@ -186,36 +220,24 @@ def credentials_to_headers(cred: Credentials) -> dict:
 
 
 async def download_all_async(artifacts_info: list[ArtifactInfo]):
-    auth_groups = defaultdict(list)
-    for artifact in artifacts_info:
-        # Use sorted tuple of auth items as key, or "none" for None
-        auth_key = tuple(sorted(artifact.auth_headers.items())) if artifact.auth_headers else "none"
-        auth_groups[auth_key].append(artifact)
-
-    all_results = []
-    for auth_key, artifacts in auth_groups.items():
-        headers = artifacts[0].auth_headers
-        connector = aiohttp.TCPConnector(limit=TCP_CONNECTION_LIMIT)
-        timeout = aiohttp.ClientTimeout(total=DEFAULT_REQUEST_TIMEOUT)
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
-            async with asyncio.TaskGroup() as tg:
-                tasks = [tg.create_task(download_async(session, artifact)) for artifact in artifacts]
-            results = []
-            errors = []
-
-            for i, task in enumerate(tasks):
-                result = task.result()
-                if not result or result.local_path is None:
-                    errors.append(f"Task {i}: artifact was not downloaded")
-                else:
-                    results.append(result)
-
-            if errors:
-                raise ValueError("Some tasks failed:\n" + "\n".join(errors))
-
-            all_results.extend(results)
-
-    return all_results
+    client = get_registry_client()
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(download_async(client.with_headers(artifact.auth_headers), artifact))
+                 for artifact in artifacts_info]
+
+    results = []
+    errors = []
+    for i, task in enumerate(tasks):
+        result = task.result()
+        if not result or result.local_path is None:
+            errors.append(f"Task {i}: artifact was not downloaded")
+        else:
+            results.append(result)
+
+    if errors:
+        raise ValueError("Some tasks failed:\n" + "\n".join(errors))
+
+    return results
 
 
 def create_app_artifacts_local_path(app_name, app_version):
@@ -234,10 +256,10 @@ async def download_async(session, artifact_info: ArtifactInfo) -> ArtifactInfo:
     artifact_local_path = os.path.join(app_local_path, os.path.basename(url))
     os.makedirs(os.path.dirname(artifact_local_path), exist_ok=True)
     try:
-        async with session.get(url) as response:
+        checksum = await fetch_checksum_async(session, url) if VERIFY_DOWNLOAD_CHECKSUM else None
+        async with session.get(url, timeout=DOWNLOAD_TIMEOUT) as response:
             if response.status == 200:
-                with open(artifact_local_path, "wb") as f:
-                    f.write(await response.read())
+                await _stream_to_file_async(response, artifact_local_path, checksum)
                 logger.info(f"Downloaded: {artifact_local_path}")
                 artifact_info.local_path = artifact_local_path
                 return artifact_info
@@ -247,6 +269,94 @@ async def download_async(session, artifact_info: ArtifactInfo) -> ArtifactInfo:
         logger.error(f"Download process with exception {url}: {e}")
 
 
+async def download_json_content_async(session, url: str) -> dict[str, Any]:
+    async with session.get(url) as response:
+        response.raise_for_status()
+        # registries serve JSON artifacts with different content types
+        json_data = await response.json(content_type=None)
+    logger.info(f"Got json data by url {url}")
+    return json_data
+
+
+async def _stream_to_file_async(response, target_path: str, checksum: tuple[str, str] | None = None):
+    budget = get_registry_client().download_budget
+    with _AtomicDownloadFile(target_path, checksum) as target:
+        while True:
+            async with budget.reserve(DOWNLOAD_CHUNK_SIZE):
+                chunk = await response.content.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+
+
+async def fetch_checksum_async(session, url: str) -> tuple[str, str] | None:
+    """Returns (algorithm, hex digest) published by the registry next to the artifact, if any"""
+    for algorithm in CHECKSUM_ALGORITHMS:
+        try:
+            async with session.get(f"{url}.{algorithm}") as response:
+                if response.status == 200:
+                    return algorithm, _parse_checksum(await response.text())
+        except Exception as e:
+            logger.debug(f"Failed to fetch {algorithm} checksum for {url}: {e}")
+    logger.warning(f"No checksum published for {url}, skipping verification")
+    return None
+
+
+def fetch_checksum(url: str, auth_headers: dict | None = None) -> tuple[str, str] | None:
+    for algorithm in CHECKSUM_ALGORITHMS:
+        try:
+            response = get_http_session().get(f"{url}.{algorithm}", headers=auth_headers,
+                                              timeout=DEFAULT_REQUEST_TIMEOUT)
+            if response.status_code == 200:
+                return algorithm, _parse_checksum(response.text)
+        except Exception as e:
+            logger.debug(f"Failed to fetch {algorithm} checksum for {url}: {e}")
+    logger.warning(f"No checksum published for {url}, skipping verification")
+    return None
+
+
+def _parse_checksum(content: str) -> str:
+    # checksum files contain either only the digest or "<digest>  <file name>"
+    return content.strip().split()[0].lower()
+
+
+class _AtomicDownloadFile:
+    """
+    Writes downloaded chunks to a temp file next to target_path and moves it to target_path
+    only if the whole artifact was received and its checksum matches.
+    """
+
+    def __init__(self, target_path: str, checksum: tuple[str, str] | None = None):
+        self.target_path = target_path
+        self.checksum = checksum
+        self._hash = hashlib.new(checksum[0]) if checksum else None
+        self._file = None
+
+    def __enter__(self):
+        self._file = tempfile.NamedTemporaryFile(dir=os.path.dirname(self.target_path) or ".",
+                                                 prefix=f".{os.path.basename(self.target_path)}.",
+                                                 suffix=".part", delete=False)
+        return self
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        if self._hash:
+            self._hash.update(chunk)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        try:
+            if exc_type is None:
+                if self._hash and self._hash.hexdigest() != self.checksum[1]:
+                    raise ValueError(f"{self.checksum[0]} checksum mismatch for {self.target_path}: "
+                                     f"expected {self.checksum[1]}, got {self._hash.hexdigest()}")
+                os.replace(self._file.name, self.target_path)
+        finally:
+            if os.path.exists(self._file.name):
+                os.remove(self._file.name)
+        return False
+
+
 async def check_artifact_by_full_url_async(
         app: Application,
         version: str,
@@ -344,34 +454,31 @@ async def _attempt_check(
     if registry_url:
         app.registry.maven_config.repository_domain_name = registry_url
 
-    session_headers = auth_headers
-
-    timeout = aiohttp.ClientTimeout(total=DEFAULT_REQUEST_TIMEOUT)
     stop_snapshot_event_for_others = asyncio.Event()
     stop_artifact_event = asyncio.Event()
-    async with aiohttp.ClientSession(timeout=timeout, headers=session_headers) as session:
-        async with asyncio.TaskGroup() as tg:
-            tasks = [
-                tg.create_task(
-                    check_artifact_by_full_url_async(
-                        app,
-                        version,
-                        repo,
-                        artifact_extension,
-                        stop_snapshot_event_for_others,
-                        stop_artifact_event,
-                        session,
-                        i,
-                        classifier
-                    )
+    session = get_registry_client().with_headers(auth_headers)
+    async with asyncio.TaskGroup() as tg:
+        tasks = [
+            tg.create_task(
+                check_artifact_by_full_url_async(
+                    app,
+                    version,
+                    repo,
+                    artifact_extension,
+                    stop_snapshot_event_for_others,
+                    stop_artifact_event,
+                    session,
+                    i,
+                    classifier
                 )
-                for i, repo in enumerate(repos_dict.items())
-            ]
+            )
+            for i, repo in enumerate(repos_dict.items())
+        ]
 
-        for task in tasks:
-            result = task.result()
-            if result is not None:
-                return result
+    for task in tasks:
+        result = task.result()
+        if result is not None:
+            return result
 
 
 def _should_retry_nexus_url(registry) -> bool:
@@ -426,8 +533,9 @@ async def check_artifact_async(
             return None
         domain = app.registry.maven_config.repository_domain_name
         repo_url = domain if not repo_value else domain.rstrip('/') + '/' + repo_value
-        url = check_artifact(repo_url, app.group_id, app.artifact_id, version,
-                             artifact_extension, auth_headers=auth_headers, classifier=classifier)
+        url = await check_artifact_by_coordinates_async(repo_url, app.group_id, app.artifact_id, version,
+                                                        artifact_extension, auth_headers=auth_headers,
+                                                        classifier=classifier)
         if url:
             return url, (repo_value, repo_pointer)
         if _should_retry_nexus_url(app.registry):
@@ -446,6 +554,42 @@ async def check_artifact_async(
     return None
 
 
+async def check_artifact_by_coordinates_async(repo_url: str, group_id: str, artifact_id: str, version: str,
+                                             artifact_extension: FileExtension,
+                                             auth_headers: dict | None = None,
+                                             classifier: str = "") -> str | None:
+    """Same as check_artifact, but done with the shared registry client"""
+    session = get_registry_client().with_headers(auth_headers)
+    repo_url, group_id = _normalize_coordinates(repo_url, group_id)
+
+    if "SNAPSHOT" in version:
+        base_path = _snapshot_base_path(repo_url, group_id, artifact_id, version)
+        version = await _resolve_snapshot_version_by_path_async(session, base_path, artifact_extension, classifier)
+        if not version:
+            return None
+
+    candidate_urls = _create_candidate_urls_from_coordinates(
+        repo_url, group_id, artifact_id, version, artifact_extension, classifier
+    )
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(_check_candidate_url_async(session, full_url)) for full_url in candidate_urls]
+    return _select_found_artifact_url(repo_url, group_id, artifact_id, version, [task.result() for task in tasks])
+
+
+async def _resolve_snapshot_version_by_path_async(session, base_path: str, extension: FileExtension,
+                                                  classifier: str = "") -> Optional[str]:
+    metadata_url = urljoin(base_path, METADATA_XML)
+
+    try:
+        async with session.get(metadata_url) as response:
+            if response.status != 200:
+                logger.warning(f"Failed to fetch {metadata_url}, status={response.status}")
+                return None
+            return _find_snapshot_version(await response.text(), extension, classifier)
+    except Exception as e:
+        logger.warning(f"Snapshot resolve error: {e}")
+
+
 def unzip_file(artifact_id: str, app_name: str, app_version: str, zip_url: str):
     extracted = False
     app_artifacts_dir = f"{artifact_id}/"
@@ -484,7 +628,7 @@ def check_artifacts_by_aql(aql: str, url: str = "",
                            auth_headers: dict | None = None) -> list[ArtifactInfo]:
     artifacts = []
     base_url = url.rstrip('/')
-    response = requests.post(f"{base_url}/api/search/aql", data=aql, headers=auth_headers)
+    response = get_http_session().post(f"{base_url}/api/search/aql", data=aql, headers=auth_headers)
     response.raise_for_status()
     results = response.json()
     for result in (results.get("results") or []):
@@ -503,7 +647,7 @@ def check_artifacts_by_aql(aql: str, url: str = "",
 
 def download_json_content(url: str, auth_headers: dict | None = None) -> dict[str, Any]:
     headers = auth_headers
-    response = requests.get(url, headers=headers, timeout=DEFAULT_REQUEST_TIMEOUT)
+    response = get_http_session().get(url, headers=headers, timeout=DEFAULT_REQUEST_TIMEOUT)
     response.raise_for_status()
     json_data = response.json()
     logger.info(f"Got json data by url {url}")
@@ -512,11 +656,13 @@ def download_json_content(url: str, auth_headers: dict | None = None) -> dict[st
 
 def download(url: str, target_path: str, auth_headers: dict | None = None) -> str:
     headers = auth_headers
-    response = requests.get(url, headers=headers, timeout=DEFAULT_REQUEST_TIMEOUT)
-    os.makedirs(os.path.dirname(target_path), exist_ok=True)
-    response.raise_for_status()
-    with open(target_path, "wb") as f:
-        f.write(response.content)
+    checksum = fetch_checksum(url, auth_headers) if VERIFY_DOWNLOAD_CHECKSUM else None
+    with get_http_session().get(url, headers=headers, timeout=DEFAULT_REQUEST_TIMEOUT, stream=True) as response:
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        response.raise_for_status()
+        with _AtomicDownloadFile(target_path, checksum) as target:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                target.write(chunk)
     logger.info(f"Downloaded: {target_path}")
     return target_path
 
@@ -525,18 +671,13 @@ def check_artifact(repo_url: str, group_id: str, artifact_id: str, version: str,
                    artifact_extension: FileExtension,
                    auth_headers: dict | None = None,
                    classifier: str = "") -> str | None:
-    if MavenConfig.is_nexus(repo_url):
-        repo_url = convert_nexus_repo_url_to_index_view(repo_url)
-
-    base = repo_url.rstrip("/") + "/"
-    group_id = group_id.replace(".", "/")
+    repo_url, group_id = _normalize_coordinates(repo_url, group_id)
 
     if "SNAPSHOT" in version:
-        base_path = urljoin(base, f"{group_id}/{artifact_id}/{version}/")
-        resolved_version = resolve_snapshot_version(base_path, artifact_extension, auth_headers, classifier)
-        if not resolved_version:
+        base_path = _snapshot_base_path(repo_url, group_id, artifact_id, version)
+        version = resolve_snapshot_version(base_path, artifact_extension, auth_headers, classifier)
+        if not version:
             return None
-        version = resolved_version
 
     candidate_urls = _create_candidate_urls_from_coordinates(
         repo_url, group_id, artifact_id, version, artifact_extension, classifier
@@ -550,25 +691,7 @@ def check_artifact(repo_url: str, group_id: str, artifact_id: str, version: str,
                 for full_url in candidate_urls
             ]
             candidate_results = [future.result() for future in futures]
-
-    for full_url, status, _ in candidate_results:
-        if status == 200:
-            logger.info(
-                f"[Repository: {repo_url}] [Artifact: {group_id}:{artifact_id}:{version}] - Artifact found: {full_url}"
-            )
-            return full_url
-
-    for full_url, status, error in candidate_results:
-        if error:
-            logger.warning(
-                f"[Repository: {repo_url}] [Artifact: {group_id}:{artifact_id}:{version}] - Error checking artifact URL {full_url}: {error}"
-            )
-        else:
-            logger.warning(
-                f"[Repository: {repo_url}] [Artifact: {group_id}:{artifact_id}:{version}] - Artifact not found at URL {full_url}, status: {status}"
-            )
-
-    return None
+    return _select_found_artifact_url(repo_url, group_id, artifact_id, version, candidate_results)
 
 
 def resolve_snapshot_version(base_path, extension: FileExtension,
@@ -577,28 +700,30 @@ def resolve_snapshot_version(base_path, extension: FileExtension,
     metadata_url = urljoin(base_path, METADATA_XML)
 
     try:
-        response = requests.get(metadata_url, headers=auth_headers, timeout=DEFAULT_REQUEST_TIMEOUT)
+        response = get_http_session().get(metadata_url, headers=auth_headers, timeout=DEFAULT_REQUEST_TIMEOUT)
         if response.status_code != 200:
             logger.warning(f"Failed to fetch {metadata_url}, status={response.status_code}")
             return None
-        content = response.text
-        root = ET.fromstring(content)
-        snapshot_versions = root.findall(".//snapshotVersions/snapshotVersion")
-        if not snapshot_versions:
-            logger.warning(f"No <snapshotVersions> found")
-            return
-
-        for node in snapshot_versions:
-            node_classifier = node.findtext("classifier", default="")
-            node_extension = node.findtext("extension", default="")
-            value = node.findtext("value")
-            if node_classifier == classifier and node_extension == extension:
-                logger.info(f"Resolved snapshot version '{value}'")
-                return value
-
-        logger.warning(f"No matching snapshotVersion found")
-
+        return _find_snapshot_version(response.text, extension, classifier)
     except Exception as e:
         logger.warning(f"Snapshot resolve error: {e}")
 
+
+def _find_snapshot_version(content: str, extension: FileExtension, classifier: str = "") -> Optional[str]:
+    root = ET.fromstring(content)
+    snapshot_versions = root.findall(".//snapshotVersions/snapshotVersion")
+    if not snapshot_versions:
+        logger.warning(f"No <snapshotVersions> found")
+        return
+
+    for node in snapshot_versions:
+        node_classifier = node.findtext("classifier", default="")
+        node_extension = node.findtext("extension", default="")
+        value = node.findtext("value")
+        if node_classifier == classifier and node_extension == extension:
+            logger.info(f"Resolved snapshot version '{value}'")
+            return value
+
+    logger.warning(f"No matching snapshotVersion found")
+
 # --------------------------------------------------------------------------------------
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from artifact_searcher.utils.constants import (DEFAULT_REQUEST_TIMEOUT, DOWNLOAD_MAX_IN_FLIGHT_BYTES,
+                                               REGISTRY_MAX_CONCURRENT_REQUESTS, TCP_CONNECTION_LIMIT,
+                                               TCP_CONNECTION_LIMIT_PER_HOST, TCP_KEEPALIVE_TIMEOUT)
+from envgenehelper import logger
+
+# downloads are streamed, so only connect and idle read time are limited, not the whole transfer
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=DEFAULT_REQUEST_TIMEOUT,
+                                         sock_read=DEFAULT_REQUEST_TIMEOUT)
+
+
+class ByteBudget:
+    """Limits the number of bytes held in memory by concurrent downloads of one event loop."""
+
+    def __init__(self, limit: int = DOWNLOAD_MAX_IN_FLIGHT_BYTES):
+        self.limit = max(1, limit)
+        self.used = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, size: int):
+        size = min(size, self.limit)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.used + size <= self.limit)
+            self.used += size
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.used -= size
+                self._condition.notify_all()
+
+
+class RegistryClient:
+    """
+    Long-lived HTTP client shared by all registry check/resolve/download calls.
+
+    Keeps one aiohttp session whose connector pools keep-alive connections per registry host,
+    so TCP and TLS setup is paid once per host instead of once per request. Auth headers are
+    passed per request, so registries with different credentials share the same pool.
+    aiohttp does not pipeline HTTP/1.1 requests, concurrency is bounded by max_concurrent_requests.
+    """
+
+    def __init__(self, limit: int = TCP_CONNECTION_LIMIT, limit_per_host: int = TCP_CONNECTION_LIMIT_PER_HOST,
+                 max_concurrent_requests: int = REGISTRY_MAX_CONCURRENT_REQUESTS,
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT, keepalive_timeout: float = TCP_KEEPALIVE_TIMEOUT,
+                 max_in_flight_bytes: int = DOWNLOAD_MAX_IN_FLIGHT_BYTES):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent_requests))
+        self.download_budget = ByteBudget(max_in_flight_bytes)
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, headers: dict | None = None, **kwargs):
+        async with self._semaphore:
+            async with self.session.request(method, url, headers=headers, **kwargs) as response:
+                yield response
+
+    def with_headers(self, headers: dict | None) -> "AuthorizedSession":
+        return AuthorizedSession(self, headers)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "RegistryClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class AuthorizedSession:
+    """Session-like view of RegistryClient that adds the same auth headers to every request."""
+
+    def __init__(self, client: RegistryClient, headers: dict | None = None):
+        self._client = client
+        self._headers = headers
+
+    def get(self, url: str, **kwargs):
+        return self._client.request("GET", url, headers=self._headers, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        # same default as aiohttp.ClientSession.head
+        kwargs.setdefault("allow_redirects", False)
+        return self._client.request("HEAD", url, headers=self._headers, **kwargs)
+
+
+# aiohttp sessions and asyncio primitives are bound to the event loop they were created in,
+# so one client is kept per running loop
+_clients: dict[asyncio.AbstractEventLoop, RegistryClient] = {}
+_http_session: requests.Session | None = None
+_http_session_lock = threading.Lock()
+
+
+def get_registry_client() -> RegistryClient:
+    loop = asyncio.get_running_loop()
+    for stale_loop in [client_loop for client_loop in _clients if client_loop.is_closed()]:
+        del _clients[stale_loop]
+    client = _clients.get(loop)
+    if client is None:
+        client = RegistryClient()
+        _clients[loop] = client
+        logger.debug(f"Created registry client: connection limit {client.limit}, per host {client.limit_per_host}")
+    return client
+
+
+async def close_registry_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def get_http_session() -> requests.Session:
+    """Pooled requests session for the blocking registry calls."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=TCP_CONNECTION_LIMIT, pool_maxsize=TCP_CONNECTION_LIMIT)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+    return _http_session
+
+
+def run_with_registry_client(coro):
+    """asyncio.run for registry calls, closes the pooled connections of the loop at the end."""
+    async def _run():
+        try:
+            return await coro
+        finally:
+            await close_registry_client()
+
+    return asyncio.run(_run())
@@ -8,7 +8,9 @@
 from artifact_searcher.utils import models
 from artifact_searcher.artifact import check_artifact_async
 from artifact_searcher.artifact import check_artifact
+from artifact_searcher.artifact import check_artifact_by_coordinates_async
 from artifact_searcher.artifact import _retry_with_nexus_url
+from artifact_searcher.registry_client import close_registry_client
 from artifact_searcher.utils.models import FileExtension
 
 TEST_REPO = "https://repo.example.com/repository/"
@@ -17,6 +19,12 @@
 VERSION = "1.0.0"
 TIMESTAMPED_VERSION = "1.0.0-20240702.123456-1"
 
+@pytest.fixture(autouse=True)
+async def registry_client():
+    yield
+    await close_registry_client()
+
+
 class MockResponse:
     def __init__(self, status_code):
         self.status_code = status_code
@@ -112,7 +120,7 @@ def mock_get(url, *args, **kwargs):
     sample_url = f"{base_url.rstrip('/repository/')}{index_path}repo/com/example/app/1.0.0-SNAPSHOT/app-1.0.0-20240702.123456-1.json"
     assert full_url == sample_url, f"expected: {sample_url}, received: {full_url}"
 
-@patch("artifact_searcher.artifact.requests.head")
+@patch("requests.Session.head")
 @patch("artifact_searcher.artifact.create_artifact_name")
 @patch("artifact_searcher.artifact.version_to_folder_name")
 @patch("artifact_searcher.artifact.ThreadPoolExecutor")
@@ -141,7 +149,7 @@ def test_artifact_found(mock_nexus, mock_executor, mock_folder, mock_name, mock_
     mock_executor.assert_not_called()
 
 
-@patch("artifact_searcher.artifact.requests.head")
+@patch("requests.Session.head")
 @patch("artifact_searcher.artifact.create_artifact_name")
 @patch("artifact_searcher.artifact.version_to_folder_name")
 @patch("artifact_searcher.artifact.MavenConfig.is_nexus")
@@ -166,7 +174,7 @@ def test_artifact_not_found(mock_nexus, mock_folder, mock_name, mock_head):
     assert result is None
 
 
-@patch("artifact_searcher.artifact.requests.head")
+@patch("requests.Session.head")
 @patch("artifact_searcher.artifact.MavenConfig.is_nexus")
 def test_timestamped_artifact_found_in_exact_version_folder(mock_nexus, mock_head):
     mock_nexus.return_value = False
@@ -198,7 +206,7 @@ def mock_head_by_url(url, **_):
     assert result == exact_url
 
 
-@patch("artifact_searcher.artifact.requests.head")
+@patch("requests.Session.head")
 @patch("artifact_searcher.artifact.MavenConfig.is_nexus")
 def test_timestamped_artifact_not_found_when_all_folders_miss(mock_nexus, mock_head):
     mock_nexus.return_value = False
@@ -218,6 +226,45 @@ def test_timestamped_artifact_not_found_when_all_folders_miss(mock_nexus, mock_h
     assert result is None
 
 
+async def test_check_artifact_by_coordinates_async_resolves_snapshot(aiohttp_server):
+    async def maven_metadata_handler(request):
+        return web.Response(
+            text="""
+            <metadata>
+              <versioning>
+                <snapshotVersions>
+                  <snapshotVersion>
+                    <extension>zip</extension>
+                    <value>1.0.0-20240702.123456-1</value>
+                  </snapshotVersion>
+                </snapshotVersions>
+              </versioning>
+            </metadata>
+            """,
+            content_type="application/xml",
+        )
+
+    async def artifact_handler(request):
+        return web.Response(status=200)
+
+    app_web = web.Application()
+    app_web.router.add_get("/repository/repo/com/example/demo/1.0.0-SNAPSHOT/maven-metadata.xml",
+                           maven_metadata_handler)
+    app_web.router.add_get("/repository/repo/com/example/demo/1.0.0-SNAPSHOT/demo-1.0.0-20240702.123456-1.zip",
+                           artifact_handler)
+    server = await aiohttp_server(app_web)
+    repo_url = str(server.make_url("/repository/repo/"))
+
+    with patch("artifact_searcher.artifact.MavenConfig.is_nexus", return_value=False):
+        found = await check_artifact_by_coordinates_async(repo_url, GROUP_ID, ARTIFACT_ID, "1.0.0-SNAPSHOT",
+                                                          FileExtension.ZIP)
+        missing = await check_artifact_by_coordinates_async(repo_url, GROUP_ID, ARTIFACT_ID, "2.0.0-SNAPSHOT",
+                                                            FileExtension.ZIP)
+
+    assert found == f"{repo_url}com/example/demo/1.0.0-SNAPSHOT/demo-1.0.0-20240702.123456-1.zip"
+    assert missing is None
+
+
 async def test_retry_with_nexus_url_restores_domain_after_failed_retry(aiohttp_server):
 
     async def not_found_handler(request):
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+import responses
+import aiohttp
+from aiohttp import web
+
+from artifact_searcher import artifact
+from artifact_searcher.registry_client import ByteBudget, close_registry_client, get_registry_client
+from artifact_searcher.utils.models import ArtifactInfo
+
+CONTENT = os.urandom(256 * 1024 + 17)
+SHA1 = hashlib.sha1(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact, "WORKSPACE", tmp_path)
+    monkeypatch.setattr(artifact, "DOWNLOAD_CHUNK_SIZE", 4096)
+    return tmp_path
+
+
+@pytest.fixture
+async def registry_server(aiohttp_server):
+    checksums = {"sha1": f"{SHA1}  app.zip\n"}
+
+    async def artifact_handler(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for i in range(0, len(CONTENT), 10000):
+            await response.write(CONTENT[i:i + 10000])
+        await response.write_eof()
+        return response
+
+    async def checksum_handler(request):
+        algorithm = request.match_info["algorithm"]
+        if algorithm not in checksums:
+            return web.Response(status=404)
+        return web.Response(text=checksums[algorithm])
+
+    app_web = web.Application()
+    app_web.router.add_get("/repo/app.zip", artifact_handler)
+    app_web.router.add_get("/repo/app.zip.{algorithm}", checksum_handler)
+    server = await aiohttp_server(app_web)
+    yield server, checksums
+    await close_registry_client()
+
+
+def artifact_info(server) -> ArtifactInfo:
+    return ArtifactInfo(url=str(server.make_url("/repo/app.zip")), app_name="app", app_version="1.0")
+
+
+def downloaded_files(workspace):
+    return sorted(f for _, _, files in os.walk(workspace) for f in files)
+
+
+async def test_download_is_streamed_within_byte_budget(registry_server, workspace):
+    server, _ = registry_server
+    budget = get_registry_client().download_budget
+    budget.limit = 8192
+    peak = 0
+    original_reserve = budget.reserve
+
+    def tracking_reserve(size):
+        nonlocal peak
+        peak = max(peak, budget.used + size)
+        return original_reserve(size)
+
+    budget.reserve = tracking_reserve
+    results = await artifact.download_all_async([artifact_info(server)])
+
+    with open(results[0].local_path, "rb") as f:
+        assert f.read() == CONTENT
+    assert peak <= 8192
+    assert budget.used == 0
+    assert downloaded_files(workspace) == ["app.zip"]
+
+
+async def test_download_verifies_published_checksum(registry_server, workspace, monkeypatch):
+    server, _ = registry_server
+    monkeypatch.setattr(artifact, "VERIFY_DOWNLOAD_CHECKSUM", True)
+
+    results = await artifact.download_all_async([artifact_info(server)])
+
+    assert os.path.basename(results[0].local_path) == "app.zip"
+
+
+async def test_checksum_mismatch_keeps_no_partial_file(registry_server, workspace, monkeypatch):
+    server, checksums = registry_server
+    checksums["sha256"] = "0" * 64
+    monkeypatch.setattr(artifact, "VERIFY_DOWNLOAD_CHECKSUM", True)
+
+    with pytest.raises(ValueError, match="not downloaded"):
+        await artifact.download_all_async([artifact_info(server)])
+
+    assert downloaded_files(workspace) == []
+
+
+async def test_byte_budget_blocks_until_released():
+    budget = ByteBudget(10)
+    async with budget.reserve(8):
+        waiter = asyncio.create_task(budget.reserve(8).__aenter__())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+    await asyncio.wait_for(waiter, 1)
+    assert budget.used == 8
+
+
+@responses.activate
+def test_sync_download_streams_to_target_with_checksum(tmp_path, monkeypatch):
+    url = "https://repo.example.com/repo/app.zip"
+    responses.get(url + ".sha256", status=404)
+    responses.get(url + ".sha1", body=SHA1)
+    responses.get(url, body=CONTENT)
+    monkeypatch.setattr(artifact, "VERIFY_DOWNLOAD_CHECKSUM", True)
+    target = tmp_path / "zips" / "app.zip"
+
+    assert artifact.download(url, str(target)) == str(target)
+    assert target.read_bytes() == CONTENT
+    assert os.listdir(target.parent) == ["app.zip"]
+
+
+@responses.activate
+def test_sync_download_fails_on_checksum_mismatch(tmp_path, monkeypatch):
+    url = "https://repo.example.com/repo/app.zip"
+    responses.get(url + ".sha256", body="ab" * 32)
+    responses.get(url, body=CONTENT)
+    monkeypatch.setattr(artifact, "VERIFY_DOWNLOAD_CHECKSUM", True)
+    target = tmp_path / "app.zip"
+    target.write_bytes(b"previous")
+
+    with pytest.raises(ValueError, match="checksum mismatch"):
+        artifact.download(url, str(target))
+    assert target.read_bytes() == b"previous"
+    assert os.listdir(tmp_path) == ["app.zip"]
+
+
+async def test_json_content_is_downloaded_over_registry_client(aiohttp_server):
+    async def sd_handler(request):
+        return web.Response(body=b'{"applications": [{"version": "app:1.0"}]}', content_type="application/octet-stream")
+
+    app_web = web.Application()
+    app_web.router.add_get("/repo/sd.json", sd_handler)
+    server = await aiohttp_server(app_web)
+    session = get_registry_client().with_headers(None)
+    try:
+        assert await artifact.download_json_content_async(session, str(server.make_url("/repo/sd.json"))) == {
+            "applications": [{"version": "app:1.0"}]}
+        with pytest.raises(aiohttp.ClientResponseError):
+            await artifact.download_json_content_async(session, str(server.make_url("/repo/missing.json")))
+    finally:
+        await close_registry_client()
@@ -0,0 +1,94 @@
+import pytest
+from aiohttp import web
+
+from artifact_searcher import artifact
+from artifact_searcher.registry_client import RegistryClient, close_registry_client, get_registry_client
+from artifact_searcher.utils import models
+from artifact_searcher.utils.models import ArtifactInfo, FileExtension
+
+
+@pytest.fixture
+async def registry_server(aiohttp_server):
+    seen = {"peers": set(), "auth": []}
+
+    async def handler(request):
+        seen["peers"].add(request.transport.get_extra_info("peername"))
+        seen["auth"].append(request.headers.get("Authorization"))
+        if "missing" in request.path:
+            return web.Response(status=404)
+        return web.Response(body=b"{}", content_type="application/json")
+
+    app_web = web.Application()
+    app_web.router.add_route("*", "/{path_info:.*}", handler)
+    server = await aiohttp_server(app_web)
+    yield server, seen
+    await close_registry_client()
+
+
+def create_app(base_url: str) -> models.Application:
+    mvn_cfg = models.MavenConfig(
+        target_snapshot="snapshots",
+        target_staging="staging",
+        target_release="releases",
+        repository_domain_name=base_url,
+    )
+    dcr_cfg = models.DockerConfig(
+        snapshot_uri="https://docker.example.com/snapshot",
+        staging_uri="https://docker.example.com/staging",
+        release_uri="https://docker.example.com/release",
+        group_uri="https://docker.example.com/group",
+        snapshot_repo_name="snapshot-repo",
+        staging_repo_name="staging-repo",
+        release_repo_name="release-repo",
+        group_name="test-group",
+    )
+    reg = models.Registry(name="registry", maven_config=mvn_cfg, docker_config=dcr_cfg)
+    return models.Application(name="app", artifact_id="app", group_id="com.example", registry=reg)
+
+
+async def test_client_is_shared_within_event_loop():
+    client = get_registry_client()
+    assert get_registry_client() is client
+    session = client.session
+    assert client.session is session
+    await close_registry_client()
+    assert get_registry_client() is not client
+    await close_registry_client()
+
+
+async def test_checks_reuse_pooled_connections(registry_server):
+    server, seen = registry_server
+    app = create_app(str(server.make_url("/repository/")))
+
+    for _ in range(10):
+        result = await artifact.check_artifact_async(app, FileExtension.JSON, "1.0.0")
+        assert result is not None
+
+    assert len(seen["auth"]) >= 10
+    assert len(seen["peers"]) < len(seen["auth"])
+
+
+async def test_download_groups_share_session_with_own_auth(registry_server, tmp_path, monkeypatch):
+    server, seen = registry_server
+    monkeypatch.setattr(artifact, "WORKSPACE", tmp_path)
+    artifacts = [
+        ArtifactInfo(url=str(server.make_url(f"/repo/app-{i}.json")), app_name=f"app-{i}", app_version="1.0",
+                     auth_headers={"Authorization": f"Basic user-{i % 2}"})
+        for i in range(4)
+    ]
+
+    results = await artifact.download_all_async(artifacts)
+
+    assert [r.app_name for r in results] == ["app-0", "app-1", "app-2", "app-3"]
+    assert sorted(seen["auth"]) == ["Basic user-0", "Basic user-0", "Basic user-1", "Basic user-1"]
+
+
+async def test_concurrent_requests_are_limited(registry_server):
+    server, _ = registry_server
+    async with RegistryClient(max_concurrent_requests=1) as client:
+        session = client.with_headers(None)
+        async with session.get(str(server.make_url("/repo/a.json"))):
+            assert client._semaphore.locked()
+        assert not client._semaphore.locked()
+        async with session.head(str(server.make_url("/repo/missing.json"))) as response:
+            assert response.status == 404
@@ -4,4 +4,18 @@
 
 TCP_CONNECTION_LIMIT = int(getenv("TCP_CONNECTION_LIMIT", 100))
 
+# 0 means no per host limit, only TCP_CONNECTION_LIMIT is applied
+TCP_CONNECTION_LIMIT_PER_HOST = int(getenv("TCP_CONNECTION_LIMIT_PER_HOST", 0))
+
+TCP_KEEPALIVE_TIMEOUT = float(getenv("TCP_KEEPALIVE_TIMEOUT", 30))
+
+REGISTRY_MAX_CONCURRENT_REQUESTS = int(getenv("REGISTRY_MAX_CONCURRENT_REQUESTS", TCP_CONNECTION_LIMIT))
+
+DOWNLOAD_CHUNK_SIZE = int(getenv("DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+
+# upper bound for artifact bytes held in memory by all concurrent downloads together
+DOWNLOAD_MAX_IN_FLIGHT_BYTES = int(getenv("DOWNLOAD_MAX_IN_FLIGHT_BYTES", 64 * 1024 * 1024))
+
+VERIFY_DOWNLOAD_CHECKSUM = getenv("VERIFY_DOWNLOAD_CHECKSUM", "false").lower() == "true"
+
 METADATA_XML = "maven-metadata.xml"
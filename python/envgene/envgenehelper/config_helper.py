@@ -16,6 +16,7 @@
 
 FERNET_ID = "Fernet"
 SOPS_ID = "SOPS"
+SOPS_NATIVE_ID = "SOPSNative"
 
 REGDEF_V2_VERSION = "2.0"
 
@@ -40,7 +41,8 @@ def validate_regdef_or_fail(yaml_file_path: str):
     """Validate a registry definition YAML file (V1 or V2) by path"""
     content = openYaml(yaml_file_path)
     schema = get_regdef_schema_for_content(content)
-    validate_yaml_by_scheme_or_fail(yaml_file_path=yaml_file_path, input_schema_content=schema)
+    validate_yaml_by_scheme_or_fail(yaml_file_path=yaml_file_path, input_yaml_content=content,
+                                    input_schema_content=schema)
 
 
 def get_schema(schema_name):
@@ -76,14 +78,14 @@ def validate_config_file(config_yaml):
         if crypt_backend == FERNET_ID and secret_key == "":
             raise Exception(
                 f'Following CI/CD variables are not set: \n{SECRET_KEY_ID}.\nThis variable is mandatory for crypt_backend: {FERNET_ID}')
-        if crypt_backend == SOPS_ID and (envgene_age_private_key == "" or public_age_keys == ""):
+        if crypt_backend in (SOPS_ID, SOPS_NATIVE_ID) and (envgene_age_private_key == "" or public_age_keys == ""):
             if envgene_age_private_key == "":
                 empty_parameters.append(ENVGENE_AGE_PRIVATE_KEY_ID)
             if public_age_keys == "":
                 empty_parameters.append(PUBLIC_AGE_KEYS_ID)
             logger.info(f'list_of_empty_parameters: {empty_parameters}')
             raise Exception(
-                f'Following CI/CD variables are not set: \n{empty_parameters}.\nThese variables are mandatory for crypt_backend: {SOPS_ID}')
+                f'Following CI/CD variables are not set: \n{empty_parameters}.\nThese variables are mandatory for crypt_backend: {crypt_backend}')
 
 
 @lru_cache(maxsize=1)
@@ -1,10 +1,11 @@
 import re
 import os
 from pathlib import Path
+from typing import NamedTuple
 
 from envgenehelper import crypt, getenv_with_error, get_env_instances_dir, findAllYamlsInDir, openYaml, getEnvCredentialsPath
 from envgenehelper.errors import ValidationError
-from envgenehelper.yaml_helper import store_value_to_yaml, writeYamlToFile, beautifyYaml, yaml
+from envgenehelper.yaml_helper import store_value_to_yaml, writeBeautifiedYaml, yaml
 
 from .logger import logger
 
@@ -19,25 +20,54 @@
 CONCEALED_SECRET_MASK = "*****"
 
 
+# ${creds.get("id").property} macro, one per line: from the first "${" to the last "}" of the line
+_CRED_MACRO_PATTERN = re.compile(r'\$\{.*creds\.get\((.*)\).*\}')
+_CRED_KEY_MACRO_PATTERN = re.compile(r'#(creds|credscl|credsns){(.+)\s*,\s*(.+)}')
+_CRED_MACRO_TYPE_PATTERNS = (
+    (CRED_TYPE_USERPASS, re.compile(r'\$\{.*creds\.get.*\.(?:username|password)\}')),
+    (CRED_TYPE_SECRET, re.compile(r'\$\{.*creds\.get.*\.secret\}')),
+    (CRED_TYPE_VAULT, re.compile(r'\$\{.*creds\.get.*\.(?:roleId|secretId|path|namespace)\}')),
+)
+
+
+class CredMacro(NamedTuple):
+    # raw credentialsId from the macro, empty if it can't be parsed
+    cred_id: str
+    cred_type: str
+    # creds, credscl or credsns for #creds{} macros in parameter key, empty for ${creds.get()} macros
+    key_macro: str
+    source: str
+
+
+def scan_cred_macros(param_key, param_value) -> list[CredMacro]:
+    """Finds all credential macros of a parameter in one pass over its value."""
+    if not isinstance(param_value, str):
+        return []
+    result = []
+    credValue = param_value.replace("'", "\"")
+    # if we are iterationg through array, than cred macros can't be in key (it is integer)
+    if isinstance(param_key, str):
+        compact_key = param_key.replace(" ", "")
+        key_match = _CRED_KEY_MACRO_PATTERN.match(compact_key) if "#creds" in compact_key else None
+        if key_match:
+            result.append(CredMacro(credValue, CRED_TYPE_USERPASS, key_match.group(1), credValue))
+            credValue = _remove_first_cred_from_input(credValue)
+    if "creds.get" not in credValue:
+        return result
+    for line in credValue.split("\n"):
+        if "creds.get" not in line:
+            continue
+        match = _CRED_MACRO_PATTERN.search(line)
+        macro = match.group(0) if match else line
+        cred_type = next((t for t, pattern in _CRED_MACRO_TYPE_PATTERNS if pattern.search(macro)), None)
+        if cred_type:
+            cred_id = _normalize_cred_id(match.group(1)) if match else ""
+            result.append(CredMacro(cred_id, cred_type, "", macro))
+    return result
+
+
 def check_is_cred(param_key, param_value):
-    if isinstance(param_value, str):
-        # if we are iterationg through array, than cred macros can't be in key (it is integer)
-        credKey = param_key.replace(" ", "") if isinstance(param_key, str) else ""
-        credValue = param_value.replace("'", "\"")
-        if re.match(r'#creds{(.+)\s*,\s*(.+)}', credKey) or re.match(r'#credscl{(.+)\s*,\s*(.+)}', credKey) or re.match(
-                r'#credsns{(.+)\s*,\s*(.+)}', credKey):
-            return True
-        elif re.search(r'\${.*creds\.get.*\.username}', credValue) or re.search(r'\${.*creds\.get.*\.password}',
-                                                                                credValue):
-            return True
-        elif re.search(r'\${.*creds\.get.*\.secret}', credValue):
-            return True
-        elif re.search(r'\${.*creds\.get.*\.roleId}', credValue) or re.search(r'\${.*creds\.get.*\.secretId}',
-                                                                              credValue) \
-                or re.search(r'\${.*creds\.get.*\.path}', credValue) or re.search(r'\${.*creds\.get.*\.namespace}',
-                                                                                  credValue):
-            return True
-    return False
+    return len(scan_cred_macros(param_key, param_value)) > 0
 
 
 def create_cred_definition(cred_id, cred_type):
@@ -51,66 +81,33 @@ def get_cred_list_from_param(param_key, param_value, update_cred_id=False, tenan
                              namespace_name=""):
     # as param value can contain multiple creds (e.g. json format or multiline string) we are returning list
     result = []
-    _process_cred_in_string(param_key, param_value, tenant_name, cloud_name, namespace_name, result, update_cred_id)
+    for macro in scan_cred_macros(param_key, param_value):
+        credId = macro.cred_id
+        if not credId:
+            if not macro.key_macro:
+                logger.error(f"Can't obtain credId from: {macro.source}")
+            logger.error(f"Can't parse cred from param: {param_key}={param_value}")
+            raise ReferenceError(f"Error during credentials preparation. See logs above.")
+        if macro.key_macro == "credscl" and update_cred_id:
+            credId = tenant_name + "-" + cloud_name + "-" + credId
+        elif macro.key_macro == "credsns" and update_cred_id:
+            if not namespace_name:
+                logger.error(
+                    f"Namespace level cred {credId} is defined not on NAMESPACE level. Parameter: {param_key}={param_value}")
+                raise ReferenceError(f"Error during credentials preparation. See logs above.")
+            credId = tenant_name + "-" + cloud_name + "-" + namespace_name + "-" + credId
+        result.append(create_cred_definition(credId, macro.cred_type))
     return result
 
 
-def _process_cred_in_string(param_key, param_value, tenant_name, cloud_name, namespace_name, cred_list, update_cred_id):
-    while check_is_cred(param_key, param_value):
-        credDef, param_key, param_value = _get_cred_from_string(param_key, param_value, tenant_name, cloud_name,
-                                                                namespace_name, update_cred_id)
-        cred_list.append(credDef)
-
-
-def _get_cred_from_string(param_key, param_value, tenant_name, cloud_name, namespace_name, update_cred_id):
-    credId = ""
-    credType = ""
-    if isinstance(param_value, str):
-        # if we are iterationg through array, than cred macros can't be in key (it is integer)
-        credKey = param_key.replace(" ", "") if isinstance(param_key, str) else ""
-        credValue = param_value.replace("'", "\"")
-        if re.match(r'#creds{(.+)\s*,\s*(.+)}', credKey):
-            credId = credValue
-            credType = CRED_TYPE_USERPASS
-        elif re.match(r'#credscl{(.+)\s*,\s*(.+)}', credKey):
-            credId = tenant_name + "-" + cloud_name + "-" + credValue if update_cred_id else credValue
-            credType = CRED_TYPE_USERPASS
-        elif re.match(r'#credsns{(.+)\s*,\s*(.+)}', credKey):
-            if update_cred_id:
-                if not namespace_name:
-                    logger.error(
-                        f"Namespace level cred {credValue} is defined not on NAMESPACE level. Parameter: {param_key}={param_value}")
-                    raise ReferenceError(f"Error during credentials preparation. See logs above.")
-                credId = tenant_name + "-" + cloud_name + "-" + namespace_name + "-" + credValue
-            else:
-                credId = credValue
-            credType = CRED_TYPE_USERPASS
-        elif re.search(r'\${.*creds\.get.*\.username}', credValue) or re.search(r'\${.*creds\.get.*\.password}',
-                                                                                credValue):
-            credId = _get_cred_id_from_cred_macros(credValue)
-            credType = CRED_TYPE_USERPASS
-        elif re.search(r'\${.*creds\.get.*\.secret}', credValue):
-            credId = _get_cred_id_from_cred_macros(credValue)
-            credType = CRED_TYPE_SECRET
-        elif re.search(r'\${.*creds\.get.*\.roleId}', credValue) or re.search(r'\${.*creds\.get.*\.secretId}',
-                                                                              credValue) \
-                or re.search(r'\${.*creds\.get.*\.path}', credValue) or re.search(r'\${.*creds\.get.*\.namespace}',
-                                                                                  credValue):
-            credId = _get_cred_id_from_cred_macros(credValue)
-            credType = CRED_TYPE_VAULT
-    if (credId):
-        returnKey = ""
-        returnValue = _remove_first_cred_from_input(credValue)
-        return create_cred_definition(credId, credType), returnKey, returnValue
-    else:
-        logger.error(f"Can't parse cred from param: {param_key}={param_value}")
-        raise ReferenceError(f"Error during credentials preparation. See logs above.")
+def _normalize_cred_id(raw_cred_id):
+    return raw_cred_id.strip().strip("\\\"").strip("\"")
 
 
 def _get_cred_id_from_cred_macros(value):
-    match = re.search(r'.*\${.*creds\.get\((.*)\).*}.*', value)
+    match = _CRED_MACRO_PATTERN.search(value)
     if (match):
-        return match.group(1).strip().strip("\\\"").strip("\"")
+        return _normalize_cred_id(match.group(1))
     else:
         logger.error(f"Can't obtain credId from: {value}")
         raise ReferenceError(f"Error during credentials preparation. See logs above.")
@@ -124,21 +121,15 @@ def get_cred_id_from_cred_macros(value):
 
 
 def _remove_first_cred_from_input(value):
-    return re.sub(r'\${.*creds\.get\(.*\).*}', "", value, 1)
+    return _CRED_MACRO_PATTERN.sub("", value, 1)
 
 
 # #creds, #credscl, #credsns macroses are not supported
 # vault creds are not supported
 def expand_cred_macro_and_return_value(param_key, param_value, env_creds):
     credValue = param_value.strip()
-    credKey = param_key.replace(" ", "") if isinstance(param_key, str) else ""
-    if re.match(r'#creds{(.+)\s*,\s*(.+)}', credKey) or re.match(r'#credscl{(.+)\s*,\s*(.+)}', credKey) or re.match(
-            r'#credsns{(.+)\s*,\s*(.+)}', credKey):
-        logger.error(f"Credential macros for parameter is not supported: {param_key}={param_value}")
-        raise ReferenceError(f"Error during credentials preparation. See logs above.")
-    elif re.search(r'\${.*creds\.get.*\.roleId}', credValue) or re.search(r'\${.*creds\.get.*\.secretId}', credValue) \
-            or re.search(r'\${.*creds\.get.*\.path}', credValue) or re.search(r'\${.*creds\.get.*\.namespace}',
-                                                                              credValue):
+    macros = scan_cred_macros(param_key, param_value)
+    if any(macro.key_macro or macro.cred_type == CRED_TYPE_VAULT for macro in macros):
         logger.error(f"Credential macros for parameter is not supported: {param_key}={param_value}")
         raise ReferenceError(f"Error during credentials preparation. See logs above.")
     credList = get_cred_list_from_param(param_key, param_value)
@@ -314,5 +305,4 @@ def copy_creds_to_env_creds_file(env_dir, creds_yaml_content, comment, creds_sch
     for key, value in creds_yaml_content.items() :
         store_value_to_yaml(env_creds_yaml, key, value)
     # storing credentials yaml
-    writeYamlToFile(env_credentials_path, env_creds_yaml)
-    beautifyYaml(env_credentials_path, creds_schema)
\ No newline at end of file
+    writeBeautifiedYaml(env_credentials_path, env_creds_yaml, creds_schema)
\ No newline at end of file
@@ -1,37 +1,58 @@
+import hashlib
+import json
 import os
 import re
+import shutil
+import tempfile
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from os import getenv, path
 from typing import Callable
 
-from .config_helper import get_envgene_config_yaml
+from .config_helper import get_envgene_config_yaml, PUBLIC_AGE_KEYS_ID, SECRET_KEY_ID
 from .yaml_helper import openYaml, get_empty_yaml
-from .file_helper import check_file_exists, get_files_with_filter
+from .file_helper import check_file_exists
 from .logger import logger
 from .collections_helper import split_multi_value_param
+from .parallel_helper import run_in_parallel
 
 from .crypt_backends.fernet_handler import crypt_Fernet, extract_value_Fernet, is_encrypted_Fernet
 from .crypt_backends.sops_handler import crypt_SOPS, extract_value_SOPS, is_encrypted_SOPS
+from .crypt_backends.sops_native_handler import crypt_SOPS_native, extract_value_SOPS_native
 
 BASE_DIR = getenv('CI_PROJECT_DIR', os.getcwd())
 VALID_EXTENSIONS = re.compile(r'\.ya?ml$')
 TARGET_REGEX = re.compile(r'(^credentials$|creds$)')
 TARGET_DIR_REGEX = re.compile(r'/[Cc]redentials(/|$)')
 TARGET_PARENT_DIRS = re.compile(r'/(configuration|environments)(/|$)')
+# tmp/ is passed between pipeline jobs, so the skip list recorded at decryption is available at encryption
+CRED_SKIP_LIST_DIR = path.join(BASE_DIR, 'tmp', 'cred_skip_list')
+CRED_SKIP_LIST_MANIFEST = 'manifest.json'
+FERNET_PARALLEL_THRESHOLD = 16
+CRED_FILES_MANIFEST = path.join(BASE_DIR, 'tmp', 'cred_files_manifest.json')
+CRED_FILES_MANIFEST_VERSION = 1
+# directories that never contain cred files are not walked
+CRED_WALK_PRUNED_DIRS = frozenset({'.git', '__pycache__', 'node_modules'})
+# directories changed this recently are listed again next time, later changes may keep the same mtime
+CRED_MANIFEST_MTIME_GRACE_NS = 2 * 10 ** 9
+
+SOPS_BACKENDS = ('SOPS', 'SOPSNative')
 
 CRYPT_FUNCTIONS = {
     'SOPS': crypt_SOPS,
+    'SOPSNative': crypt_SOPS_native,
     'Fernet': crypt_Fernet
 }
 
 IS_ENCRYPTED_FUNCTIONS = {
     'SOPS': is_encrypted_SOPS,
+    'SOPSNative': is_encrypted_SOPS,
     'Fernet': is_encrypted_Fernet,
 }
 
 EXTRACT_FUNCTIONS = {
     'SOPS': extract_value_SOPS,
+    'SOPSNative': extract_value_SOPS_native,
     'Fernet': extract_value_Fernet
 }
 
@@ -121,11 +142,100 @@ def is_cred_file(fp: str) -> bool:
     return False
 
 
+class CredFilesManifest:
+    """
+    Cred files and subdirectories of every walked directory, keyed by directory mtime.
+    Adding, removing or renaming an entry changes the mtime of its directory, so only changed
+    directories are listed again, the rest of the tree costs one stat per directory.
+    """
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self._dirs = {}
+        self._visited = {}
+        self.changed = False
+        try:
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == CRED_FILES_MANIFEST_VERSION:
+                self._dirs = manifest['dirs']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def find_cred_files(self, source: str) -> set[str]:
+        cred_files = set()
+        stack = [source] if path.isdir(source) else []
+        now_ns = time.time_ns()
+        while stack:
+            dir_path = stack.pop()
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
+            entry = self._dirs.get(dir_path)
+            if entry is None or entry['mtime_ns'] != mtime_ns:
+                listed = _list_cred_dir(dir_path)
+                # a new mtime with the same content is not saved, saving changes mtime of the manifest directory
+                if entry is None or (entry['dirs'], entry['cred_files']) != (listed['dirs'], listed['cred_files']):
+                    self.changed = True
+                entry = listed
+                entry['mtime_ns'] = mtime_ns if now_ns - mtime_ns > CRED_MANIFEST_MTIME_GRACE_NS else None
+            self._visited[dir_path] = entry
+            cred_files.update(path.join(dir_path, name) for name in entry['cred_files'])
+            stack.extend(path.join(dir_path, name) for name in entry['dirs'])
+        return cred_files
+
+    def _is_under_visited(self, dir_path: str) -> bool:
+        # walks of visited directories are complete, their missing subdirectories were removed
+        parent = path.dirname(dir_path)
+        while parent != dir_path:
+            if parent in self._visited:
+                return True
+            dir_path, parent = parent, path.dirname(parent)
+        return False
+
+    def save(self):
+        stale = [p for p in self._dirs if p not in self._visited and self._is_under_visited(p)]
+        if not self.changed and not stale:
+            return
+        dirs = {p: e for p, e in self._dirs.items() if p not in stale}
+        dirs.update(self._visited)
+        try:
+            os.makedirs(path.dirname(self.manifest_path), exist_ok=True)
+            data = json.dumps({'version': CRED_FILES_MANIFEST_VERSION, 'dirs': dirs}).encode('utf-8')
+            _write_bytes_atomically(self.manifest_path, data)
+        except OSError as e:
+            logger.warning(f'Failed to save cred files manifest {self.manifest_path}: {e}')
+
+
+def _list_cred_dir(dir_path: str) -> dict:
+    # the same checks as is_cred_file, parent directory checks are done once per directory
+    in_target_parent = TARGET_PARENT_DIRS.search(dir_path)
+    in_cred_dir = TARGET_DIR_REGEX.search(dir_path)
+    dirs, cred_files = [], []
+    try:
+        entries = list(os.scandir(dir_path))
+    except OSError:
+        entries = []
+    for entry in entries:
+        if entry.is_dir():
+            # like os.walk, symlinked directories are not followed
+            if entry.name not in CRED_WALK_PRUNED_DIRS and not entry.is_symlink():
+                dirs.append(entry.name)
+        elif in_target_parent and VALID_EXTENSIONS.search(entry.name):
+            if in_cred_dir or TARGET_REGEX.search(path.splitext(entry.name)[0]):
+                cred_files.append(entry.name)
+    return {'dirs': sorted(dirs), 'cred_files': sorted(cred_files)}
+
+
 def get_all_necessary_cred_files() -> set[str]:
+    manifest = CredFilesManifest(CRED_FILES_MANIFEST)
     env_names = getenv("ENV_NAMES", None)
     if not env_names:
         logger.info("ENV_NAMES not set, running in test mode")
-        return get_files_with_filter(BASE_DIR, is_cred_file)
+        cred_files = manifest.find_cred_files(BASE_DIR)
+        manifest.save()
+        return cred_files
     env_names_list = split_multi_value_param(env_names)
 
     sources = set()
@@ -144,11 +254,11 @@ def get_all_necessary_cred_files() -> set[str]:
         source = path.join(BASE_DIR, source)
         if not path.exists(source):
             continue
-        cred_files.update(get_files_with_filter(source, is_cred_file))
+        cred_files.update(manifest.find_cred_files(source))
+    manifest.save()
 
     return cred_files
 
-
 def is_encrypted(file_path, crypt_backend=None):
     CRYPT_BACKEND = get_crypt_backend()
     crypt_backend = crypt_backend if crypt_backend else CRYPT_BACKEND
@@ -162,41 +272,100 @@ def check_for_encrypted_files(files):
             raise ValueError(err_msg.format(f))
 
 
-def _batch_cred_op(files, op_func, **kwargs):
+def _batch_cred_op(files, op_func, **kwargs) -> dict:
     backend = kwargs.get('crypt_backend') or get_crypt_backend()
     if backend == 'Fernet':
-        for file_path in sorted(files):
-            op_func(file_path, **{**kwargs, 'load_result': False})
-        return
-    _parallel_cred_op(files, op_func, **kwargs)
+        if len(files) < FERNET_PARALLEL_THRESHOLD:
+            return {file_path: op_func(file_path, **{**kwargs, 'load_result': False}) for file_path in sorted(files)}
+        # Fernet is CPU bound in Python code, so threads don't help, the files are spread over worker processes
+        return _parallel_cred_op(files, op_func, use_processes=True, **kwargs)
+    return _parallel_cred_op(files, op_func, **kwargs)
 
 
-def _parallel_cred_op(files, op_func, **kwargs):
+def _parallel_cred_op(files, op_func, *, use_processes=False, **kwargs) -> dict:
     file_list = sorted(files)
     if not file_list:
-        return
-    if kwargs.get('minimize_diff'):
-        max_workers = 1
+        return {}
+    results = run_in_parallel(partial(op_func, **{**kwargs, 'load_result': False}), file_list, op_func.__name__,
+                              max_workers=1 if kwargs.get('minimize_diff') else None, use_processes=use_processes)
+    return dict(zip(file_list, results))
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read_bytes(file_path) -> bytes:
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def _write_bytes_atomically(file_path, data: bytes):
+    fd, tmp_path = tempfile.mkstemp(dir=path.dirname(path.abspath(file_path)), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+
+def _keys_fingerprint(backend, secret_key=None, public_key=None, **kwargs) -> str:
+    """Ciphertext is restored only when it was made with the same keys, so that key rotation re-encrypts files"""
+    if backend == 'Fernet':
+        key = secret_key or getenv(SECRET_KEY_ID, '')
     else:
-        max_workers = min(len(file_list), os.cpu_count() or 2)
-    errors = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_file = {
-            executor.submit(op_func, f, **{**kwargs, 'load_result': False}): f
-            for f in file_list
-        }
-        for future in as_completed(future_to_file):
-            file_path = future_to_file[future]
-            try:
-                future.result()
-            except Exception as e:
-                errors.append((file_path, e))
+        key = public_key or getenv(PUBLIC_AGE_KEYS_ID, '')
+    return _sha256(f'{backend}:{key}'.encode())
+
+
+def _read_skip_list() -> dict:
+    manifest_path = path.join(CRED_SKIP_LIST_DIR, CRED_SKIP_LIST_MANIFEST)
+    if not path.isfile(manifest_path):
+        return {}
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
 
-    if errors:
-        summary = '; '.join(
-            f'{file_path} ({type(exc).__name__}: {exc})' for file_path, exc in errors
-        )
-        raise RuntimeError(f'{op_func.__name__} failed: {summary}') from errors[0][1]
+def _write_skip_list(skip_list: dict):
+    shutil.rmtree(CRED_SKIP_LIST_DIR, ignore_errors=True)
+    if not skip_list['files']:
+        return
+    os.makedirs(CRED_SKIP_LIST_DIR)
+    manifest = {**skip_list, 'files': {}}
+    for file_path, entry in skip_list['files'].items():
+        ciphertext_name = _sha256(file_path.encode())
+        _write_bytes_atomically(path.join(CRED_SKIP_LIST_DIR, ciphertext_name), entry['ciphertext'])
+        manifest['files'][file_path] = {'plaintext_sha256': entry['plaintext_sha256'], 'ciphertext': ciphertext_name}
+    with open(path.join(CRED_SKIP_LIST_DIR, CRED_SKIP_LIST_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _restore_unchanged_ciphertext(file_path, skip_list: dict) -> bool:
+    entry = skip_list.get('files', {}).get(path.abspath(file_path))
+    if not entry or not check_file_exists(file_path):
+        return False
+    ciphertext_path = path.join(CRED_SKIP_LIST_DIR, entry['ciphertext'])
+    if not path.isfile(ciphertext_path) or _sha256(_read_bytes(file_path)) != entry['plaintext_sha256']:
+        return False
+    _write_bytes_atomically(file_path, _read_bytes(ciphertext_path))
+    return True
+
+
+def _decrypt_remembering_ciphertext(file_path, **kwargs):
+    """Decrypts the file, returns skip list entry with its ciphertext and plaintext hash"""
+    crypt_backend = kwargs.get('crypt_backend')
+    was_encrypted = check_file_exists(file_path) and is_encrypted(file_path, crypt_backend)
+    ciphertext = _read_bytes(file_path) if was_encrypted else None
+    decrypt_file(file_path, **kwargs)
+    if ciphertext is None or is_encrypted(file_path, crypt_backend):
+        return None
+    return {'plaintext_sha256': _sha256(_read_bytes(file_path)), 'ciphertext': ciphertext}
+
+
+def _encrypt_or_restore_ciphertext(file_path, cred_skip_list=None, **kwargs):
+    """Returns True when original ciphertext of unchanged file was restored instead of encryption"""
+    if cred_skip_list and _restore_unchanged_ciphertext(file_path, cred_skip_list):
+        return True
+    encrypt_file(file_path, **kwargs)
+    return False
 
 
 def decrypt_all_cred_files_for_env(**kwargs):
@@ -205,9 +374,13 @@ def decrypt_all_cred_files_for_env(**kwargs):
         check_for_encrypted_files(files)
         return
 
-    backend = get_crypt_backend()
+    backend = kwargs.get('crypt_backend') or get_crypt_backend()
     t0 = time.perf_counter()
-    _batch_cred_op(files, decrypt_file, **kwargs)
+    results = _batch_cred_op(files, _decrypt_remembering_ciphertext, **kwargs)
+    _write_skip_list({
+        'fingerprint': _keys_fingerprint(backend, **kwargs),
+        'files': {path.abspath(f): entry for f, entry in results.items() if entry},
+    })
     elapsed = time.perf_counter() - t0
     logger.info(f'Decrypted {len(files)} cred files in {elapsed:.3f}s (backend={backend})')
     logger.debug("Decrypted next cred files:")
@@ -218,12 +391,20 @@ def encrypt_all_cred_files_for_env(**kwargs):
     files = get_all_necessary_cred_files()
     logger.debug("Attempting to encrypt(if crypt is true) next files:")
     logger.debug(files)
-    backend = get_crypt_backend()
+    backend = kwargs.get('crypt_backend') or get_crypt_backend()
+    is_crypt = kwargs.get('is_crypt')
+    will_encrypt = kwargs.get('ignore_is_crypt') or (is_crypt if is_crypt is not None else get_crypt())
+    skip_list = _read_skip_list() if will_encrypt else {}
+    if skip_list.get('fingerprint') != _keys_fingerprint(backend, **kwargs):
+        skip_list = {}
+
     t0 = time.perf_counter()
-    _batch_cred_op(files, encrypt_file, **kwargs)
+    results = _batch_cred_op(files, _encrypt_or_restore_ciphertext, cred_skip_list=skip_list, **kwargs)
+    shutil.rmtree(CRED_SKIP_LIST_DIR, ignore_errors=True)
+    restored = sum(1 for is_restored in results.values() if is_restored)
     elapsed = time.perf_counter() - t0
-    logger.info(f'Encrypted {len(files)} cred files in {elapsed:.3f}s (backend={backend})')
-
+    logger.info(f'Encrypted {len(files) - restored} cred files, restored original ciphertext of '
+                f'{restored} unchanged cred files in {elapsed:.3f}s (backend={backend})')
 
 def get_crypt():
     config = get_envgene_config_yaml()
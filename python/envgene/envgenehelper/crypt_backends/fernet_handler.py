@@ -1,4 +1,6 @@
 import os
+import re
+from functools import lru_cache
 from typing import Any
 from cryptography.fernet import Fernet
 
@@ -8,6 +10,16 @@
 
 from .constants import *
 
+# encrypted values are quoted, as plain YAML scalars can't start with '['.
+# A plain key ends at the first ': ', so values containing ': [encrypted:...' are not taken for encrypted ones
+FERNET_ENCRYPTED_LINE = re.compile(
+    r"""^\s*(?:-\s+)?(?:"[^"]*"|'[^']*'|[^\s#'"](?:[^#:]|:(?!\s))*?):\s+['"]?""" + re.escape(FERNET_STR))
+
+
+@lru_cache(maxsize=4)
+def _get_fernet(secret_key: str) -> Fernet:
+    return Fernet(secret_key)
+
 def _apply_Fernet_to_dict(data: dict, fernet:Fernet, fernet_func) -> dict:
     for key, value in data.items():
         if isinstance(value, dict):
@@ -28,24 +40,26 @@ def _decrypt_Fernet(text, fernet: Fernet):
         return text
     return fernet.decrypt(text.replace(FERNET_STR, '').encode('utf-8')).decode('utf-8')
 
-def _remove_unnecessary_changes(data: dict, old_data_path: str, fernet: Fernet) -> None:
+def _load_old_fernet_tokens(old_data_path: str) -> dict:
     if not os.path.exists(old_data_path):
-        return
+        return {}
     old_data = openYaml(old_data_path)
-    _reuse_old_fernet_tokens(data, dict(old_data), fernet)
+    return dict(old_data) if isinstance(old_data, dict) else {}
 
-def _reuse_old_fernet_tokens(data: dict, old_data: dict, fernet: Fernet) -> None:
-    for k, v in data.items():
-        if not k in old_data.keys():
-            continue
-        if isinstance(v, dict) and isinstance(old_data[k], dict):
-            _reuse_old_fernet_tokens(v, old_data[k], fernet)
-            continue
-        decoded_old_v = _decrypt_Fernet(old_data[k], fernet)
-        if old_data[k] == decoded_old_v:
+def _encrypt_Fernet_reusing_tokens(data: dict, old_data: dict, fernet: Fernet) -> dict:
+    """Encrypts values, values equal to the decrypted token of the old file keep that token"""
+    for key, value in data.items():
+        old_value = old_data.get(key)
+        if isinstance(value, dict):
+            _encrypt_Fernet_reusing_tokens(value, old_value if isinstance(old_value, dict) else {}, fernet)
+        elif value == '' or UNENCRYPTED_REGEX.match(key):
             continue
-        elif decoded_old_v == _decrypt_Fernet(v, fernet):
-            data[k] = old_data[k]
+        elif (isinstance(old_value, str) and old_value.startswith(FERNET_STR)
+              and _decrypt_Fernet(old_value, fernet) == str(value)):
+            data[key] = old_value
+        else:
+            data[key] = _encrypt_Fernet(value, fernet)
+    return data
 
 def extract_value_Fernet(file_path: str, attribute_str: str) -> Any:
     data = crypt_Fernet(file_path, secret_key=None, in_place=False, mode='decrypt')
@@ -57,28 +71,22 @@ def crypt_Fernet(file_path, secret_key, in_place, mode, minimize_diff=None, old_
     if not secret_key:
         secret_key = getenv_with_error("SECRET_KEY")
     data = openYaml(file_path)
-    fernet = Fernet(secret_key)
-    fernet_func = _decrypt_Fernet if mode == "decrypt" else _encrypt_Fernet
-    if isinstance(data, dict):
-        new_data = _apply_Fernet_to_dict(data, fernet, fernet_func)
-    else:
+    fernet = _get_fernet(secret_key)
+    if not isinstance(data, dict):
         new_data = {}
-    if minimize_diff and old_file_path and mode != "decrypt":
-        _remove_unnecessary_changes(new_data, old_file_path, fernet)
+    elif minimize_diff and old_file_path and mode != "decrypt":
+        new_data = _encrypt_Fernet_reusing_tokens(data, _load_old_fernet_tokens(old_file_path), fernet)
+    else:
+        fernet_func = _decrypt_Fernet if mode == "decrypt" else _encrypt_Fernet
+        new_data = _apply_Fernet_to_dict(data, fernet, fernet_func)
     if in_place:
         writeYamlToFile(file_path, new_data)
         return new_data if load_result else None
     return new_data
 
 def is_encrypted_Fernet(file_path):
-    content = openYaml(file_path)
-    return _is_encrypted_Fernet(content)
-
-def _is_encrypted_Fernet(data):
-    for _, value in data.items():
-        if isinstance(value, dict) and _is_encrypted_Fernet(value):
-            return True
-        if isinstance(value, str) and value.startswith(FERNET_STR):
-            return True
-    return False
-
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            return any(FERNET_STR in line and FERNET_ENCRYPTED_LINE.match(line) for line in f)
+    except OSError:
+        return False
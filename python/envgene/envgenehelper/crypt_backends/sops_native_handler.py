@@ -0,0 +1,600 @@
+"""
+In-process implementation of SOPS file encryption with age recipients.
+
+Produces and reads the same YAML files as the sops CLI, without starting a process per file:
+values are encrypted with AES256-GCM using a per-file data key, the data key is wrapped for every
+age recipient, and the MAC over all values is stored encrypted in sops metadata.
+"""
+import base64
+import hashlib
+import hmac
+import io
+import os
+import re
+import tempfile
+import textwrap
+from datetime import datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from ruyaml import YAML
+from ruyaml.nodes import ScalarNode
+from ruyaml.resolver import VersionedResolver
+from ruyaml.scalarbool import ScalarBoolean
+from ruyaml.scalarstring import DoubleQuotedScalarString, LiteralScalarString
+
+from ..business_helper import getenv_with_error
+from ..yaml_helper import get_empty_yaml, get_or_create_nested_yaml_attribute, readYaml
+from ..logger import logger
+
+from .constants import *
+from .sops_handler import _is_empty_cred_file, is_encrypted_SOPS
+
+# version of sops CLI which output format is reproduced
+SOPS_FORMAT_VERSION = "3.11.0"
+SOPS_METADATA_KEY = "sops"
+SOPS_NONCE_SIZE = 32
+ENC_VALUE_PATTERN = re.compile(r'^ENC\[AES256_GCM,data:(.+),iv:(.+),tag:(.+),type:(.+)\]')
+
+AGE_HEADER_VERSION = b"age-encryption.org/v1"
+AGE_X25519_INFO = b"age-encryption.org/v1/X25519"
+AGE_ARMOR_BEGIN = "-----BEGIN AGE ENCRYPTED FILE-----"
+AGE_ARMOR_END = "-----END AGE ENCRYPTED FILE-----"
+AGE_CHUNK_SIZE = 64 * 1024
+AGE_SECRET_KEY_HRP = "age-secret-key-"
+AGE_PUBLIC_KEY_HRP = "age"
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+# metadata the in-process backend cannot reproduce, re-encrypting such files would silently drop it
+UNSUPPORTED_METADATA_KEYS = ("kms", "gcp_kms", "azure_kv", "hc_vault", "pgp", "mac_only_encrypted")
+# plain scalars that go-yaml (used by sops) reads as booleans or sexagesimal numbers
+YAML11_AMBIGUOUS_PATTERN = re.compile(
+    r'^(?:y|Y|yes|Yes|YES|n|N|no|No|NO|on|On|ON|off|Off|OFF'
+    r'|[-+]?[0-9][0-9_]*(?::[0-5]?[0-9])+(?:\.[0-9_]*)?)$')
+
+_resolver = VersionedResolver()
+
+
+class SopsError(ValueError):
+    pass
+
+
+# ---------- age ----------
+
+def _bech32_polymod(values):
+    generator = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+    chk = 1
+    for value in values:
+        top = chk >> 25
+        chk = (chk & 0x1ffffff) << 5 ^ value
+        for i in range(5):
+            chk ^= generator[i] if ((top >> i) & 1) else 0
+    return chk
+
+
+def _bech32_hrp_expand(hrp):
+    return [ord(x) >> 5 for x in hrp] + [0] + [ord(x) & 31 for x in hrp]
+
+
+def _convert_bits(data, from_bits, to_bits, pad):
+    acc, bits, result = 0, 0, []
+    max_value = (1 << to_bits) - 1
+    for value in data:
+        acc = (acc << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((acc >> bits) & max_value)
+    if pad and bits:
+        result.append((acc << (to_bits - bits)) & max_value)
+    elif not pad and (bits >= from_bits or ((acc << (to_bits - bits)) & max_value)):
+        raise SopsError("Invalid padding in bech32 string")
+    return bytes(result) if to_bits == 8 else result
+
+
+def bech32_decode(value: str) -> tuple[str, bytes]:
+    value = value.strip().lower()
+    pos = value.rfind("1")
+    if pos < 1 or pos + 7 > len(value) or any(c not in BECH32_CHARSET for c in value[pos + 1:]):
+        raise SopsError("Invalid bech32 string")
+    hrp = value[:pos]
+    data = [BECH32_CHARSET.find(c) for c in value[pos + 1:]]
+    if _bech32_polymod(_bech32_hrp_expand(hrp) + data) != 1:
+        raise SopsError("Invalid bech32 checksum")
+    return hrp, _convert_bits(data[:-6], 5, 8, False)
+
+
+def bech32_encode(hrp: str, data: bytes) -> str:
+    values = _convert_bits(data, 8, 5, True)
+    polymod = _bech32_polymod(_bech32_hrp_expand(hrp) + values + [0] * 6) ^ 1
+    checksum = [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+    return hrp + "1" + "".join(BECH32_CHARSET[d] for d in values + checksum)
+
+
+def _b64_raw_encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64_raw_decode(value: str) -> bytes:
+    return base64.b64decode(value + "=" * (-len(value) % 4))
+
+
+def _hkdf(key: bytes, salt: bytes | None, info: bytes) -> bytes:
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=info).derive(key)
+
+
+class AgeIdentity:
+    def __init__(self, secret_key: str):
+        hrp, key = bech32_decode(secret_key)
+        if hrp != AGE_SECRET_KEY_HRP or len(key) != 32:
+            raise SopsError("Invalid age secret key")
+        self._private_key = X25519PrivateKey.from_private_bytes(key)
+        self.public_bytes = self._private_key.public_key().public_bytes_raw()
+        self.recipient = bech32_encode(AGE_PUBLIC_KEY_HRP, self.public_bytes)
+
+    def unwrap(self, share: bytes, body: bytes) -> bytes | None:
+        shared_secret = self._private_key.exchange(X25519PublicKey.from_public_bytes(share))
+        wrap_key = _hkdf(shared_secret, share + self.public_bytes, AGE_X25519_INFO)
+        try:
+            return ChaCha20Poly1305(wrap_key).decrypt(b"\x00" * 12, body, None)
+        except InvalidTag:
+            return None
+
+
+def _parse_recipient(recipient: str) -> bytes:
+    hrp, key = bech32_decode(recipient)
+    if hrp != AGE_PUBLIC_KEY_HRP or len(key) != 32:
+        raise SopsError(f"Invalid age recipient: {recipient}")
+    return key
+
+
+@lru_cache(maxsize=16)
+def parse_age_identities(secret_keys: str) -> tuple[AgeIdentity, ...]:
+    """Parses age secret keys once, several keys can be passed on separate lines or comma separated."""
+    keys = [k.strip() for line in secret_keys.splitlines() for k in line.split(",")]
+    identities = tuple(AgeIdentity(k) for k in keys if k and not k.startswith("#"))
+    if not identities:
+        raise SopsError("No age secret keys provided")
+    return identities
+
+
+@lru_cache(maxsize=16)
+def parse_age_recipients(public_keys: str) -> tuple[tuple[str, bytes], ...]:
+    recipients = [r.strip() for r in public_keys.replace("\n", ",").split(",") if r.strip()]
+    if not recipients:
+        raise SopsError("No age public keys provided")
+    return tuple((r, _parse_recipient(r)) for r in recipients)
+
+
+def _age_header_mac(file_key: bytes, header: bytes) -> bytes:
+    return hmac.new(_hkdf(file_key, None, b"header"), header, hashlib.sha256).digest()
+
+
+def _age_payload_nonce(counter: int, last: bool) -> bytes:
+    return counter.to_bytes(11, "big") + (b"\x01" if last else b"\x00")
+
+
+def age_encrypt(plaintext: bytes, recipient: bytes) -> str:
+    """Encrypts data for one X25519 recipient, returns ASCII armored age file."""
+    file_key = os.urandom(16)
+    ephemeral = X25519PrivateKey.generate()
+    share = ephemeral.public_key().public_bytes_raw()
+    wrap_key = _hkdf(ephemeral.exchange(X25519PublicKey.from_public_bytes(recipient)), share + recipient,
+                     AGE_X25519_INFO)
+    body = _b64_raw_encode(ChaCha20Poly1305(wrap_key).encrypt(b"\x00" * 12, file_key, None))
+    body_lines = [body[i:i + 64] for i in range(0, len(body), 64)]
+    if len(body) % 64 == 0:
+        body_lines.append("")
+    header = b"\n".join([AGE_HEADER_VERSION, f"-> X25519 {_b64_raw_encode(share)}".encode("ascii")]
+                        + [line.encode("ascii") for line in body_lines] + [b"---"])
+    header += b" " + _b64_raw_encode(_age_header_mac(file_key, header)).encode("ascii") + b"\n"
+
+    nonce = os.urandom(16)
+    payload = ChaCha20Poly1305(_hkdf(file_key, nonce, b"payload"))
+    chunks = [plaintext[i:i + AGE_CHUNK_SIZE] for i in range(0, len(plaintext), AGE_CHUNK_SIZE)] or [b""]
+    encrypted = b"".join(payload.encrypt(_age_payload_nonce(i, i == len(chunks) - 1), chunk, None)
+                         for i, chunk in enumerate(chunks))
+    armored = base64.b64encode(header + nonce + encrypted).decode("ascii")
+    lines = [AGE_ARMOR_BEGIN] + [armored[i:i + 64] for i in range(0, len(armored), 64)] + [AGE_ARMOR_END]
+    return "\n".join(lines) + "\n"
+
+
+def age_decrypt(armored: str, identities) -> bytes:
+    lines = [line.strip() for line in armored.strip().splitlines()]
+    if not lines or lines[0] != AGE_ARMOR_BEGIN or lines[-1] != AGE_ARMOR_END:
+        raise SopsError("Invalid age armor")
+    data = base64.b64decode("".join(lines[1:-1]))
+
+    header_end = data.find(b"\n---")
+    if not data.startswith(AGE_HEADER_VERSION + b"\n") or header_end == -1:
+        raise SopsError("Invalid age header")
+    mac_line_end = data.index(b"\n", header_end + 1)
+    header = data[:header_end + 4]
+    header_mac = _b64_raw_decode(data[header_end + 5:mac_line_end].decode("ascii"))
+    payload = data[mac_line_end + 1:]
+
+    stanzas = []
+    for line in header.split(b"\n")[1:-1]:
+        if line.startswith(b"-> "):
+            stanzas.append((line[3:].decode("ascii").split(" "), []))
+        elif stanzas:
+            stanzas[-1][1].append(line.decode("ascii"))
+    file_key = None
+    for args, body_lines in stanzas:
+        if args[0] != "X25519" or len(args) != 2:
+            continue
+        body = _b64_raw_decode("".join(body_lines))
+        for identity in identities:
+            file_key = identity.unwrap(_b64_raw_decode(args[1]), body)
+            if file_key:
+                break
+        if file_key:
+            break
+    if file_key is None:
+        raise SopsError("No age identity matches any of the recipients")
+    if not hmac.compare_digest(_age_header_mac(file_key, header), header_mac):
+        raise SopsError("Invalid age header MAC")
+
+    nonce, encrypted = payload[:16], payload[16:]
+    cipher = ChaCha20Poly1305(_hkdf(file_key, nonce, b"payload"))
+    chunk_size = AGE_CHUNK_SIZE + 16
+    chunks = [encrypted[i:i + chunk_size] for i in range(0, len(encrypted), chunk_size)]
+    return b"".join(cipher.decrypt(_age_payload_nonce(i, i == len(chunks) - 1), chunk, None)
+                    for i, chunk in enumerate(chunks))
+
+
+# ---------- values ----------
+
+def _format_float(value: float) -> str:
+    # the same as strconv.FormatFloat(value, 'f', -1, 64) in Go
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    text = format(Decimal(repr(value)).normalize(), "f")
+    return "0" if text == "-0" else text
+
+
+def _to_plain(value):
+    if isinstance(value, dict):
+        return {str(k): _to_plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_plain(v) for v in value]
+    if isinstance(value, (bool, ScalarBoolean)):
+        return bool(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if value is None:
+        return None
+    return str(value)
+
+
+def _value_type_and_bytes(value) -> tuple[str, bytes]:
+    if isinstance(value, bool):
+        return "bool", b"true" if value else b"false"
+    if isinstance(value, int):
+        return "int", str(value).encode()
+    if isinstance(value, float):
+        return "float", _format_float(value).encode()
+    return "str", value.encode("utf-8")
+
+
+def _mac_bytes(value) -> bytes:
+    if isinstance(value, bool):
+        return b"True" if value else b"False"
+    return _value_type_and_bytes(value)[1]
+
+
+def _parse_typed_value(value_type: str, data: bytes):
+    if value_type == "str":
+        return data.decode("utf-8")
+    if value_type == "int":
+        return int(data)
+    if value_type == "float":
+        return float(data)
+    if value_type == "bool":
+        return data.decode().lower() == "true"
+    raise SopsError(f"Unsupported sops value type: {value_type}")
+
+
+class SopsCipher:
+    """AES256-GCM value cipher of sops, keeps IVs of decrypted values to encrypt unchanged values the same way."""
+
+    def __init__(self, data_key: bytes):
+        self._aesgcm = AESGCM(data_key)
+        # (additional data, type, normalized plaintext) -> (iv, plaintext as stored in the file)
+        self._stash: dict[tuple[str, str, bytes], tuple[bytes, bytes]] = {}
+
+    def encrypt(self, value, additional_data: str) -> str:
+        if isinstance(value, str) and value == "":
+            return ""
+        value_type, plaintext = _value_type_and_bytes(value)
+        iv, plaintext = self._stash.get((additional_data, value_type, plaintext),
+                                        (os.urandom(SOPS_NONCE_SIZE), plaintext))
+        encrypted = self._aesgcm.encrypt(iv, plaintext, additional_data.encode("utf-8"))
+        return (f"ENC[AES256_GCM,data:{base64.b64encode(encrypted[:-16]).decode()},"
+                f"iv:{base64.b64encode(iv).decode()},tag:{base64.b64encode(encrypted[-16:]).decode()},"
+                f"type:{value_type}]")
+
+    def decrypt(self, value: str, additional_data: str):
+        if value == "":
+            return ""
+        match = ENC_VALUE_PATTERN.match(value)
+        if not match:
+            raise SopsError(f"Input string {value} does not match sops' data format")
+        data, iv, tag, value_type = (match.group(i) for i in range(1, 5))
+        iv = base64.b64decode(iv)
+        try:
+            plaintext = self._aesgcm.decrypt(iv, base64.b64decode(data) + base64.b64decode(tag),
+                                             additional_data.encode("utf-8"))
+        except InvalidTag:
+            raise SopsError(f"Could not decrypt value with additional data {additional_data}")
+        value = _parse_typed_value(value_type, plaintext)
+        self._stash[(additional_data, *_value_type_and_bytes(value))] = (iv, plaintext)
+        return value
+
+
+# ---------- tree ----------
+
+def _is_encrypted_path(path: list[str], metadata: dict) -> bool:
+    if metadata.get("unencrypted_suffix") and any(p.endswith(metadata["unencrypted_suffix"]) for p in path):
+        return False
+    if metadata.get("encrypted_suffix"):
+        return any(p.endswith(metadata["encrypted_suffix"]) for p in path)
+    if metadata.get("unencrypted_regex") and any(re.search(metadata["unencrypted_regex"], p) for p in path):
+        return False
+    if metadata.get("encrypted_regex"):
+        return any(re.search(metadata["encrypted_regex"], p) for p in path)
+    return True
+
+
+def _walk(tree, path, on_leaf):
+    if isinstance(tree, dict):
+        return {k: _walk(v, path + [k], on_leaf) for k, v in tree.items()}
+    if isinstance(tree, list):
+        return [_walk(v, path, on_leaf) for v in tree]
+    if tree is None:
+        return None
+    return on_leaf(tree, path)
+
+
+def _encrypt_tree(tree: dict, cipher: SopsCipher, metadata: dict) -> tuple[dict, str]:
+    mac = hashlib.sha512()
+
+    def encrypt_leaf(value, path):
+        mac.update(_mac_bytes(value))
+        if _is_encrypted_path(path, metadata):
+            return cipher.encrypt(value, ":".join(path) + ":")
+        return value
+
+    return _walk(tree, [], encrypt_leaf), mac.hexdigest().upper()
+
+
+def _decrypt_tree(tree: dict, cipher: SopsCipher, metadata: dict) -> tuple[dict, str]:
+    mac = hashlib.sha512()
+
+    def decrypt_leaf(value, path):
+        if _is_encrypted_path(path, metadata):
+            value = cipher.decrypt(value, ":".join(path) + ":") if isinstance(value, str) else value
+        mac.update(_mac_bytes(value))
+        return value
+
+    return _walk(tree, [], decrypt_leaf), mac.hexdigest().upper()
+
+
+# ---------- yaml ----------
+
+def _styled_scalar(value):
+    if not isinstance(value, str):
+        return value
+    if "\n" in value:
+        return LiteralScalarString(value)
+    tag = _resolver.resolve(ScalarNode, value, (True, False))
+    if value == "" or tag != "tag:yaml.org,2002:str" or YAML11_AMBIGUOUS_PATTERN.match(value):
+        return DoubleQuotedScalarString(value)
+    return value
+
+
+def _styled(tree):
+    if isinstance(tree, dict):
+        return {k: _styled(v) for k, v in tree.items()}
+    if isinstance(tree, list):
+        return [_styled(v) for v in tree]
+    return _styled_scalar(tree)
+
+
+def _represent_none(representer, data):
+    return representer.represent_scalar("tag:yaml.org,2002:null", "null")
+
+
+def _new_yaml() -> YAML:
+    # ruyaml instances are not thread safe, a new one is created for each file
+    sops_yaml = YAML()
+    sops_yaml.indent(mapping=4, sequence=6, offset=4)
+    sops_yaml.width = 2 ** 31
+    sops_yaml.allow_unicode = True
+    sops_yaml.representer.add_representer(type(None), _represent_none)
+    return sops_yaml
+
+
+def dump_sops_yaml(tree) -> str:
+    stream = io.StringIO()
+    if tree or isinstance(tree, list):
+        _new_yaml().dump(_styled(tree), stream)
+    else:
+        stream.write("{}\n")
+    return stream.getvalue()
+
+
+def _dump_metadata(metadata: dict) -> str:
+    lines = [f"{SOPS_METADATA_KEY}:", "    age:"]
+    for entry in metadata["age"]:
+        lines.append(f"        - recipient: {entry['recipient']}")
+        lines.append("          enc: |")
+        lines.extend(f"            {line}" for line in entry["enc"].rstrip("\n").split("\n"))
+    lines.append(f'    lastmodified: "{metadata["lastmodified"]}"')
+    lines.append(f"    mac: {metadata['mac']}")
+    for key in ("unencrypted_suffix", "encrypted_suffix", "unencrypted_regex", "encrypted_regex"):
+        if metadata.get(key):
+            lines.append(f"    {key}: {metadata[key]}")
+    lines.append(f"    version: {metadata.get('version', SOPS_FORMAT_VERSION)}")
+    return "\n".join(lines) + "\n"
+
+
+def _read_sops_file(file_path: str) -> tuple[dict, dict]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = _to_plain(_new_yaml().load(f)) or {}
+    if not isinstance(content, dict) or SOPS_METADATA_KEY not in content:
+        raise SopsError("sops metadata not found")
+    metadata = content.pop(SOPS_METADATA_KEY)
+    if metadata.get("key_groups") or metadata.get("shamir_threshold"):
+        raise SopsError("sops key groups are not supported by in-process backend")
+    unsupported = [key for key in UNSUPPORTED_METADATA_KEYS if metadata.get(key)]
+    if unsupported:
+        raise SopsError(f"sops metadata {', '.join(unsupported)} is not supported by in-process backend, "
+                        f"only age recipients can be used")
+    if not metadata.get("age"):
+        raise SopsError("sops file has no age recipients")
+    return content, metadata
+
+
+def _read_plain_file(file_path: str) -> dict:
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = _to_plain(_new_yaml().load(f))
+    if not isinstance(content, dict):
+        raise SopsError(f"Only YAML mappings can be encrypted: {file_path}")
+    if SOPS_METADATA_KEY in content:
+        raise SopsError("The file you have provided contains a top-level entry called 'sops'")
+    return content
+
+
+# ---------- files ----------
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _decrypt_data_key(metadata: dict, identities) -> bytes:
+    errors = []
+    for entry in metadata["age"]:
+        try:
+            return age_decrypt(entry["enc"], identities)
+        except (SopsError, InvalidTag) as e:
+            errors.append(f"{entry.get('recipient')}: {e}")
+    raise SopsError(f"Failed to get the data key required to decrypt the SOPS file: {'; '.join(errors)}")
+
+
+def decrypt_sops_tree(file_path: str, secret_key: str) -> tuple[dict, dict, SopsCipher]:
+    """Decrypts sops file, returns plaintext tree, sops metadata and cipher holding IVs of decrypted values."""
+    tree, metadata = _read_sops_file(file_path)
+    cipher = SopsCipher(_decrypt_data_key(metadata, parse_age_identities(secret_key)))
+    plain_tree, mac = _decrypt_tree(tree, cipher, metadata)
+    stored_mac = cipher.decrypt(metadata["mac"], metadata["lastmodified"])
+    if not hmac.compare_digest(mac, stored_mac):
+        raise SopsError(f"MAC mismatch. File has {stored_mac}, computed {mac}")
+    return plain_tree, metadata, cipher
+
+
+def encrypt_sops_tree(tree: dict, public_key: str, cipher: SopsCipher | None = None,
+                      metadata: dict | None = None) -> str:
+    """
+    Encrypts plaintext tree to sops YAML. When cipher and metadata of previous version of the file are passed,
+    its data key and recipients are kept, and unchanged values keep their ciphertext.
+    """
+    if cipher is None:
+        data_key = os.urandom(32)
+        cipher = SopsCipher(data_key)
+        metadata = {
+            "age": [{"recipient": recipient, "enc": age_encrypt(data_key, key)}
+                    for recipient, key in parse_age_recipients(public_key)],
+            "unencrypted_regex": UNENCRYPTED_REGEX_STR,
+        }
+    metadata = {**metadata, "lastmodified": _now(), "version": SOPS_FORMAT_VERSION}
+    encrypted_tree, mac = _encrypt_tree(tree, cipher, metadata)
+    metadata["mac"] = cipher.encrypt(mac, metadata["lastmodified"])
+    return dump_sops_yaml(encrypted_tree) + _dump_metadata(metadata)
+
+
+def _write_atomically(file_path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(file_path))
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False, suffix=".tmp") as f:
+        f.write(text)
+    os.replace(f.name, file_path)
+
+
+def _get_secret_key(secret_key):
+    return secret_key or os.environ.get("SOPS_AGE_KEY") or getenv_with_error("ENVGENE_AGE_PRIVATE_KEY", no_log=True)
+
+
+def _get_public_key(public_key):
+    return public_key or getenv_with_error("PUBLIC_AGE_KEYS", no_log=True)
+
+
+def crypt_SOPS_native(file_path, secret_key, in_place, public_key, mode, minimize_diff=False, old_file_path=None,
+                      load_result=True, *args, **kwargs):
+    if _is_empty_cred_file(file_path):
+        logger.info(f'File is empty, skipping de/encryption. Path: {file_path}')
+        return get_empty_yaml() if load_result else None
+
+    encrypted = is_encrypted_SOPS(file_path)
+    if encrypted and mode == "encrypt":
+        logger.warning(f'File is already encrypted. Path: {file_path}')
+        return _load(file_path) if load_result else None
+    if not encrypted and mode == "decrypt":
+        logger.warning(f'File is not encrypted. Path: {file_path}')
+        return _load(file_path) if load_result else None
+
+    if mode == "decrypt":
+        tree, _, _ = decrypt_sops_tree(file_path, _get_secret_key(secret_key))
+        result_text = dump_sops_yaml(tree)
+    else:
+        public_key = _get_public_key(public_key)
+        tree = _read_plain_file(file_path)
+        if minimize_diff and old_file_path:
+            old_tree, metadata, cipher = decrypt_sops_tree(old_file_path, _get_secret_key(secret_key))
+            if old_tree == tree:
+                # the same as 'sops edit' without changes, the old file is kept as is
+                with open(old_file_path, "r", encoding="utf-8") as f:
+                    result_text = f.read()
+            else:
+                result_text = encrypt_sops_tree(tree, public_key, cipher, metadata)
+        else:
+            result_text = encrypt_sops_tree(tree, public_key)
+
+    logger.info(f'The file has been {mode}ed. Path: {file_path}')
+    if in_place:
+        _write_atomically(file_path, result_text)
+        return readYaml(result_text) if load_result else None
+    return readYaml(result_text)
+
+
+def _load(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return readYaml(f.read())
+
+
+def extract_value_SOPS_native(file_path, attribute_str):
+    if not is_encrypted_SOPS(file_path):
+        logger.warning(f'The {file_path} file is already not encrypted')
+        return get_or_create_nested_yaml_attribute(_load(file_path), attribute_str)
+    tree, _, _ = decrypt_sops_tree(file_path, _get_secret_key(None))
+    value = tree
+    for key in attribute_str.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            raise SopsError(f"Component ['{key}'] not found in {file_path}")
+        value = value[key]
+    # the same output as 'sops --extract'
+    if isinstance(value, (dict, list)):
+        return textwrap.dedent(dump_sops_yaml(value))
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return _format_float(value)
+    return str(value)
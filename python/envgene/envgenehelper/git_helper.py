@@ -119,6 +119,34 @@ def stage_changes(self, sparse_paths: Optional[list[str]] = None) -> bool:
 
         raise RuntimeError(f"git diff failed with exit code {status}")
 
+    def stage_written_paths(self, written_paths: list[str]) -> bool:
+        """Fast mode of stage_changes: stages only paths written by build steps and reads staged diff once"""
+        logger.info(f"Staging {len(written_paths)} written paths...")
+        existing_paths = [path for path in written_paths if Path(self.repo.working_tree_dir, path).exists()]
+        if existing_paths:
+            self.repo.git.add("--all", "--", *existing_paths)
+
+        staged_files = self.repo.git.diff("--cached", "--name-status", "--no-renames").splitlines()
+        counts = {}
+        for line in staged_files:
+            logger.debug(line)
+            status = line.split("\t", 1)[0]
+            counts[status] = counts.get(status, 0) + 1
+        logger.info(f"Staged {len(staged_files)} files: "
+                    f"{', '.join(f'{status}={count}' for status, count in sorted(counts.items())) or 'none'}")
+        return bool(staged_files)
+
+    def get_unrecorded_changes(self, written_paths: list[str]) -> list[str]:
+        """Returns changed files of sparse checkout paths that are not under any of the written paths"""
+        existing_paths = [path for path in self.sparse_paths if Path(self.repo.working_tree_dir, path).exists()]
+        if not existing_paths:
+            return []
+        status = self.repo.git.status("--porcelain", "-z", "--untracked-files=all", "--no-renames",
+                                      "--", *existing_paths)
+        prefixes = tuple(f"{path.rstrip('/')}/" for path in written_paths)
+        changed_files = [entry[3:] for entry in status.split("\0") if entry]
+        return [file for file in changed_files if file not in written_paths and not file.startswith(prefixes)]
+
     def create_detached_commit(self, message: str) -> str:
         # git commit-tree "$(git write-tree)" -p HEAD -m "${message}"
         tree_sha = self.repo.git.write_tree()
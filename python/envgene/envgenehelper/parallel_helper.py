@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Sequence
+
+from .logger import logger
+
+# workers a pool may use in this process, set in forked workers so that nested pools share CPUs of the outer one
+_worker_budget: int | None = None
+
+
+def _init_worker(worker_budget: int):
+    global _worker_budget
+    _worker_budget = worker_budget
+
+
+def get_max_workers(tasks_count: int, max_workers: int | None = None) -> int:
+    limit = max_workers or os.cpu_count() or 2
+    if _worker_budget is not None:
+        limit = min(limit, _worker_budget)
+    return max(1, min(tasks_count, limit))
+
+
+def run_in_parallel(func: Callable, tasks: Sequence, name: str, *, describe: Callable[[Any], str] = str,
+                    max_workers: int | None = None, use_processes: bool = True) -> list:
+    """
+    Calls func for every task in forked worker processes or in threads, returns results in order of tasks.
+    All tasks are run even if some of them fail, then RuntimeError listing failed tasks in order of tasks is raised
+    from the error of the first one. In a worker of another pool only its share of CPUs is used, with one worker
+    the tasks are run in the current process.
+    """
+    tasks = list(tasks)
+    workers = get_max_workers(len(tasks), max_workers)
+    results = [None] * len(tasks)
+    errors = []
+    if workers == 1:
+        for index, task in enumerate(tasks):
+            try:
+                results[index] = func(task)
+            except Exception as e:
+                errors.append((index, e))
+    else:
+        if use_processes:
+            logger.info(f"{name}: {len(tasks)} tasks in {workers} worker processes")
+            budget = max(1, (_worker_budget or os.cpu_count() or 2) // workers)
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                                           initializer=_init_worker, initargs=(budget,))
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+        with executor:
+            future_to_index = {executor.submit(func, task): index for index, task in enumerate(tasks)}
+            for future in as_completed(future_to_index):
+                try:
+                    results[future_to_index[future]] = future.result()
+                except Exception as e:
+                    errors.append((future_to_index[future], e))
+
+    if errors:
+        errors.sort(key=lambda error: error[0])
+        summary = '; '.join(f'{describe(tasks[index])} ({type(exc).__name__}: {exc})' for index, exc in errors)
+        raise RuntimeError(f'{name} failed: {summary}') from errors[0][1]
+    return results
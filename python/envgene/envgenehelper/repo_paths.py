@@ -1,3 +1,9 @@
+import os
+from pathlib import Path
+
+# repository paths written by build steps of the pipeline, kept in .git that is passed between jobs in artifacts
+WRITTEN_PATHS_FILE = ".git/envgene/written_paths"
+
 REPO_ROOT_PATHS = [
     "appdefs/",
     "regdefs/",
@@ -45,3 +51,45 @@ def get_shared_entity_paths(cluster_name: str) -> list[str]:
     )
 
     return paths
+
+
+def is_git_commit_fast_mode() -> bool:
+    return os.getenv("GIT_COMMIT_FAST_MODE", "false").lower() == "true"
+
+
+def record_written_paths(*paths: str | Path, base_dir: str | Path | None = None) -> None:
+    """
+    Records paths written by a build step, so that git commit in fast mode stages only them.
+    Does nothing if fast mode is disabled or base dir is not a git repository.
+    """
+    if not is_git_commit_fast_mode():
+        return
+    base_dir = Path(base_dir or os.getenv("CI_PROJECT_DIR", os.getcwd())).resolve()
+    written_paths_file = base_dir / WRITTEN_PATHS_FILE
+    if not written_paths_file.parent.parent.is_dir():
+        return
+    rel_paths = []
+    for path in paths:
+        try:
+            rel_paths.append(Path(path).resolve().relative_to(base_dir).as_posix())
+        except ValueError:
+            continue
+    if not rel_paths:
+        return
+    written_paths_file.parent.mkdir(parents=True, exist_ok=True)
+    # appending is safe for build steps running in parallel processes
+    with open(written_paths_file, "a", encoding="utf-8") as f:
+        f.write("".join(f"{rel_path}\n" for rel_path in rel_paths))
+
+
+def read_written_paths(base_dir: str | Path) -> list[str] | None:
+    """Returns paths recorded by build steps in the order they were written, None if nothing was recorded"""
+    written_paths_file = Path(base_dir) / WRITTEN_PATHS_FILE
+    if not written_paths_file.is_file():
+        return None
+    with open(written_paths_file, encoding="utf-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+
+def clear_written_paths(base_dir: str | Path) -> None:
+    (Path(base_dir) / WRITTEN_PATHS_FILE).unlink(missing_ok=True)
@@ -121,6 +121,28 @@ def test_get_cred_list_from_yaml(yaml_file):
                                         TEST_NAMESPACE) == expected, f"Param {param_key}={param_value} expected cred list result should be: {dump_as_yaml_format(expected)}"
 
 
+scan_cred_macros_test_data = [
+    ("MIXED_TYPES",
+     "user: ${creds.get('user-cred').username}\nkey: ${creds.get('secret-cred').secret}\nrole: ${creds.get('vault-cred').roleId}",
+     [("user-cred", CRED_TYPE_USERPASS), ("secret-cred", CRED_TYPE_SECRET), ("vault-cred", CRED_TYPE_VAULT)]),
+    ("#credscl{username,password}", "cloud-cred", [("cloud-cred", CRED_TYPE_USERPASS)]),
+    ("# creds{user,password}", "spaced-cred", [("spaced-cred", CRED_TYPE_USERPASS)]),
+    ("NOT_A_CRED", "${creds.get('not-cred').unknown}\nplain text", []),
+    ("NOT_A_STRING", 42, []),
+]
+
+
+@pytest.mark.parametrize("param_key, param_value, expected", scan_cred_macros_test_data)
+def test_scan_cred_macros(param_key, param_value, expected):
+    assert [(macro.cred_id, macro.cred_type) for macro in scan_cred_macros(param_key, param_value)] == expected
+
+
+def test_scan_cred_macros_without_cred_id_fails():
+    assert check_is_cred("BROKEN", "${creds.get.username}")
+    with pytest.raises(ReferenceError):
+        get_cred_list_from_param("BROKEN", "${creds.get.username}")
+
+
 get_cred_id_from_cred_macros_test_data = [
     ("${creds.get(\"velero-s3-cred\").username}", "velero-s3-cred"),
     ("${cmdb.creds.get(\"velero-s3-cred\").username}", "velero-s3-cred"),
@@ -5,8 +5,10 @@
 import pytest
 from subprocess import SubprocessError
 
+from cryptography.fernet import Fernet
 from ruyaml import CommentedMap
 
+from . import crypt
 from .collections_helper import compare_dicts
 
 from .crypt import (
@@ -15,10 +17,12 @@
     decrypt_file,
     encrypt_all_cred_files_for_env,
     encrypt_file,
+    get_all_necessary_cred_files,
+    is_cred_file,
     is_encrypted,
 )
 from .file_helper import check_file_exists, writeToFile
-from .yaml_helper import openYaml, set_nested_yaml_attribute, writeYamlToFile
+from .yaml_helper import openYaml, readYaml, set_nested_yaml_attribute, writeYamlToFile
 
 TEST_CONTENT = """\
 first_cred:
@@ -51,6 +55,11 @@
         'secret_key': 'n1588R0sm7Df4WJkFLEXd_d-rnKMoPl_8KFlC8yM5CY=',
         'public_key': None,
     },
+    {
+        'crypt_backend': 'SOPSNative',
+        'secret_key': 'AGE-SECRET-KEY-1AQVCSQDRR5F70H3WJL82EMHMPSDMJPRP0GREJE0Y3M5YJZ25GT9SN0Y6FM',
+        'public_key': 'age1y4hfj9zz05dtqycfk55y4csddch6w2lu9l6wx7r68at5x897ea3qjh0gl9',
+    },
 ]
 crypt_functions_data = [ decrypt_file, encrypt_file ]
 
@@ -59,6 +68,12 @@ def reset_test_files():
     if os.path.exists(NOT_EXISTING_TEST_FILE):
         os.remove(NOT_EXISTING_TEST_FILE)
 
+@pytest.fixture(autouse=True)
+def cred_skip_list_dir(tmp_path, monkeypatch):
+    skip_list_dir = tmp_path / 'tmp' / 'cred_skip_list'
+    monkeypatch.setattr(crypt, 'CRED_SKIP_LIST_DIR', str(skip_list_dir))
+    return skip_list_dir
+
 @pytest.fixture(params=crypt_test_data)
 def crypt_kwargs(request):
     reset_test_files()
@@ -206,22 +221,19 @@ def test_parallel_cred_op_load_result_false(crypt_kwargs, tmp_path):
 
 
 def test_parallel_cred_op_sequential_when_minimize_diff():
-    files = {'a.yml', 'b.yml'}
+    files = {'b.yml', 'a.yml'}
+    processed = []
 
-    with patch('envgenehelper.crypt.ThreadPoolExecutor') as mock_executor:
-        mock_ctx = mock_executor.return_value.__enter__.return_value
+    with patch('envgenehelper.parallel_helper.ThreadPoolExecutor') as mock_executor:
+        results = _parallel_cred_op(
+            files,
+            lambda f, **kw: processed.append(f),
+            minimize_diff=True,
+        )
 
-        def fake_as_completed(future_to_file):
-            return list(future_to_file)
-
-        with patch('envgenehelper.crypt.as_completed', side_effect=fake_as_completed):
-            _parallel_cred_op(
-                files,
-                lambda f, **kw: None,
-                minimize_diff=True,
-            )
-
-        mock_executor.assert_called_once_with(max_workers=1)
+        mock_executor.assert_not_called()
+    assert processed == ['a.yml', 'b.yml']
+    assert results == {'a.yml': None, 'b.yml': None}
 
 
 @pytest.mark.parametrize("crypt_kwargs", [crypt_test_data[1]], indirect=True)
@@ -240,7 +252,7 @@ def test_batch_cred_op_uses_sequential_for_fernet(crypt_kwargs, tmp_path):
     )
 
     with patch('envgenehelper.crypt.get_all_necessary_cred_files', return_value=files), \
-            patch('envgenehelper.crypt.ThreadPoolExecutor') as mock_executor:
+            patch('envgenehelper.parallel_helper.ThreadPoolExecutor') as mock_executor:
         encrypt_all_cred_files_for_env(**batch_kwargs)
         mock_executor.assert_not_called()
 
@@ -248,6 +260,161 @@ def test_batch_cred_op_uses_sequential_for_fernet(crypt_kwargs, tmp_path):
         mock_executor.assert_not_called()
 
 
+def test_unchanged_cred_files_keep_ciphertext(crypt_kwargs, tmp_path, cred_skip_list_dir):
+    cred_files = []
+    for name in ('unchanged.yml', 'changed.yml'):
+        cred_file = tmp_path / name
+        cred_file.write_text(TEST_CONTENT, encoding='utf-8')
+        cred_files.append(str(cred_file))
+    batch_kwargs = {k: v for k, v in crypt_kwargs.items() if k != 'file_path'}
+    batch_kwargs.update(ignore_is_crypt=True, is_crypt=True)
+
+    with patch('envgenehelper.crypt.get_all_necessary_cred_files', return_value=set(cred_files)):
+        encrypt_all_cred_files_for_env(**batch_kwargs)
+        initial_ciphertexts = [open(f, 'rb').read() for f in cred_files]
+
+        decrypt_all_cred_files_for_env(**batch_kwargs)
+        assert cred_skip_list_dir.is_dir()
+        writeToFile(cred_files[1], TEST_CONTENT.replace('token-placeholder-123', 'new-token'))
+        encrypt_all_cred_files_for_env(**batch_kwargs)
+
+    assert open(cred_files[0], 'rb').read() == initial_ciphertexts[0]
+    assert open(cred_files[1], 'rb').read() != initial_ciphertexts[1]
+    assert is_encrypted(cred_files[1], crypt_kwargs.get('crypt_backend'))
+    assert decrypt_file(cred_files[1], **batch_kwargs, in_place=False)['first_cred']['data']['secret'] == 'new-token'
+    assert not cred_skip_list_dir.exists()
+
+
+def test_cred_files_are_encrypted_again_after_key_change(tmp_path):
+    batch_kwargs = {**crypt_test_data[1], 'ignore_is_crypt': True, 'is_crypt': True}
+    new_key_kwargs = {**batch_kwargs, 'secret_key': Fernet.generate_key().decode()}
+    cred_file = tmp_path / 'credentials.yml'
+    cred_file.write_text(TEST_CONTENT, encoding='utf-8')
+
+    with patch('envgenehelper.crypt.get_all_necessary_cred_files', return_value={str(cred_file)}):
+        encrypt_all_cred_files_for_env(**batch_kwargs)
+        decrypt_all_cred_files_for_env(**batch_kwargs)
+        encrypt_all_cred_files_for_env(**new_key_kwargs)
+
+    assert decrypt_file(str(cred_file), **new_key_kwargs, in_place=False) == readYaml(TEST_CONTENT)
+
+
+def test_fernet_batch_runs_in_worker_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(crypt, 'FERNET_PARALLEL_THRESHOLD', 2)
+    batch_kwargs = {**crypt_test_data[1], 'ignore_is_crypt': True, 'is_crypt': True}
+    cred_files = []
+    for i in range(3):
+        cred_file = tmp_path / f'credentials-{i}.yml'
+        cred_file.write_text(TEST_CONTENT, encoding='utf-8')
+        cred_files.append(str(cred_file))
+
+    with patch('envgenehelper.crypt.get_all_necessary_cred_files', return_value=set(cred_files)), \
+            patch('envgenehelper.parallel_helper.ThreadPoolExecutor') as mock_executor:
+        encrypt_all_cred_files_for_env(**batch_kwargs)
+        initial_ciphertexts = [open(f, 'rb').read() for f in cred_files]
+        decrypt_all_cred_files_for_env(**batch_kwargs)
+        assert [openYaml(f) for f in cred_files] == [readYaml(TEST_CONTENT)] * 3
+        encrypt_all_cred_files_for_env(**batch_kwargs)
+        mock_executor.assert_not_called()
+
+    assert [open(f, 'rb').read() for f in cred_files] == initial_ciphertexts
+
+
+def test_fernet_encryption_state_is_detected_without_parsing(tmp_path):
+    cred_file = tmp_path / 'credentials.yml'
+    cred_file.write_text('# [encrypted:AES256_Fernet] in comment\n'
+                         'cred:\n  type: secret\n  data:\n    secret: value\n', encoding='utf-8')
+    assert not is_encrypted(str(cred_file), 'Fernet')
+
+    encrypt_file(str(cred_file), **crypt_test_data[1], ignore_is_crypt=True)
+    assert is_encrypted(str(cred_file), 'Fernet')
+    assert not is_encrypted(str(tmp_path / 'missing.yml'), 'Fernet')
+
+
+@pytest.mark.parametrize('line', [
+    'description: "see: [encrypted:AES256_Fernet]x"',
+    "description: 'see: [encrypted:AES256_Fernet]x'",
+    'note: text: [encrypted:AES256_Fernet]',
+    '  - note: text: "[encrypted:AES256_Fernet]x"',
+])
+def test_fernet_values_containing_marker_are_not_encrypted(tmp_path, line):
+    cred_file = tmp_path / 'credentials.yml'
+    cred_file.write_text(f'cred:\n  type: secret\n  data:\n    {line}\n', encoding='utf-8')
+
+    assert not is_encrypted(str(cred_file), 'Fernet')
+
+
+@pytest.mark.parametrize('line', [
+    'secret: "[encrypted:AES256_Fernet]x"',
+    "'quoted: key': '[encrypted:AES256_Fernet]x'",
+    'url:port: "[encrypted:AES256_Fernet]x"',
+])
+def test_fernet_encrypted_values_are_detected(tmp_path, line):
+    cred_file = tmp_path / 'credentials.yml'
+    cred_file.write_text(f'cred:\n  data:\n    {line}\n', encoding='utf-8')
+
+    assert is_encrypted(str(cred_file), 'Fernet')
+
+
+@pytest.fixture
+def instance_repo(tmp_path, monkeypatch):
+    files = [
+        'configuration/credentials/credentials.yml',
+        'configuration/config.yml',
+        'environments/cluster-01/env-01/Credentials/credentials.yml',
+        'environments/cluster-01/env-01/Credentials/inventory.yaml',
+        'environments/cluster-01/env-01/Namespaces/core/namespace.yml',
+        'environments/cluster-01/cloud-passport/cluster-01-creds.yml',
+        'environments/cluster-01/env-01/.git/credentials.yml',
+        'templates/credentials.yml',
+    ]
+    for file in files:
+        writeToFile(str(tmp_path / file), 'cred: {}\n')
+    monkeypatch.setattr(crypt, 'BASE_DIR', str(tmp_path))
+    monkeypatch.setattr(crypt, 'CRED_FILES_MANIFEST', str(tmp_path / 'tmp' / 'cred_files_manifest.json'))
+    monkeypatch.setattr(crypt, 'CRED_MANIFEST_MTIME_GRACE_NS', 0)
+    monkeypatch.delenv('ENV_NAMES', raising=False)
+    return tmp_path
+
+
+def test_cred_files_discovery_matches_is_cred_file(instance_repo):
+    expected = {str(instance_repo / f) for f in [
+        'configuration/credentials/credentials.yml',
+        'environments/cluster-01/env-01/Credentials/credentials.yml',
+        'environments/cluster-01/env-01/Credentials/inventory.yaml',
+        'environments/cluster-01/cloud-passport/cluster-01-creds.yml',
+    ]}
+    walked = {os.path.join(root, f) for root, _, files in os.walk(instance_repo) for f in files}
+
+    assert get_all_necessary_cred_files() == expected
+    assert {f for f in walked if is_cred_file(f) and '/.git/' not in f} == expected
+
+
+def test_cred_files_manifest_lists_only_changed_dirs(instance_repo, monkeypatch):
+    # the first walk creates the manifest in tmp/, the second one records the new mtime of the repo root
+    get_all_necessary_cred_files()
+    get_all_necessary_cred_files()
+    listed_dirs = []
+    original_list_cred_dir = crypt._list_cred_dir
+
+    def tracking_list_cred_dir(dir_path):
+        listed_dirs.append(dir_path)
+        return original_list_cred_dir(dir_path)
+
+    monkeypatch.setattr(crypt, '_list_cred_dir', tracking_list_cred_dir)
+    first_run = get_all_necessary_cred_files()
+    # saving the manifest changes mtime of its own directory only
+    assert listed_dirs == [str(instance_repo / 'tmp')]
+
+    new_file = instance_repo / 'environments' / 'cluster-01' / 'env-01' / 'Credentials' / 'new.yml'
+    writeToFile(str(new_file), 'cred: {}\n')
+    monkeypatch.setenv('ENV_NAMES', 'cluster-01/env-01')
+
+    assert get_all_necessary_cred_files() == first_run | {str(new_file)}
+    assert str(new_file.parent) in listed_dirs
+    assert str(instance_repo / 'configuration' / 'credentials') not in listed_dirs
+
+
 def test_minimize_diff(crypt_kwargs):
     cred_file = crypt_kwargs['file_path']
 
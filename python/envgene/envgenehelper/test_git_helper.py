@@ -1,7 +1,7 @@
 from unittest.mock import MagicMock, patch
 
 import pytest
-from git import GitCommandError
+from git import GitCommandError, Repo
 
 from .git_helper import GitContext, GitRepoManager
 
@@ -79,6 +79,50 @@ def test_raises_on_unexpected_exit_code(self):
             manager.stage_changes([])
 
 
+class TestStageWrittenPaths:
+    @pytest.fixture
+    def manager(self, tmp_path):
+        repo = Repo.init(tmp_path)
+        for env in ["env-1", "env-2"]:
+            env_dir = tmp_path / "environments" / "cluster" / env
+            env_dir.mkdir(parents=True)
+            (env_dir / "cloud.yml").write_text("name: cloud\n")
+        with repo.config_writer() as cw:
+            cw.set_value("user", "email", "example@example.com")
+            cw.set_value("user", "name", "test")
+        repo.git.add("--all")
+        repo.index.commit("init")
+        manager = make_manager()
+        manager.repo = repo
+        return manager
+
+    def test_stages_only_written_paths(self, manager, tmp_path):
+        env_dir = tmp_path / "environments" / "cluster"
+        (env_dir / "env-1" / "cloud.yml").write_text("name: changed\n")
+        (env_dir / "env-1" / "tenant.yml").write_text("name: tenant\n")
+        (env_dir / "env-2" / "cloud.yml").unlink()
+
+        assert manager.stage_written_paths(["environments/cluster/env-1", "environments/cluster/env-3"])
+
+        staged = manager.repo.git.diff("--cached", "--name-only").splitlines()
+        assert staged == ["environments/cluster/env-1/cloud.yml", "environments/cluster/env-1/tenant.yml"]
+
+    def test_returns_false_without_changes(self, manager):
+        assert not manager.stage_written_paths(["environments/cluster/env-1"])
+
+    def test_finds_changes_outside_written_paths(self, manager, tmp_path):
+        manager.sparse_paths = ["configuration/", "environments/cluster/"]
+        env_dir = tmp_path / "environments" / "cluster"
+        (env_dir / "env-1" / "cloud.yml").write_text("name: changed\n")
+        (env_dir / "env-2" / "cloud.yml").write_text("name: changed\n")
+        (env_dir / "env-2" / "AppDefs").mkdir()
+        (env_dir / "env-2" / "AppDefs" / "app.yml").write_text("name: app\n")
+
+        assert manager.get_unrecorded_changes(["environments/cluster/env-2"]) == [
+            "environments/cluster/env-1/cloud.yml"]
+        assert manager.get_unrecorded_changes(["environments/cluster/env-1", "environments/cluster/env-2"]) == []
+
+
 class TestCherryPickAndPush:
     def test_aborts_on_cherry_pick_git_error(self):
         manager = make_manager()
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from . import parallel_helper
+from .parallel_helper import get_max_workers, run_in_parallel
+
+
+def square(value):
+    if value < 0:
+        raise ValueError(f"negative value {value}")
+    return value * value
+
+
+def nested_max_workers(_):
+    return get_max_workers(1000)
+
+
+@pytest.mark.parametrize("use_processes", [True, False])
+def test_results_are_returned_in_order_of_tasks(use_processes):
+    assert run_in_parallel(square, range(10), "Squaring", max_workers=4, use_processes=use_processes) == [
+        value * value for value in range(10)]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_errors_of_all_tasks_are_raised_in_order_of_tasks(max_workers):
+    with pytest.raises(RuntimeError) as e:
+        run_in_parallel(square, [1, -2, 3, -4], "Squaring", describe=lambda value: f"value {value}",
+                        max_workers=max_workers)
+
+    assert str(e.value) == ("Squaring failed: value -2 (ValueError: negative value -2); "
+                            "value -4 (ValueError: negative value -4)")
+    assert isinstance(e.value.__cause__, ValueError)
+    assert str(e.value.__cause__) == "negative value -2"
+
+
+def test_nested_pools_share_cpus_of_outer_pool(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+
+    assert run_in_parallel(nested_max_workers, range(2), "Outer", max_workers=2) == [4, 4]
+    assert run_in_parallel(nested_max_workers, range(8), "Outer") == [1] * 8
+    assert parallel_helper._worker_budget is None
+    assert get_max_workers(1000) == 8
@@ -1,4 +1,5 @@
 from .git_helper import GitRepoManager
+from .repo_paths import clear_written_paths, read_written_paths, record_written_paths
 
 
 class TestGetSparseCheckoutPaths:
@@ -44,3 +45,25 @@ def test_full_path_list(self):
     def test_cred_rotation_adds_full_cluster_dir(self):
         paths = GitRepoManager.get_sparse_checkout_paths("my-cluster", "my-env", include_full_cluster=True)
         assert "environments/my-cluster/" in paths
+
+
+class TestWrittenPaths:
+    def test_paths_are_recorded_in_fast_mode(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GIT_COMMIT_FAST_MODE", "true")
+        (tmp_path / ".git").mkdir()
+
+        record_written_paths(tmp_path / "environments" / "cluster" / "env-1", base_dir=tmp_path)
+        record_written_paths(tmp_path / "environments" / "cluster" / "env-2", "/outside/of/repo",
+                             tmp_path / "environments" / "cluster" / "env-1", base_dir=tmp_path)
+
+        assert read_written_paths(tmp_path) == ["environments/cluster/env-1", "environments/cluster/env-2"]
+        clear_written_paths(tmp_path)
+        assert read_written_paths(tmp_path) is None
+
+    def test_nothing_is_recorded_without_fast_mode(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("GIT_COMMIT_FAST_MODE", raising=False)
+        (tmp_path / ".git").mkdir()
+
+        record_written_paths(tmp_path / "environments" / "cluster" / "env-1", base_dir=tmp_path)
+
+        assert read_written_paths(tmp_path) is None
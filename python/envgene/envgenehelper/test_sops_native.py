@@ -0,0 +1,126 @@
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from .crypt_backends.sops_native_handler import (SopsError, age_decrypt, age_encrypt, crypt_SOPS_native,
+                                                 decrypt_sops_tree, extract_value_SOPS_native, parse_age_identities)
+
+SECRET_KEY = 'AGE-SECRET-KEY-1AQVCSQDRR5F70H3WJL82EMHMPSDMJPRP0GREJE0Y3M5YJZ25GT9SN0Y6FM'
+PUBLIC_KEY = 'age1y4hfj9zz05dtqycfk55y4csddch6w2lu9l6wx7r68at5x897ea3qjh0gl9'
+# produced by sops 3.11.0: sops --encrypt --unencrypted-regex '^type$' --age <PUBLIC_KEY>
+CLI_ENCRYPTED_FILE = 'test_data/sops/credentials_encrypted.yml'
+# produced by sops 3.11.0: sops --decrypt CLI_ENCRYPTED_FILE
+CLI_DECRYPTED_FILE = 'test_data/sops/credentials_decrypted.yml'
+# random parts of sops output: values, age stanzas, modification time and MAC
+RANDOM_PARTS = re.compile(r'ENC\[AES256_GCM,data:[^,]*,iv:[^,]*,tag:[^,]*,|^ {12}[A-Za-z0-9+/=]+$|"\d{4}-.*Z"',
+                          re.MULTILINE)
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def cred_file(tmp_path):
+    def copy(source):
+        target = tmp_path / 'credentials.yml'
+        shutil.copy(source, target)
+        return str(target)
+    return copy
+
+
+def test_decrypt_matches_cli(cred_file):
+    path = cred_file(CLI_ENCRYPTED_FILE)
+
+    crypt_SOPS_native(path, SECRET_KEY, True, PUBLIC_KEY, 'decrypt')
+
+    assert read(path) == read(CLI_DECRYPTED_FILE)
+
+
+def test_encrypt_matches_cli_layout(cred_file):
+    path = cred_file(CLI_DECRYPTED_FILE)
+
+    crypt_SOPS_native(path, SECRET_KEY, True, PUBLIC_KEY, 'encrypt')
+
+    assert RANDOM_PARTS.sub('', read(path)) == RANDOM_PARTS.sub('', read(CLI_ENCRYPTED_FILE))
+    tree, metadata, _ = decrypt_sops_tree(path, SECRET_KEY)
+    assert tree['cred-2']['data'] == {'secret': 'multi\nline\n', 'empty': '', 'number': 42, 'flag': True,
+                                      'ratio': 1.5, 'list': ['a', 7]}
+    assert metadata['unencrypted_regex'] == '^type$'
+
+
+def test_minimize_diff_keeps_unchanged_values(cred_file):
+    path = cred_file(CLI_DECRYPTED_FILE)
+    crypt_SOPS_native(path, SECRET_KEY, True, PUBLIC_KEY, 'encrypt', minimize_diff=True,
+                      old_file_path=CLI_ENCRYPTED_FILE)
+    assert read(path) == read(CLI_ENCRYPTED_FILE)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(read(CLI_DECRYPTED_FILE).replace('username: admin', 'username: root'))
+    crypt_SOPS_native(path, SECRET_KEY, True, PUBLIC_KEY, 'encrypt', minimize_diff=True,
+                      old_file_path=CLI_ENCRYPTED_FILE)
+
+    changed = [line.split(':')[0].strip() for line, old_line in
+               zip(read(path).splitlines(), read(CLI_ENCRYPTED_FILE).splitlines()) if line != old_line]
+    assert changed == ['username', 'lastmodified', 'mac']
+    assert decrypt_sops_tree(path, SECRET_KEY)[0]['cred-1']['data']['username'] == 'root'
+
+
+def test_tampered_file_fails_mac_check(cred_file):
+    path = cred_file(CLI_ENCRYPTED_FILE)
+    content = read(path)
+    ratio = re.search(r'ratio: (ENC\[.*\])', content).group(1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content.replace(ratio, re.search(r'number: (ENC\[.*\])', content).group(1)))
+
+    with pytest.raises(SopsError):
+        crypt_SOPS_native(path, SECRET_KEY, False, PUBLIC_KEY, 'decrypt')
+
+
+@pytest.mark.parametrize('metadata', [
+    '    pgp:\n        - fp: 85D77543B3D624B63CEA9E6DBC17301B491B3F21\n          enc: data\n',
+    '    kms:\n        - arn: arn:aws:kms:us-east-1:111111111111:key/key-id\n          enc: data\n',
+    '    mac_only_encrypted: true\n',
+])
+def test_non_age_metadata_is_rejected(cred_file, metadata):
+    path = cred_file(CLI_ENCRYPTED_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(read(CLI_ENCRYPTED_FILE).replace('    lastmodified:', metadata + '    lastmodified:'))
+
+    with pytest.raises(SopsError, match='not supported'):
+        crypt_SOPS_native(path, SECRET_KEY, False, PUBLIC_KEY, 'decrypt')
+    new_path = shutil.copy(CLI_DECRYPTED_FILE, path + '.new')
+    with pytest.raises(SopsError, match='not supported'):
+        crypt_SOPS_native(new_path, SECRET_KEY, True, PUBLIC_KEY, 'encrypt', minimize_diff=True,
+                          old_file_path=path)
+
+
+def test_extract_value(monkeypatch):
+    monkeypatch.setenv('SOPS_AGE_KEY', SECRET_KEY)
+
+    assert extract_value_SOPS_native(CLI_ENCRYPTED_FILE, 'cred-1.data.password') == 'p@ss: w0rd'
+    assert extract_value_SOPS_native(CLI_ENCRYPTED_FILE, 'cred-2.data.ratio') == '1.5'
+    assert extract_value_SOPS_native(CLI_ENCRYPTED_FILE, 'cred-2.data.list') == '- a\n- 7\n'
+
+
+def test_age_round_trip():
+    identities = parse_age_identities(SECRET_KEY)
+    data = os.urandom(64 * 1024 + 5)
+
+    assert age_decrypt(age_encrypt(data, identities[0].public_bytes), identities) == data
+    assert identities[0].recipient == PUBLIC_KEY
+
+
+@pytest.mark.skipif(shutil.which('sops') is None, reason='sops CLI is not installed')
+def test_cli_decrypts_native_output(cred_file):
+    path = cred_file(CLI_DECRYPTED_FILE)
+    crypt_SOPS_native(path, SECRET_KEY, True, PUBLIC_KEY, 'encrypt')
+
+    result = subprocess.run(['sops', '--decrypt', path], capture_output=True, text=True, check=True,
+                            env={**os.environ, 'SOPS_AGE_KEY': SECRET_KEY})
+
+    assert result.stdout == read(CLI_DECRYPTED_FILE)
@@ -1,7 +1,17 @@
+import copy
+import json
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import jschon_tools
+import jsonschema
 import pytest
 from ruyaml import CommentedMap
 
-from .yaml_helper import openYaml, store_value_to_yaml, writeYamlToFile
+from .yaml_helper import (SchemaValidatorRegistry, beautifyYaml, openYaml, readYaml, sortYaml, store_value_to_yaml,
+                          validate_many, validate_yaml_by_scheme_or_fail, writeBeautifiedYaml, writeYamlToFile)
 
 CRED_VALUE = {'type': 'secret', 'data': {'secret': 'token'}}
 
@@ -47,3 +57,231 @@ def test_write_strips_existing_comments(self, tmp_path):
         writeYamlToFile(cred_path, loaded)
 
         assert_no_yaml_comments(cred_path)
+
+
+SORT_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "properties": {"name": {"type": "string"}, "deployParameters": {"type": "object"}},
+}
+SOURCE_YAML = (
+    'deployParameters:\n'
+    '  b: "1"    # from paramset\n'
+    '  a: plain\n'
+    '  multi: "x\\ny"\n'
+    'name: app\n'
+)
+
+
+class TestWriteBeautifiedYaml:
+    @pytest.mark.unit
+    @pytest.mark.parametrize("kwargs", [
+        {},
+        {"header_text": "generated\nby envgene"},
+        {"header_text": "generated", "allign_comments": True},
+        {"wrap_all_strings": True},
+    ])
+    def test_matches_write_and_beautify(self, tmp_path, kwargs):
+        schema_path = tmp_path / "schema.json"
+        schema_path.write_text(json.dumps(SORT_SCHEMA))
+        doc = readYaml(SOURCE_YAML)
+        store_value_to_yaml(doc["deployParameters"], "c", "new", "paramset: ps")
+
+        expected_path = tmp_path / "expected.yml"
+        writeYamlToFile(expected_path, doc)
+        beautifyYaml(expected_path, str(schema_path), **kwargs)
+
+        actual_path = tmp_path / "actual.yml"
+        doc = readYaml(SOURCE_YAML)
+        store_value_to_yaml(doc["deployParameters"], "c", "new", "paramset: ps")
+        writeBeautifiedYaml(actual_path, doc, str(schema_path), **kwargs)
+
+        assert actual_path.read_text() == expected_path.read_text()
+        assert list(openYaml(actual_path)) == ["name", "deployParameters"]
+
+    @pytest.mark.unit
+    def test_cred_file_has_no_comments(self, tmp_path):
+        creds = CommentedMap()
+        store_value_to_yaml(creds, 'consul-bootstrap-token', CRED_VALUE, "cloud passport")
+
+        cred_path = cred_path_in(tmp_path)
+        writeBeautifiedYaml(cred_path, creds)
+
+        assert 'consul-bootstrap-token:' in cred_path.read_text()
+        assert_no_yaml_comments(cred_path)
+
+
+NAME_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "properties": {"name": {"$ref": "common.schema.json#/definitions/name"}},
+    "required": ["name"],
+}
+COMMON_SCHEMA = {"definitions": {"name": {"type": "string", "pattern": "^[a-z-]+$"}}}
+
+
+@pytest.fixture
+def schemas_dir(tmp_path):
+    schemas = tmp_path / "schemas"
+    schemas.mkdir()
+    (schemas / "name.schema.json").write_text(json.dumps(NAME_SCHEMA))
+    (schemas / "common.schema.json").write_text(json.dumps(COMMON_SCHEMA))
+    return schemas
+
+
+class TestSchemaValidatorRegistry:
+    @pytest.mark.unit
+    def test_schema_is_checked_once(self, schemas_dir):
+        registry = SchemaValidatorRegistry()
+        schema_path = str(schemas_dir / "name.schema.json")
+        with patch.object(jsonschema.Draft7Validator, "check_schema", wraps=jsonschema.Draft7Validator.check_schema) \
+                as check_schema:
+            validators = {id(registry.get_validator(schema_path)) for _ in range(3)}
+        assert check_schema.call_count == 1
+        assert len(validators) == 1
+
+    @pytest.mark.unit
+    def test_schema_change_is_picked_up_by_mtime(self, schemas_dir):
+        registry = SchemaValidatorRegistry()
+        schema_path = schemas_dir / "name.schema.json"
+        assert registry.get_validator(str(schema_path)).is_valid({"name": 1}) is False
+
+        schema_path.write_text(json.dumps({"type": "object"}))
+        stat = schema_path.stat()
+        os.utime(schema_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert registry.get_validator(str(schema_path)).is_valid({"name": 1}) is True
+
+    @pytest.mark.unit
+    def test_refs_are_resolved_relative_to_schema_file(self, schemas_dir):
+        validator = SchemaValidatorRegistry().get_validator(str(schemas_dir / "name.schema.json"))
+        assert validator.is_valid({"name": "app-a"})
+        assert not validator.is_valid({"name": "App A"})
+
+    @pytest.mark.unit
+    def test_inline_schema_refs_are_resolved_in_schemas_dir(self, schemas_dir):
+        validator = SchemaValidatorRegistry().get_validator(schema_content=NAME_SCHEMA, schemas_dir=str(schemas_dir))
+        assert not validator.is_valid({"name": "App A"})
+
+
+class TestValidateMany:
+    @pytest.mark.unit
+    def test_all_invalid_files_are_reported(self, tmp_path, schemas_dir):
+        files = []
+        for name in ["app-a", "App B", "app-c", "App D"]:
+            path = tmp_path / f"{len(files)}.yml"
+            path.write_text(f'name: "{name}"\n')
+            files.append(str(path))
+
+        validate_many(files[::2], str(schemas_dir / "name.schema.json"))
+        with pytest.raises(ValueError, match="2 file"):
+            validate_many(files, str(schemas_dir / "name.schema.json"))
+
+    @pytest.mark.unit
+    def test_single_file_validation_uses_yaml_content(self, tmp_path, schemas_dir):
+        with pytest.raises(ValueError):
+            validate_yaml_by_scheme_or_fail(input_yaml_content={"name": 1},
+                                            schema_file_path=str(schemas_dir / "name.schema.json"))
+
+
+REPO_SCHEMAS_DIR = Path(__file__).resolve().parents[3] / "schemas"
+PLAN_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "$defs": {"endpoint": {"type": "object", "properties": {"host": {}, "port": {}}}},
+    "properties": {
+        "name": {"type": "string"},
+        "kind": {"enum": ["db", "queue"]},
+        "primary": {"$ref": "#/$defs/endpoint"},
+        "replicas": {"type": "array", "items": {"$ref": "#/$defs/endpoint"}},
+    },
+    "patternProperties": {"^x-": {"type": "object", "properties": {"b": {}, "a": {}}}},
+    "additionalProperties": {"type": "object", "properties": {"z": {}, "y": {}}},
+    "allOf": [{"properties": {"labels": {"type": "object", "properties": {"team": {}, "app": {}}}}}],
+    "if": {"properties": {"kind": {"const": "db"}}},
+    "then": {"properties": {"database": {"type": "object", "properties": {"user": {}, "schema": {}}}}},
+    "else": {"properties": {"database": {"type": "object", "properties": {"schema": {}, "user": {}}}}},
+}
+PLAN_DOC = (
+    'zone: {"y": 1, "z": 2, "w": 3}\n'
+    'x-meta: {"a": 1, "c": 2, "b": 3}\n'
+    'database: {"schema": s, "user": u, "pool": 5}\n'
+    'labels: {"app": a, "team": t}\n'
+    'replicas: [{"port": 1, "host": h, "tls": true}]\n'
+    'primary: {"port": 1, "host": h}\n'
+    'kind: {kind}\n'
+    'name: svc\n'
+)
+CREDENTIAL_SCHEMA_PATH = str(REPO_SCHEMAS_DIR / "credential.schema.json")
+
+
+def credential_schema():
+    return json.loads(Path(CREDENTIAL_SCHEMA_PATH).read_text())
+
+
+def credentials_doc(count):
+    creds = {f"cred-{i}": {"data": {"password": "p", "username": "u"}, "type": "usernamePassword"}
+             for i in range(count)}
+    return readYaml(json.dumps(creds))
+
+
+class TestSortPlan:
+    @pytest.mark.unit
+    @pytest.mark.parametrize("kind", ["db", "queue"])
+    @pytest.mark.parametrize("remove_additional_props", [False, True])
+    def test_matches_jschon_evaluation(self, kind, remove_additional_props):
+        doc = readYaml(PLAN_DOC.replace("{kind}", kind))
+        expected = jschon_tools.process_json_doc(doc_data=copy.deepcopy(doc), schema_data=PLAN_SCHEMA, sort=True,
+                                                 remove_additional_props=remove_additional_props)
+
+        actual = jschon_tools.SortPlan(PLAN_SCHEMA).process(doc, sort=True,
+                                                            remove_additional_props=remove_additional_props)
+
+        assert json.dumps(actual) == json.dumps(expected)
+        assert list(actual["database"])[:2] == (["user", "schema"] if kind == "db" else ["schema", "user"])
+
+    @pytest.mark.unit
+    def test_unsupported_schema_is_sorted_by_jschon(self, tmp_path):
+        schema = {"$schema": "https://json-schema.org/draft/2020-12/schema", "type": "object",
+                  "properties": {"b": {}, "a": {}}, "unevaluatedProperties": {"type": "string"}}
+        with pytest.raises(jschon_tools.UnsupportedSchemaError):
+            jschon_tools.SortPlan(schema)
+        schema_path = tmp_path / "schema.json"
+        schema_path.write_text(json.dumps(schema))
+
+        # "c" is evaluated by the unevaluatedProperties subschema directly and gets the sort key of its "type"
+        assert list(sortYaml(readYaml('c: "3"\na: 1\nb: 2\n'), str(schema_path), False)) == ["c", "b", "a"]
+
+    @pytest.mark.unit
+    def test_plan_is_compiled_once(self):
+        registry = SchemaValidatorRegistry()
+        assert registry.get_sort_plan(CREDENTIAL_SCHEMA_PATH) is registry.get_sort_plan(CREDENTIAL_SCHEMA_PATH)
+
+    @pytest.mark.unit
+    def test_matches_jschon_evaluation_for_credentials(self):
+        plan = SchemaValidatorRegistry().get_sort_plan(CREDENTIAL_SCHEMA_PATH)
+        doc = credentials_doc(500)
+
+        expected = jschon_tools.process_json_doc(doc_data=copy.deepcopy(doc), schema_data=credential_schema(),
+                                                 sort=True)
+        actual = plan.process(copy.deepcopy(doc), sort=True)
+
+        assert json.dumps(actual) == json.dumps(expected)
+
+    @pytest.mark.skipif(not os.getenv("ENVGENE_BENCHMARKS"), reason="benchmarks run only when ENVGENE_BENCHMARKS is set")
+    def test_benchmark_against_jschon_evaluation(self):
+        doc = credentials_doc(500)
+
+        def best_time(sort):
+            timings = []
+            for _ in range(3):
+                data = copy.deepcopy(doc)
+                start = time.perf_counter()
+                sort(data)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        plan = SchemaValidatorRegistry().get_sort_plan(CREDENTIAL_SCHEMA_PATH)
+        schema = credential_schema()
+        evaluation = best_time(lambda data: jschon_tools.process_json_doc(doc_data=data, schema_data=schema, sort=True))
+        planned = best_time(lambda data: plan.process(data, sort=True))
+        assert planned < evaluation
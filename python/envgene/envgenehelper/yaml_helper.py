@@ -100,18 +100,22 @@ def remove_empty_list_comments(data):
 
 
 def writeYamlToFile(filePath, contents):
-    from .crypt import is_cred_file
-
     filePath = Path(filePath)
     logger.info(f"Writing yaml to file: {filePath}")
     os.makedirs(os.path.dirname(filePath), exist_ok=True)
+    prepare_yaml_for_dump(filePath, contents)
+    with open(filePath, 'w+') as f:
+        yaml.dump(contents, f)
+    return
+
+
+def prepare_yaml_for_dump(filePath, contents):
+    from .crypt import is_cred_file
+
     if is_cred_file(str(filePath)):
         remove_cred_yaml_comments(contents)
     else:
         remove_empty_list_comments(contents)
-    with open(filePath, 'w+') as f:
-        yaml.dump(contents, f)
-    return
 
 
 def dumpYamlToStr(content):
@@ -125,8 +129,14 @@ def addHeaderToYaml(file_path: str, header_text: str):
         logger.debug(f'Adding header {header_text} to yaml: {file_path}')
         file_contents = openFileAsString(file_path)
         if not file_contents or file_contents[0] != "#":
-            comment_text = "# " + header_text.replace("\n", "\n# ")
-            writeToFile(file_path, comment_text + "\n" + file_contents)
+            writeToFile(file_path, add_header_to_yaml_str(file_contents, header_text))
+
+
+def add_header_to_yaml_str(yaml_text: str, header_text: str) -> str:
+    if not header_text or (yaml_text and yaml_text[0] == "#"):
+        return yaml_text
+    comment_text = "# " + header_text.replace("\n", "\n# ")
+    return comment_text + "\n" + yaml_text
 
 
 def alignYamlFileComments(file_path):
@@ -158,10 +168,14 @@ def alignYamlComments(yamlContent, extra_indent=0):
 
 
 def sortYaml(yaml_data, schema_path, remove_additional_props):
-    with open(schema_path, 'r') as f:
-        schema_data = json.load(f)
+    schema_data, validator = schema_validators.get(schema_path)
     logger.debug(f'Checking yaml with schema: {schema_path}')
-    jsonschema.validate(yaml_data, schema_data)
+    error = jsonschema.exceptions.best_match(validator.iter_errors(yaml_data))
+    if error is not None:
+        raise error
+    sort_plan = schema_validators.get_sort_plan(schema_path)
+    if sort_plan is not None:
+        return sort_plan.process(yaml_data, sort=True, remove_additional_props=remove_additional_props)
     sort_data = jschon_tools.process_json_doc(
         schema_data=schema_data,
         doc_data=yaml_data,
@@ -296,19 +310,44 @@ def merge_dict_key_with_comment(targetKey, targetYaml, sourceKey, sourceYaml, co
 def beautifyYaml(file_path, schema_path="", header_text="", allign_comments=False, wrap_all_strings=False,
                  remove_additional_props=False):
     logger.info(f'Beautifying yaml: {file_path} with schema: {schema_path}')
-    yamlData = openYaml(file_path)
+    yaml_text = beautify_yaml_to_str(openYaml(file_path), schema_path, header_text, allign_comments,
+                                     wrap_all_strings, remove_additional_props, file_path)
+    writeToFile(file_path, yaml_text)
+
+
+def writeBeautifiedYaml(file_path, yaml_data, schema_path="", header_text="", allign_comments=False,
+                        wrap_all_strings=False, remove_additional_props=False):
+    """Beautifies yaml document in memory and writes it to file_path once. Result is the same as
+    writeYamlToFile followed by beautifyYaml."""
+    logger.info(f'Writing beautified yaml: {file_path} with schema: {schema_path}')
+    # comment columns of modified documents are normalized the same way as on reading the file back
+    prepare_yaml_for_dump(file_path, yaml_data)
+    yaml_data = readYaml(dumpYamlToStr(yaml_data), context=f"File: {file_path}")
+    yaml_text = beautify_yaml_to_str(yaml_data, schema_path, header_text, allign_comments, wrap_all_strings,
+                                     remove_additional_props, file_path)
+    writeToFile(file_path, yaml_text)
+
+
+def beautify_yaml_to_str(yaml_data, schema_path="", header_text="", allign_comments=False, wrap_all_strings=False,
+                         remove_additional_props=False, file_path="") -> str:
+    # file_path is only used to detect credential files, comments are dropped from them on dump
     if schema_path:
-        yamlData = sortYaml(yamlData, schema_path, remove_additional_props)
+        yaml_data = sortYaml(yaml_data, schema_path, remove_additional_props)
     if wrap_all_strings:
-        make_quotes_for_all_strings(yamlData)
+        make_quotes_for_all_strings(yaml_data)
     else:
-        make_quotes_for_strings(yamlData)
+        make_quotes_for_strings(yaml_data)
 
-    writeYamlToFile(file_path, yamlData)
-    addHeaderToYaml(file_path, header_text)
-    align_spaces_before_comments(file_path)
+    prepare_yaml_for_dump(file_path, yaml_data)
+    yaml_text = add_header_to_yaml_str(dumpYamlToStr(yaml_data), header_text)
+    yaml_text = align_spaces_before_comments_in_str(yaml_text)
     if allign_comments:
-        alignYamlFileComments(file_path)
+        # comment columns are taken from the dumped text, so the document is parsed once more
+        yaml_data = readYaml(yaml_text)
+        alignYamlComments(yaml_data, 0)
+        prepare_yaml_for_dump(file_path, yaml_data)
+        yaml_text = dumpYamlToStr(yaml_data)
+    return yaml_text
 
 
 def find_yaml_file(dir_path: Path, search_name: str, recursively: bool = False) -> Path | None:
@@ -381,18 +420,14 @@ def make_quotes_for_strings(yaml_data):
 
 
 def align_spaces_before_comments(filePath):
-    result = ""
-    f = open(filePath, 'r')
-    fileLines = f.readlines()
-    for line in fileLines:
-        if re.match(r'^(.*):( +)#(.*)$', line):
-            pattern = r'^(.*):( +)#(.*)$'
-            alignedLine = re.sub(pattern, r'\1: #\3', line)
-        else:
-            alignedLine = line
-        result += alignedLine
+    writeToFile(filePath, align_spaces_before_comments_in_str(openFileAsString(filePath)))
+
+
+_SPACES_BEFORE_COMMENT_PATTERN = re.compile(r'^(.*):( +)#(.*)$', re.MULTILINE)
+
 
-    writeToFile(filePath, result)
+def align_spaces_before_comments_in_str(yaml_text: str) -> str:
+    return _SPACES_BEFORE_COMMENT_PATTERN.sub(r'\1: #\3', yaml_text)
 
 
 def copy_yaml_and_remove_empty_dicts(source_yaml):
@@ -420,18 +455,82 @@ def yaml_from_string(yaml_str):
     return result
 
 
+class SchemaValidatorRegistry:
+    """
+    Process wide cache of checked and compiled jsonschema validators and of jschon sort plans.
+
+    File schemas are keyed by absolute path + mtime, inline schemas by their content, so each
+    schema is loaded, checked and has its $refs resolved (relative to schemas_dir or to the
+    schema file directory) only once per process.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple, tuple[dict, jsonschema.protocols.Validator]] = {}
+        self._sort_plans: dict[tuple, jschon_tools.SortPlan | None] = {}
+
+    @staticmethod
+    def _key(schema_file_path: str = None, schema_content: dict = None, schemas_dir=None) -> tuple:
+        if schema_file_path:
+            schema_file_path = os.path.abspath(schema_file_path)
+            source_key = (schema_file_path, os.stat(schema_file_path).st_mtime_ns)
+        else:
+            source_key = (json.dumps(schema_content, sort_keys=True, default=str),)
+        return (*source_key, os.path.abspath(schemas_dir) if schemas_dir else None)
+
+    def get(self, schema_file_path: str = None, schema_content: dict = None,
+            schemas_dir=None) -> tuple[dict, jsonschema.protocols.Validator]:
+        key = self._key(schema_file_path, schema_content, schemas_dir)
+        entry = self._entries.get(key)
+        if entry is None:
+            schema = openJson(schema_file_path) if schema_file_path else schema_content
+            entry = (schema, self._compile(schema, schema_file_path, schemas_dir))
+            self._entries[key] = entry
+        return entry
+
+    def get_validator(self, schema_file_path: str = None, schema_content: dict = None,
+                      schemas_dir=None) -> jsonschema.protocols.Validator:
+        return self.get(schema_file_path, schema_content, schemas_dir)[1]
+
+    def get_sort_plan(self, schema_file_path: str) -> jschon_tools.SortPlan | None:
+        """Returns sort plan of the schema, None if the schema has to be sorted by jschon evaluation"""
+        key = self._key(schema_file_path)
+        if key not in self._sort_plans:
+            schema = self.get(schema_file_path)[0]
+            try:
+                self._sort_plans[key] = jschon_tools.SortPlan(schema)
+            except jschon_tools.UnsupportedSchemaError as e:
+                logger.debug(f"Schema {schema_file_path} is sorted by jschon evaluation: {e}")
+                self._sort_plans[key] = None
+        return self._sort_plans[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._sort_plans.clear()
+
+    @staticmethod
+    def _compile(schema, schema_file_path, schemas_dir):
+        logger.debug(f"Compiling schema validator: {schema_file_path or schema.get('title', 'inline schema')}")
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        refs_dir = schemas_dir or (os.path.dirname(schema_file_path) if schema_file_path else None)
+        if refs_dir:
+            base_uri = Path(refs_dir).absolute().as_uri() + "/"
+            return cls(schema, resolver=RefResolver(base_uri=base_uri, referrer=schema))
+        return cls(schema)
+
+
+schema_validators = SchemaValidatorRegistry()
+
+
 def validate_yaml_by_scheme_or_fail(yaml_file_path: str = None, schema_file_path: str = None,
                                     input_yaml_content: dict = None, input_schema_content: dict = None,
                                     schemas_dir=None):
-    yaml_content = openYaml(yaml_file_path) if yaml_file_path else input_yaml_content
-    schema_content = openJson(schema_file_path) if schema_file_path else input_schema_content
-
-    if schemas_dir:
-        base_uri = Path(schemas_dir).absolute().as_uri() + "/"
-        resolver = RefResolver(base_uri=base_uri, referrer=schema_content)
-        errors = validate_yaml_data_by_scheme(yaml_content, schema_content, resolver=resolver)
+    if input_yaml_content is None:
+        yaml_content = openYaml(yaml_file_path)
     else:
-        errors = validate_yaml_data_by_scheme(yaml_content, schema_content)
+        yaml_content = input_yaml_content
+    validator = schema_validators.get_validator(schema_file_path, input_schema_content, schemas_dir)
+    errors = sorted(validator.iter_errors(yaml_content), key=lambda e: e.path)
     if len(errors) > 0:
         if yaml_file_path:
             rel_path = getRelPath(yaml_file_path)
@@ -441,6 +540,19 @@ def validate_yaml_by_scheme_or_fail(yaml_file_path: str = None, schema_file_path
         raise ValueError("Validation failed") from None
 
 
+def validate_many(yaml_file_paths, schema_file_path: str = None, schema_content: dict = None, schemas_dir=None):
+    """Validates all files by one schema, logs errors of every invalid file and fails at the end."""
+    failed = []
+    for yaml_file_path in yaml_file_paths:
+        try:
+            validate_yaml_by_scheme_or_fail(yaml_file_path, schema_file_path, input_schema_content=schema_content,
+                                            schemas_dir=schemas_dir)
+        except ValueError:
+            failed.append(getRelPath(yaml_file_path))
+    if failed:
+        raise ValueError(f"Validation failed for {len(failed)} file(s): {', '.join(failed)}") from None
+
+
 def validate_yaml_data_by_scheme(data, schema, cls=None, *args, **kwargs):
     if cls is None:
         cls = jsonschema.validators.validator_for(schema)
@@ -1,5 +1,9 @@
 from ._main import process_json_doc
+from ._plan import SortPlan
+from ._plan import UnsupportedSchemaError
 
 __all__ = [
     'process_json_doc',
+    'SortPlan',
+    'UnsupportedSchemaError',
 ]
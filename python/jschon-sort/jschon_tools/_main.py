@@ -69,14 +69,18 @@ def _traverse_result(result: jschon.jsonschema.Result) -> None:
     return doc_sort_keys
 
 
-def _get_root_result(doc_json: jschon.JSON, schema_data: Mapping[str, JSONCompatible]) -> jschon.jsonschema.Result:
+def _create_root_schema(schema_data: Mapping[str, JSONCompatible]) -> jschon.JSONSchema:
     try:
-        root_schema = jschon.JSONSchema(schema_data)
+        return jschon.JSONSchema(schema_data)
     except jschon.CatalogError:
         # jschon only supports newer jsonschema drafts
         schema_data = dict(schema_data)
         schema_data['$schema'] = "https://json-schema.org/draft/2020-12/schema"
-        root_schema = jschon.JSONSchema(schema_data)
+        return jschon.JSONSchema(schema_data)
+
+
+def _get_root_result(doc_json: jschon.JSON, schema_data: Mapping[str, JSONCompatible]) -> jschon.jsonschema.Result:
+    root_schema = _create_root_schema(schema_data)
     res = root_schema.evaluate(doc_json)
     if not res.valid:
         raise ValueError('Document failed schema validation')
@@ -50,6 +50,11 @@ def override_app_reg_defs(base_dir: str, env_dir: str, placement_mode: str) -> N
                 logger.debug(f"Override applied: {yaml_file} -> {env_dst}")
 
 
+def get_app_reg_defs_render_dir(cluster_name: str, env_name: str) -> str:
+    # environments with the same name in different clusters must not share the render dir
+    return f"/tmp/render/{cluster_name}/{env_name}"
+
+
 def main():
     template_version = process_env_template()
 
@@ -59,11 +64,12 @@ def main():
     instances_dir = getenv_with_error("INSTANCES_DIR")
 
     output_dir = f"{base_dir}/environments"
-    render_dir = f"/tmp/render/{env_name}"
+    render_dir = get_app_reg_defs_render_dir(cluster_name, env_name)
     templates_dirs = get_template_dirs()
 
     env_dir = get_env_instances_dir(env_name, cluster_name, instances_dir)
     cloud_passport_file_path = find_cloud_passport_definition(env_dir, instances_dir)
+    delete_dir_if_exists(render_dir)
     copy_path(f'{env_dir}/Inventory', f'{render_dir}/Inventory')
     process_additional_template_parameters(render_dir, env_dir, instances_dir)
 
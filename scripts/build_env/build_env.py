@@ -33,24 +33,43 @@ def _get_excluded_dirs_for_role(role: NamespaceRole, origin_template_exists: boo
         return [origin_dir, peer_dir]
 
 
+PARAMSET_FILE_EXTENSIONS = (".json", ".yml", ".yaml", ".j2")
+PARAMSET_SOURCE_DIRS = ('from_origin_template', 'from_peer_template', 'from_template', 'from_instance')
+
+
+def create_paramset_index(dir: str) -> dict:
+    # single scan of parameters dir, role-specific paramset maps are derived from it
+    result = {}
+    for root, _, files in os.walk(dir):
+        for file_name in sorted(files):
+            if not file_name.endswith(PARAMSET_FILE_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, file_name)
+            stat = os.stat(file_path)
+            entry = {
+                "filePath": file_path,
+                "source": next((d for d in PARAMSET_SOURCE_DIRS if d in file_path), ""),
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+            }
+            result.setdefault(extractNameFromFile(file_path), []).append(entry)
+    logger.info(f"Indexed {sum(len(v) for v in result.values())} paramset files in {dir}")
+    return result
+
+
 def create_paramset_map(dir: str, role: NamespaceRole,
-                        origin_template_exists: bool, peer_template_exists: bool) -> dict:
+                        origin_template_exists: bool, peer_template_exists: bool, paramset_index: dict = None) -> dict:
     excluded_dirs = _get_excluded_dirs_for_role(role, origin_template_exists, peer_template_exists)
+    if paramset_index is None:
+        paramset_index = create_paramset_index(dir)
     result = {}
-    dir_pointer = pathlib.Path(dir)
-    masks = ["*.json", "*.yml", "*.yaml", "*.j2"]
-
-    for mask in masks:
-        for f in dir_pointer.rglob(mask):
-            file_path = str(f)
+    for key, index_entries in paramset_index.items():
+        for index_entry in index_entries:
+            file_path = index_entry["filePath"]
             if any(excluded_dir in file_path for excluded_dir in excluded_dirs):
                 continue
-            key = extractNameFromFile(file_path)
-            entry = {"filePath": file_path, "envSpecific": False}
-            if key in result:
-                result[key].append(entry)
-            else:
-                result[key] = [entry]
+            # entries are created per map, as envSpecific flag is set on them during templates processing
+            result.setdefault(key, []).append({"filePath": file_path, "envSpecific": False})
 
     logger.info(f"Created {role.name}-specific paramset map: excluded dirs {excluded_dirs}, "
                 f"origin_template_exists={origin_template_exists}, peer_template_exists={peer_template_exists}")
@@ -89,6 +108,24 @@ def findParamsetsInDir(dirPath):
     return fileList
 
 
+# per build_env run caches, env_definition.yml files are parsed once and paramset template context
+# is created once per template directory instead of once per paramset entry
+_env_definition_cache = {}
+_paramset_template_context_cache = {}
+
+
+def reset_env_definition_cache():
+    _env_definition_cache.clear()
+    _paramset_template_context_cache.clear()
+
+
+def _open_env_definition(env_def_path):
+    key = os.path.realpath(env_def_path)
+    if key not in _env_definition_cache:
+        _env_definition_cache[key] = openYaml(env_def_path)
+    return _env_definition_cache[key]
+
+
 def findEnvDefinitionFromTemplatePath(templatePath, env_instances_dir=None):
     # Walk up the directory tree until we find the Inventory/env_definition.yml file
     current_dir = os.path.dirname(templatePath)
@@ -129,7 +166,7 @@ def findEnvDefinitionFromTemplatePath(templatePath, env_instances_dir=None):
                     f"Invalid folder structure. Expected: environments/<cluster>/<environment>/, found incomplete hierarchy in: {current_dir}. Please check the folder structure.")
 
         if os.path.exists(env_def_path):
-            env_definition = openYaml(env_def_path)
+            env_definition = _open_env_definition(env_def_path)
 
             # If environmentName is not defined, use the derived name
             if "inventory" in env_definition and not env_definition["inventory"].get(
@@ -151,7 +188,7 @@ def findEnvDefinitionFromTemplatePath(templatePath, env_instances_dir=None):
                 relative_path = current_dir[tmp_index + 5:]  # Skip "/tmp/"
                 source_path = os.path.join(env_instances_dir, relative_path, "Inventory", "env_definition.yml")
                 if os.path.exists(source_path):
-                    env_definition = openYaml(source_path)
+                    env_definition = _open_env_definition(source_path)
 
                     # If environmentName is not defined, use the derived name
                     if "inventory" in env_definition and not env_definition["inventory"].get(
@@ -188,6 +225,61 @@ def findEnvDefinitionFromTemplatePath(templatePath, env_instances_dir=None):
     raise ReferenceError(f"Environment definition not found for template {templatePath}")
 
 
+def create_paramset_template_context(env_definition) -> dict:
+    # Get environment name from inventory, with fallback to derived name from path
+    env_name = env_definition["inventory"].get("environmentName")
+
+    # Get cloud name and cluster information for macro support
+    cloud_name = env_definition["inventory"].get("cloudName", "")
+    cluster_name = env_definition.get("_derived_cluster_name", "")
+
+    # Create cloudNameWithCluster for macro support
+    cloud_name_with_cluster = f"{cloud_name}-{cluster_name}" if cloud_name and cluster_name else cloud_name
+
+    # Create environment context with comprehensive macro support
+    current_env = {
+        "name": env_name,
+        "environmentName": env_name,  # Alternative access
+        "cloud": cloud_name,
+        "cloudNameWithCluster": cloud_name_with_cluster,
+        "solution_structure": env_definition.get("solutionStructure", {}),
+        "additionalTemplateVariables": env_definition.get("envTemplate", {}).get(
+            "additionalTemplateVariables", {}),
+        "cluster": {
+            "name": cluster_name,
+            # Add cluster-specific properties that might be used in templates
+            "cloud_api_url": env_definition.get("envTemplate", {}).get("additionalTemplateVariables",
+                                                                       {}).get("cloud_api_url", ""),
+            "cloud_api_port": env_definition.get("envTemplate", {}).get("additionalTemplateVariables",
+                                                                        {}).get("cloud_api_port", ""),
+            "cloud_public_url": env_definition.get("envTemplate", {}).get("additionalTemplateVariables",
+                                                                          {}).get("cloud_public_url", ""),
+            "cloud_api_protocol": env_definition.get("envTemplate", {}).get("additionalTemplateVariables",
+                                                                            {}).get("cloud_api_protocol",
+                                                                                    "https")
+        }
+    }
+    return {
+        "env_definition": env_definition,
+        "current_env": current_env
+    }
+
+
+def get_paramset_template_context(templatePath, env_instances_dir=None) -> dict:
+    key = (os.path.realpath(os.path.dirname(templatePath)), env_instances_dir)
+    if key not in _paramset_template_context_cache:
+        try:
+            env_definition = findEnvDefinitionFromTemplatePath(templatePath, env_instances_dir)
+            _paramset_template_context_cache[key] = create_paramset_template_context(env_definition)
+        except Exception as e:
+            # failures are cached as well, they are caused by folder structure that doesn't change during run
+            _paramset_template_context_cache[key] = e
+    result = _paramset_template_context_cache[key]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
 def sort_paramsets_with_same_name(entries: list[dict]) -> list[dict]:
     # Strict order processing paramsets template -> cluster -> instance
     # Lower sort keys are processed first, later values override earlier ones
@@ -203,7 +295,8 @@ def sort_key(e):
 
 
 def convertParameterSetsToParameters(templatePath, paramsTemplate, paramsetsTag, parametersTag, paramset_map,
-                                     env_specific_params_map, header_text="", env_instances_dir=None):
+                                     env_specific_params_map, header_text="", env_instances_dir=None,
+                                     app_definitions=None):
     params = copy.deepcopy(paramsTemplate[parametersTag])
     for pset in paramsTemplate[paramsetsTag]:
         # Check if paramset exists in paramset_map before accessing it
@@ -219,44 +312,7 @@ def convertParameterSetsToParameters(templatePath, paramsTemplate, paramsetsTag,
             isEnvSpecificParamset = entry["envSpecific"]
             # Get template context from environment definition
             try:
-                env_definition = findEnvDefinitionFromTemplatePath(templatePath, env_instances_dir)
-                # Get environment name from inventory, with fallback to derived name from path
-                env_name = env_definition["inventory"].get("environmentName")
-
-                # Get cloud name and cluster information for macro support
-                cloud_name = env_definition["inventory"].get("cloudName", "")
-                cluster_name = env_definition.get("_derived_cluster_name", "")
-
-                # Create cloudNameWithCluster for macro support
-                cloud_name_with_cluster = f"{cloud_name}-{cluster_name}" if cloud_name and cluster_name else cloud_name
-
-                # Create environment context with comprehensive macro support
-                current_env = {
-                    "name": env_name,
-                    "environmentName": env_name,  # Alternative access
-                    "cloud": cloud_name,
-                    "cloudNameWithCluster": cloud_name_with_cluster,
-                    "solution_structure": env_definition.get("solutionStructure", {}),
-                    "additionalTemplateVariables": env_definition.get("envTemplate", {}).get(
-                        "additionalTemplateVariables", {}),
-                    "cluster": {
-                        "name": cluster_name,
-                        # Add cluster-specific properties that might be used in templates
-                        "cloud_api_url": env_definition.get("envTemplate", {}).get("additionalTemplateVariables",
-                                                                                   {}).get("cloud_api_url", ""),
-                        "cloud_api_port": env_definition.get("envTemplate", {}).get("additionalTemplateVariables",
-                                                                                    {}).get("cloud_api_port", ""),
-                        "cloud_public_url": env_definition.get("envTemplate", {}).get("additionalTemplateVariables",
-                                                                                      {}).get("cloud_public_url", ""),
-                        "cloud_api_protocol": env_definition.get("envTemplate", {}).get("additionalTemplateVariables",
-                                                                                        {}).get("cloud_api_protocol",
-                                                                                                "https")
-                    }
-                }
-                template_context = {
-                    "env_definition": env_definition,
-                    "current_env": current_env
-                }
+                template_context = get_paramset_template_context(templatePath, env_instances_dir)
                 paramSetValues = openParamset(paramSetFile, template_context)
             except Exception as e:
                 logger.warning(f"Failed to render template for paramset {pset}: {str(e)}")
@@ -286,29 +342,46 @@ def convertParameterSetsToParameters(templatePath, paramsTemplate, paramsetsTag,
             # prepare application parameters
             convertParameterSetsToApplication(templatePath, paramsetDefinitionComment, paramSetAppParams, pset,
                                               parametersTag, isEnvSpecificParamset, env_specific_params_map,
-                                              header_text)
+                                              header_text, app_definitions)
     params = sortParameters(params)
     return params
 
 
 def convertParameterSetsToApplication(templatePath, paramsetDefinitionComment, applicationsParamSets, paramsetName,
-                                      parametersTag, isEnvSpecificParamset, env_specific_params_map, header_text=""):
-    application_schema = "schemas/application.schema.json"
+                                      parametersTag, isEnvSpecificParamset, env_specific_params_map, header_text="",
+                                      app_definitions=None):
+    # app_definitions collects application files of the whole template, so that they are
+    # written once by flushApplicationParameters instead of after every paramset
+    flush_now = app_definitions is None
+    if flush_now:
+        app_definitions = {}
     for appParams in applicationsParamSets:
         appName = appParams["appName"] if "appName" in appParams else appParams["name"]
         applicationParametersFile = os.path.dirname(templatePath) + "/Applications/" + appName + ".yml"
-        appDefinition = getApplicationParametersYaml(appName, applicationParametersFile)
+        if applicationParametersFile not in app_definitions:
+            app_definitions[applicationParametersFile] = getApplicationParametersYaml(appName,
+                                                                                      applicationParametersFile)
+        appDefinition = app_definitions[applicationParametersFile]
         for j in appParams["parameters"]:
             # get value with potential merge of dicts
             val = get_merged_param_value(j, appDefinition[parametersTag], appParams["parameters"])
             store_value_to_yaml(appDefinition[parametersTag], j, val, paramsetDefinitionComment)
             if isEnvSpecificParamset:
                 storeToEnvSpecificParametersMap(env_specific_params_map, appName, parametersTag, j, val, paramsetName)
-        writeYamlToFile(applicationParametersFile, appDefinition)
-        beautifyYaml(applicationParametersFile, application_schema, header_text, wrap_all_strings=False)
+    if flush_now:
+        flushApplicationParameters(app_definitions, header_text)
     return
 
 
+def flushApplicationParameters(app_definitions, header_text=""):
+    application_schema = "schemas/application.schema.json"
+    for applicationParametersFile, appDefinition in app_definitions.items():
+        writeBeautifiedYaml(applicationParametersFile, appDefinition, application_schema, header_text,
+                            wrap_all_strings=False)
+    logger.debug(f"Written {len(app_definitions)} application parameter files")
+    app_definitions.clear()
+
+
 def initParametersStructure(map, key, is_app=False):
     if key not in map:
         map[key] = {}
@@ -394,17 +467,21 @@ def processTemplate(templatePath, templateName, env_instances_dir, schema_path,
     templateContent = openYaml(templatePath)
     if process_env_specific:
         updateEnvSpecificParamsets(env_instances_dir, templateName, templateContent, paramset_map)
+    # application files touched by paramsets of this template, written once at the end
+    app_definitions = {}
     # process deployParameters
     templateContent["deployParameters"] = convertParameterSetsToParameters(templatePath, templateContent,
                                                                            "deployParameterSets", "deployParameters",
                                                                            paramset_map, env_specific_params_map,
-                                                                           header_text, env_instances_dir)
+                                                                           header_text, env_instances_dir,
+                                                                           app_definitions)
     templateContent["deployParameterSets"] = []
     # process e2eParameters
     templateContent["e2eParameters"] = convertParameterSetsToParameters(templatePath, templateContent,
                                                                         "e2eParameterSets", "e2eParameters",
                                                                         paramset_map, env_specific_params_map,
-                                                                        header_text, env_instances_dir)
+                                                                        header_text, env_instances_dir,
+                                                                        app_definitions)
     templateContent["e2eParameterSets"] = []
     # process technicalConfigurationParameters
     templateContent["technicalConfigurationParameters"] = convertParameterSetsToParameters(templatePath,
@@ -414,14 +491,15 @@ def processTemplate(templatePath, templateName, env_instances_dir, schema_path,
                                                                                            paramset_map,
                                                                                            env_specific_params_map,
                                                                                            header_text,
-                                                                                           env_instances_dir)
+                                                                                           env_instances_dir,
+                                                                                           app_definitions)
     templateContent["technicalConfigurationParameterSets"] = []
+    flushApplicationParameters(app_definitions, header_text)
     # preparing map for needed resource profiles
     if has_valid_profile_name(templateContent):
         rpName = templateContent["profile"]["name"]
         resource_profiles_map[templateName] = rpName
-    writeYamlToFile(templatePath, templateContent)
-    beautifyYaml(templatePath, schema_path, header_text)
+    writeBeautifiedYaml(templatePath, templateContent, schema_path, header_text)
     return
 
 
@@ -469,6 +547,7 @@ def process_additional_template_parameters(render_env_dir, source_env_dir, all_i
 
 def build_env(env_name, env_instances_dir, parameters_dir, env_template_dir, resource_profiles_dir,
               env_specific_resource_profile_map, all_instances_dir, render_context, templates_dirs=None, is_external_cred_env=False):
+    reset_env_definition_cache()
     # Check which role-specific templates were downloaded
     templates_dirs = templates_dirs or {}
     origin_template_exists = NamespaceRole.ORIGIN in templates_dirs
@@ -477,12 +556,13 @@ def build_env(env_name, env_instances_dir, parameters_dir, env_template_dir, res
                 f"origin_exists={origin_template_exists}, peer_exists={peer_template_exists}")
 
     # Create role-specific paramset maps
+    paramset_index = create_paramset_index(parameters_dir)
     origin_paramset_map = create_paramset_map(parameters_dir, NamespaceRole.ORIGIN,
-                                              origin_template_exists, peer_template_exists)
+                                              origin_template_exists, peer_template_exists, paramset_index)
     peer_paramset_map = create_paramset_map(parameters_dir, NamespaceRole.PEER,
-                                            origin_template_exists, peer_template_exists)
+                                            origin_template_exists, peer_template_exists, paramset_index)
     common_paramset_map = create_paramset_map(parameters_dir, NamespaceRole.COMMON,
-                                              origin_template_exists, peer_template_exists)
+                                              origin_template_exists, peer_template_exists, paramset_index)
 
     env_dir = env_template_dir + "/" + env_name
     logger.info(f"Env name: {env_name}")
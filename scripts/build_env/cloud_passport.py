@@ -94,8 +94,7 @@ def process_cloud_definition(cloudPassportYaml, env_dir, comment, is_external_cr
     logger.debug(f"Rest of params from cloud passport are: \n{dump_as_yaml_format(cloudPassportYaml)}")
     mergeDeployParametersFromPassport(cloudPassportYaml, cloudYaml, comment, is_external_cred_env)
     # storing cloud yaml
-    writeYamlToFile(cloudYamlPath, cloudYaml)
-    beautifyYaml(cloudYamlPath, cloud_schema)
+    writeBeautifiedYaml(cloudYamlPath, cloudYaml, cloud_schema)
 
 def add_cloud_passport_creds(cloud_passport_name, cloud_passport_file_path, env_dir, comment, is_external_cred_env):
     logger.info(f"Searching credentials for cloud passport {cloud_passport_file_path}")
@@ -1,7 +1,9 @@
 from pathlib import Path
 import os
 from envgenehelper import *
+from envgenehelper.parallel_helper import run_in_parallel
 from typing import Optional, Set
+from ruyaml import CommentedMap
 
 #const
 CRED_TYPE_SECRET="secret"
@@ -9,6 +11,12 @@
 CRED_TYPE_VAULT="vaultAppRole"
 CRED_TYPE_EXTERNAL="external"
 
+# below this number of extraction tasks files are parsed in current process
+CREDS_EXTRACT_PARALLEL_THRESHOLD = 4
+NAMESPACE_APPLICATION_PATTERN = r".+/Namespaces/.+/Applications/.+"
+ENTITY_CLOUD_APPLICATION = "cloudApplication"
+ENTITY_NAMESPACE = "namespace"
+
 def createCredDefinition(credId, credType) :
     cred = {}
     cred["credentialsId"] = credId.strip("\"")
@@ -35,8 +43,7 @@ def processSingleParam(key, value, credsList, tenantName, cloudName, namespaceNa
         for idx, item in enumerate(value):
             value[idx] = processSingleParam(idx, item, credsList, tenantName, cloudName, namespaceName, comment, external_cred_ids)
     elif isinstance(value, str):
-        if check_is_cred(key, value):
-            appendCredList(get_cred_list_from_param(key, value, True, tenantName, cloudName, namespaceName), credsList, comment)
+        appendCredList(get_cred_list_from_param(key, value, True, tenantName, cloudName, namespaceName), credsList, comment)
 
 def checkCredAndAppend(credName, credsList, secretType, comment="", is_external_cred_env=False, external_cred_ids=None):
     if (credName):
@@ -136,14 +143,96 @@ def getApplicationCreds(appPath, tenantName, cloudName, namespaceName="", extern
     processParametersAndAppend("technicalConfigurationParameters", appContent, creds, tenantName, cloudName, namespaceName, comment=comment)
     return creds
 
-def mergeCreds(newCreds, allCreds) :
-    count = 0
-    for cred in newCreds :
-        if not any(c["cred"]["credentialsId"] == cred["cred"]["credentialsId"] for c in allCreds) :
-            count = count + 1
-            allCreds.append(cred)
+class CredentialRegistry:
+    """
+    Cred definitions found in environment, indexed by credentialsId in order of discovery.
+    The first definition of credentialsId is kept, comments of all places it is referred from are kept as provenance.
+    """
+
+    def __init__(self):
+        self._creds = {}
+        self._provenance = {}
+
+    def add(self, credItem) -> bool:
+        credId = credItem["cred"]["credentialsId"]
+        self._provenance.setdefault(credId, []).append(credItem["comment"])
+        if credId in self._creds:
+            return False
+        self._creds[credId] = credItem
+        return True
+
+    def merge(self, newCreds) -> int:
+        return sum(1 for cred in newCreds if self.add(cred))
+
+    def provenance(self, credId) -> list:
+        return list(self._provenance.get(credId, []))
+
+    def ids(self) -> list:
+        return list(self._creds)
+
+    def __contains__(self, credId):
+        return credId in self._creds
+
+    def __iter__(self):
+        return iter(self._creds.values())
+
+    def __len__(self):
+        return len(self._creds)
+
+def mergeCreds(newCreds, allCreds: CredentialRegistry) :
+    count = allCreds.merge(newCreds)
     return { "countAdded": count, "mergedCreds" : allCreds }
 
+def discoverEntityFiles(envDir):
+    """
+    Finds cloud applications, namespaces and namespace applications of environment in one directory walk.
+    Namespace applications are grouped by path of their namespace file.
+    """
+    allYamls = findAllYamlsInDir(envDir)
+    cloudApplicationsDir = Path(envDir, "Applications").as_posix() + "/"
+    cloudApplications = sorted(p for p in allYamls if Path(p).as_posix().startswith(cloudApplicationsDir))
+    namespaces = sorted(findFiles(allYamls, "/Namespaces", additionalRegexpNotPattern=NAMESPACE_APPLICATION_PATTERN))
+    namespaceApplications = sorted(findFiles(allYamls, "/Applications", additionalRegexpPattern=NAMESPACE_APPLICATION_PATTERN))
+    # if several files are found for the same namespace key, the last one defines namespace name
+    namespaceByKey = {extract_namespace_from_namespace_path(p): p for p in namespaces}
+    applicationsByNamespace = {p: [] for p in namespaces}
+    for appPath in namespaceApplications:
+        namespaceKey = extract_namespace_from_application_path(appPath)
+        if namespaceKey not in namespaceByKey:
+            raise ReferenceError(f"Namespace {namespaceKey} of application {appPath} is not found in {envDir}")
+        applicationsByNamespace[namespaceByKey[namespaceKey]].append(appPath)
+    return {
+        "cloudApplications": cloudApplications,
+        "namespaces": namespaces,
+        "namespaceApplications": namespaceApplications,
+        "applicationsByNamespace": applicationsByNamespace,
+    }
+
+def _extractEntityCreds(task):
+    entityType, path, appPaths, tenantName, cloudName, is_external_cred_env = task
+    external_cred_ids = set()
+    result = {"namespaceName": "", "creds": {}, "externalCredIds": external_cred_ids}
+    if entityType == ENTITY_CLOUD_APPLICATION:
+        result["creds"][path] = getApplicationCreds(path, tenantName, cloudName, external_cred_ids=external_cred_ids)
+        return result
+    namespaceYaml = openYaml(path)
+    namespaceName = namespaceYaml["name"]
+    result["namespaceName"] = namespaceName
+    result["creds"][path] = getNamespaceCreds(namespaceYaml, tenantName, cloudName, namespaceName, is_external_cred_env, external_cred_ids)
+    for appPath in appPaths:
+        result["creds"][appPath] = getApplicationCreds(appPath, tenantName, cloudName, namespaceName, external_cred_ids)
+    return result
+
+def extractEntityCreds(tasks):
+    """
+    Parses entity files and extracts cred definitions from them, in worker processes for big environments.
+    Results are returned in order of tasks.
+    """
+    # small environments are processed in current process, with the same errors
+    max_workers = 1 if len(tasks) < CREDS_EXTRACT_PARALLEL_THRESHOLD else None
+    return run_in_parallel(_extractEntityCreds, tasks, "Credentials extraction", describe=lambda task: task[1],
+                           max_workers=max_workers)
+
 def getCredDefinitionYaml(yamlPath):
     result = yaml.load("{}")
     os.makedirs(os.path.dirname(yamlPath), exist_ok=True)
@@ -154,26 +243,30 @@ def getCredDefinitionYaml(yamlPath):
 def writeCredToYaml(credItem, credsYaml) :
     cred = credItem["cred"]
     comment = credItem["comment"]  # Reserved for provenance metadata; separate files planned.
-    newCred = yaml.load("{}")
+    newCred = CommentedMap()
     #newCred.insert(1, "credentialsId", cred["credentialsId"])
     newCred.insert(1, "type", cred["type"])
     if (cred["type"] == CRED_TYPE_USERPASS) :
-        data = yaml.load("{}")
+        data = CommentedMap()
         data.insert(1, "username", "envgeneNullValue", "FillMe")
         data.insert(1, "password", "envgeneNullValue", "FillMe")
         newCred["data"] = data
     elif (cred["type"] == CRED_TYPE_SECRET):
-        data = yaml.load("{}")
+        data = CommentedMap()
         data.insert(1, "secret", "envgeneNullValue", "FillMe")
         newCred["data"] = data
     elif (cred["type"] == CRED_TYPE_VAULT):
-        data = yaml.load("{}")
+        data = CommentedMap()
         data.insert(1, "roleId", "envgeneNullValue", "FillMe")
         data.insert(1, "secretId", "envgeneNullValue", "FillMe")
         data.insert(1, "path", "envgeneNullValue", "FillMe")
         data.insert(1, "namespace", "envgeneNullValue", "FillMe")
         newCred["data"] = data
-    store_value_to_yaml(credsYaml, cred["credentialsId"], newCred)
+    if cred["credentialsId"] in credsYaml:
+        store_value_to_yaml(credsYaml, cred["credentialsId"], newCred)
+    else:
+        # new creds are appended, the order of credentials file is set by schema on beautify
+        credsYaml[cred["credentialsId"]] = newCred
     return credsYaml
 
 def mergeAndSaveYaml(yamlPath, newCreds) :
@@ -229,7 +322,7 @@ def create_credentials(envDir, envInstancesDir, instancesDir, is_external_cred_e
     logger.info(f"Start to create credentials: envDir={envDir}, envInstancesDir={envInstancesDir}, instancesDir={instancesDir}")
     logger.info(f"Creating credentials for environment directory: {envDir}")
     credsSchema="schemas/credential.schema.json"
-    resultingCreds = []
+    resultingCreds = CredentialRegistry()
     #tenant
     tenantFileName = envDir+"/tenant.yml"
     external_cred_ids = set()
@@ -258,33 +351,26 @@ def create_credentials(envDir, envInstancesDir, instancesDir, is_external_cred_e
         resultingCreds = mergeResult["mergedCreds"]
     else:
         logger.info("Bg domain doesn't exist")
-    # iterate through cloud applications and create cred definitions
-    applications = findAllYamlsInDir(f"{envDir}/Applications")
-    for appPath in applications :
-        mergeResult = mergeCreds(getApplicationCreds(appPath, tenantName, cloudName, external_cred_ids=external_cred_ids), resultingCreds)
+    # extract cred definitions of cloud applications, namespaces and namespace applications
+    entityFiles = discoverEntityFiles(envDir)
+    tasks = [(ENTITY_CLOUD_APPLICATION, appPath, [], tenantName, cloudName, is_external_cred_env)
+             for appPath in entityFiles["cloudApplications"]]
+    tasks += [(ENTITY_NAMESPACE, namespacePath, entityFiles["applicationsByNamespace"][namespacePath], tenantName, cloudName, is_external_cred_env)
+              for namespacePath in entityFiles["namespaces"]]
+    entityCreds = {}
+    for result in extractEntityCreds(tasks):
+        entityCreds.update(result["creds"])
+        external_cred_ids.update(result["externalCredIds"])
+    # merge them in precedence order: cloud applications, namespaces, namespace applications
+    for appPath in entityFiles["cloudApplications"] :
+        mergeResult = mergeCreds(entityCreds[appPath], resultingCreds)
         logger.info(f'{mergeResult["countAdded"]} creds added for cloud application {appPath}')
-        resultingCreds = mergeResult["mergedCreds"]
-    # iterate through namespaces and create cred definitions
-    namespaceNameMap = {}
-    namespaces = findYamls(envDir, "/Namespaces", additionalRegexpNotPattern=r".+/Namespaces/.+/Applications/.+")
-    namespaces.sort()
-    for namespacePath in namespaces :
-        namespaceYaml = openYaml(namespacePath)
-        namespaceKey = extract_namespace_from_namespace_path(namespacePath)
-        namespaceName = namespaceYaml["name"]
-        namespaceNameMap[namespaceKey] = namespaceName
-        mergeResult = mergeCreds(getNamespaceCreds(namespaceYaml, tenantName, cloudName, namespaceName, is_external_cred_env, external_cred_ids), resultingCreds)
+    for namespacePath in entityFiles["namespaces"] :
+        mergeResult = mergeCreds(entityCreds[namespacePath], resultingCreds)
         logger.info(f'{mergeResult["countAdded"]} creds added for namespace {namespacePath}')
-        resultingCreds = mergeResult["mergedCreds"]
-    # iterate through namespace applications and create cred definitions
-    applications = findYamls(envDir, "/Applications", additionalRegexpPattern=r".+/Namespaces/.+/Applications/.+")
-    applications.sort()
-    for appPath in applications :
-        namespaceKey = extract_namespace_from_application_path(appPath)
-        namespaceName = namespaceNameMap[namespaceKey]
-        mergeResult = mergeCreds(getApplicationCreds(appPath, tenantName, cloudName, namespaceName, external_cred_ids), resultingCreds)
+    for appPath in entityFiles["namespaceApplications"] :
+        mergeResult = mergeCreds(entityCreds[appPath], resultingCreds)
         logger.info(f'{mergeResult["countAdded"]} creds added for namespace application {appPath}')
-        resultingCreds = mergeResult["mergedCreds"]
 
     #store credentials
     credYamlPath = envDir + "/Credentials/credentials.yml"
@@ -295,11 +381,7 @@ def create_credentials(envDir, envInstancesDir, instancesDir, is_external_cred_e
     if is_external_cred_env:
         if resultingCreds:
             #to cover condition like local creds macro with external cred id
-            local_cred_ids = [
-                item.get('cred', {}).get('credentialsId')
-                for item in resultingCreds
-                if item.get('cred', {}).get('credentialsId')
-            ]
+            local_cred_ids = [cred_id for cred_id in resultingCreds.ids() if cred_id]
             raise ReferenceError(f"Found local credential macros in external cred only environment. Credential IDs are  {local_cred_ids}")
         logger.info(f"Validating external credentials for external only environment")
         validate_external_creds(env_creds_map, external_cred_ids)
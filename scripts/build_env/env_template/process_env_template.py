@@ -4,6 +4,7 @@
 from pathlib import Path
 
 from artifact_searcher import artifact
+from artifact_searcher.registry_client import run_with_registry_client
 from artifact_searcher.utils.models import FileExtension, Credentials, Registry, Application
 from env_template.template_testing import run_env_test_setup
 from envgenehelper import getEnvDefinition, fetch_cred_value, getAppDefinitionPath
@@ -110,6 +111,7 @@ def render_creds() -> dict:
     cred_config = get_cred_config()
     context = Context()
     context.env_vars.update(dict(os.environ))
+    context.invalidate()
     rendered = render_obj_by_context(cred_config, context)
     logger.info("Credentials rendered successfully")
     return rendered
@@ -212,4 +214,4 @@ async def resolve_all():
         results = await asyncio.gather(*tasks.values())
         return dict(zip(tasks.keys(), results))
 
-    return asyncio.run(resolve_all())
+    return run_with_registry_client(resolve_all())
@@ -3,8 +3,8 @@
 from pathlib import Path
 import shutil
 
-from envgenehelper.business_helper import NamespaceFile, get_bgd_object, get_namespaces, getenv_with_error
-from envgenehelper import logger
+from envgenehelper.business_helper import NamespaceFile, get_namespaces
+from envgenehelper import logger, openYaml
 
 def filter_namespaces(namespaces: list[str], filter: str, bgd_object: dict) -> list[str]:
     if not filter:
@@ -30,44 +30,48 @@ def filter_namespaces(namespaces: list[str], filter: str, bgd_object: dict) -> l
         filtered_namespaces = [ns for ns in namespaces if ns in resolved_filter]
     return filtered_namespaces
 
-def apply_ns_build_filter():
-    filter = getenv('NS_BUILD_FILTER')
-    if not filter:
+def get_ns_build_filter() -> str | None:
+    ns_filter = getenv('NS_BUILD_FILTER')
+    if not ns_filter:
         logger.info('NS_BUILD_FILTER is empty, skipping filtering')
+        return None
+    logger.info(f"Filtering namespaces with NS_BUILD_FILTER: {ns_filter}")
+    return ns_filter
+
+def is_namespace_selected(ns_name: str, filter: str, bgd_object: dict) -> bool:
+    return bool(filter_namespaces([ns_name], filter, bgd_object))
+
+def restore_excluded_namespaces(env_dir: Path, excluded_namespaces: dict[str, str], initial_content_dir: str):
+    """
+    Puts namespaces excluded by NS_BUILD_FILTER back to the built environment as they were before the build,
+    together with resource profiles they refer to. excluded_namespaces maps namespace postfix to its name.
+    """
+    if not excluded_namespaces:
         return
-    logger.info(f"Filtering namespaces with NS_BUILD_FILTER: {filter}")
-    base_dir = getenv_with_error("CI_PROJECT_DIR")
-
-    source_namespaces = get_namespaces(Path(f'{base_dir}/build_env/tmp/initial_namespaces_content'))
-    namespaces = get_namespaces()
-    namespace_names = [ns.name for ns in namespaces]
-    logger.info(f'Namespaces found:\n {namespace_list_to_str(namespaces)}')
+    namespaces_dir = env_dir / 'Namespaces'
+    source_namespaces = get_namespaces(Path(initial_content_dir))
     logger.info(f'Source namespaces found:\n {namespace_list_to_str(source_namespaces)}')
+    for postfix, name in excluded_namespaces.items():
+        namespace_dir = namespaces_dir / postfix
+        if namespace_dir.exists():
+            logger.debug(f'Namespace {postfix} was rendered by another template entry, keeping it')
+            continue
+        source_namespace = next((sns for sns in source_namespaces if sns.name == name), None)
+        if not source_namespace:
+            logger.debug(f'Source namespace for {name} not found, namespace is not created')
+            continue
+        shutil.copytree(source_namespace.path, namespace_dir)
+        restore_profile(source_namespace, env_dir / 'Profiles', Path(initial_content_dir) / 'Profiles')
+        logger.info(f"Namespace {name} didn't pass filter, restored it from {source_namespace.path}")
 
-    bgd = get_bgd_object()
-    logger.info(f'BGD object: {bgd}')
-
-    filtered_namespaces = filter_namespaces(namespace_names, filter, bgd)
-    namespaces_to_restore = [ns for ns in namespaces if ns.name not in filtered_namespaces]
-    logger.info(f"Namespaces that didn't pass filter will be restored:\n {namespace_list_to_str(namespaces_to_restore)}")
-
-    namespace_paths_to_restore = [ns for ns in namespaces_to_restore]
-
-    if namespace_paths_to_restore:
-        for ns in namespace_paths_to_restore:
-            restore_namespace(ns, source_namespaces)
-        logger.info(f"Restoration was successful")
-    else:
-        logger.info(f"No namespaces to restore")
-
-def restore_namespace(namespace: NamespaceFile, source_namespaces: list[NamespaceFile]):
-    shutil.rmtree(namespace.path)
-    source_namespace = next((sns for sns in source_namespaces if sns.name == namespace.name), None)
-    if not source_namespace:
-        logger.debug(f'Source namespace for {namespace.name} not found, just removed namespace')
+def restore_profile(namespace: NamespaceFile, profiles_dir: Path, source_profiles_dir: Path):
+    profile_name = (openYaml(namespace.definition_path).get('profile') or {}).get('name')
+    if not profile_name or any(profiles_dir.glob(f'{profile_name}.y*ml')):
         return
-    logger.debug(f'Restored {namespace.name}')
-    shutil.copytree(source_namespace.path, namespace.path, dirs_exist_ok=True)
+    for source_profile in source_profiles_dir.glob(f'{profile_name}.y*ml'):
+        profiles_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source_profile, profiles_dir / source_profile.name)
+        logger.debug(f'Restored profile {source_profile.name} of namespace {namespace.name}')
 
 def namespace_list_to_str(namespaces: list[NamespaceFile]):
     return "\n".join(f"  - {ns.name} {ns.path}" for ns in namespaces)
@@ -0,0 +1,75 @@
+import hashlib
+import os
+
+from envgenehelper import logger, openFileAsString
+from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache, Template, TemplateNotFound
+
+from jinja.jinja import create_jinja_env
+from jinja.replace_ansible_stuff import replace_ansible_stuff
+
+JINJA_CACHE_DIR_ENV = "ENVGENE_JINJA_CACHE_DIR"
+
+
+class _PreprocessedSourceLoader(BaseLoader):
+    # serves already preprocessed template sources by their content hash, so that
+    # jinja can reuse its bytecode cache for them like for regular file templates
+    def __init__(self):
+        self.sources: dict[str, tuple[str, str | None]] = {}
+
+    def get_source(self, environment: Environment, template: str):
+        if template not in self.sources:
+            raise TemplateNotFound(template)
+        source, filename = self.sources[template]
+        return source, filename, lambda: True
+
+
+class TemplateCache:
+    """
+    Render session scoped Jinja environment with compiled templates memoized by content hash.
+
+    If bytecode_cache_dir (or ENVGENE_JINJA_CACHE_DIR) is set, compiled bytecode is also stored
+    on disk, so that next jobs skip compilation of unchanged templates.
+    """
+
+    def __init__(self, bytecode_cache_dir: str = ""):
+        bytecode_cache_dir = bytecode_cache_dir or os.getenv(JINJA_CACHE_DIR_ENV, "")
+        self._loader = _PreprocessedSourceLoader()
+        self.env = create_jinja_env()
+        self.env.loader = self._loader
+        if bytecode_cache_dir:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            self.env.bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+            logger.debug(f"Jinja bytecode cache dir: {bytecode_cache_dir}")
+        # same settings as jinja2.Template(), used for short path expressions from template descriptor
+        self._expression_env = Environment()
+        self._templates: dict[str, Template] = {}
+        self._expressions: dict[str, Template] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def from_string(self, template_str: str, template_path: str = "", preprocess: bool = True) -> Template:
+        key = hashlib.sha256(f"{int(preprocess)}:{template_str}".encode("utf-8")).hexdigest()
+        template = self._templates.get(key)
+        if template is not None:
+            self.hits += 1
+            return template
+        self.misses += 1
+        if preprocess:
+            template_str = replace_ansible_stuff(template_str=template_str, template_path=template_path)
+        self._loader.sources[key] = (template_str, str(template_path) if template_path else None)
+        template = self.env.get_template(key)
+        self._templates[key] = template
+        return template
+
+    def from_file(self, template_path) -> Template:
+        return self.from_string(openFileAsString(template_path), str(template_path))
+
+    def render_expression(self, expression: str, context: dict) -> str:
+        template = self._expressions.get(expression)
+        if template is None:
+            template = self._expression_env.from_string(expression)
+            self._expressions[expression] = template
+        return template.render(context)
+
+    def stats(self) -> str:
+        return f"compiled templates: {self.misses}, cache hits: {self.hits}, expressions: {len(self._expressions)}"
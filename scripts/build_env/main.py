@@ -1,5 +1,11 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
 from envgenehelper import *
 from envgenehelper.deployer import *
+from envgenehelper.parallel_helper import run_in_parallel
+from envgenehelper.repo_paths import record_written_paths
 
 from build_env import build_env, process_additional_template_parameters
 from cloud_passport import update_env_definition_with_cloud_name
@@ -7,7 +13,7 @@
 from render_config_env import EnvGenerator
 from resource_profiles import get_env_specific_resource_profiles
 
-from filter_namespaces import apply_ns_build_filter
+from filter_namespaces import restore_excluded_namespaces
 
 INVENTORY_DIR_NAME = "Inventory"
 ENV_DEFINITION_FILE_NAME = "env_definition.yml"
@@ -15,6 +21,15 @@
 CLOUD_SCHEMA = "schemas/cloud.schema.json"
 NAMESPACE_SCHEMA = "schemas/namespace.schema.json"
 ENV_SPECIFIC_RESOURCE_PROFILE_SCHEMA = "schemas/resource-profile.schema.json"
+# environment variables that build steps read for the environment being built
+ENV_BUILD_VARS = ("CLUSTER_NAME", "ENVIRONMENT_NAME", "FULL_ENV_NAME")
+
+
+@dataclass
+class EnvBuildResult:
+    full_env_name: str
+    elapsed: float
+    error: str | None = None
 
 
 def prepare_folders_for_rendering(env_name, cluster_name, source_env_dir, templates_dirs, render_dir,
@@ -101,18 +116,32 @@ def handle_template_override(render_dir):
         deleteFile(file)
 
 
-def build_environment(env_name, cluster_name, templates_dirs, source_env_dir, all_instances_dir, output_dir, work_dir):
-    # defining folders that will be used during generation
-    base_dir = getenv_with_error('CI_PROJECT_DIR')
-    render_dir = f"{base_dir}/tmp/render"
-    render_parameters_dir = f"{base_dir}/tmp/parameters_templates"
-    render_profiles_dir = f"{base_dir}/tmp/resource_profiles"
+def get_initial_namespaces_dir(work_dir, tmp_dir=None):
+    if tmp_dir:
+        return os.path.join(tmp_dir, 'initial_namespaces_content')
+    return os.path.join(work_dir, 'build_env', 'tmp', 'initial_namespaces_content')
 
 
+def build_environment(env_name, cluster_name, templates_dirs, source_env_dir, all_instances_dir, output_dir, work_dir,
+                      tmp_dir=None):
+    # defining folders that will be used during generation
+    base_dir = getenv_with_error('CI_PROJECT_DIR')
+    tmp_dir = tmp_dir or f"{base_dir}/tmp"
+    render_dir = f"{tmp_dir}/render"
+    render_parameters_dir = f"{tmp_dir}/parameters_templates"
+    render_profiles_dir = f"{tmp_dir}/resource_profiles"
+
+    # namespaces excluded by NS_BUILD_FILTER are not rendered and keep their content from before the build
+    initial_namespaces_dir = get_initial_namespaces_dir(work_dir, tmp_dir)
+    # namespaces of previously built environment must not leak into this one
+    delete_dir_if_exists(initial_namespaces_dir)
     namespaces_path = get_namespaces_path()
-    if check_dir_exists(str(namespaces_path.absolute())):
-        logger.info("Namespaces found, saving them into tmp location")
-        shutil.copytree(get_namespaces_path(), os.path.join(work_dir,'build_env','tmp','initial_namespaces_content','Namespaces'), dirs_exist_ok=True)
+    if os.getenv('NS_BUILD_FILTER') and check_dir_exists(str(namespaces_path.absolute())):
+        logger.info("Namespaces found, saving them and their profiles into tmp location")
+        shutil.copytree(namespaces_path, os.path.join(initial_namespaces_dir, 'Namespaces'), dirs_exist_ok=True)
+        profiles_path = namespaces_path.parent.joinpath('Profiles')
+        if check_dir_exists(str(profiles_path)):
+            shutil.copytree(profiles_path, os.path.join(initial_namespaces_dir, 'Profiles'), dirs_exist_ok=True)
 
     # preparing folders for generation
     render_env_dir = prepare_folders_for_rendering(env_name, cluster_name, source_env_dir, templates_dirs, render_dir,
@@ -182,10 +211,14 @@ def build_environment(env_name, cluster_name, templates_dirs, source_env_dir, al
     handle_template_override(render_dir)
     env_specific_resource_profile_map = get_env_specific_resource_profiles(source_env_dir, all_instances_dir,
                                                                            ENV_SPECIFIC_RESOURCE_PROFILE_SCHEMA)
+    # profiles of namespaces that are not rendered are not overridden
+    env_specific_resource_profile_map = {key: path for key, path in env_specific_resource_profile_map.items()
+                                         if key not in render_context.excluded_namespaces}
     build_env(env_name, source_env_dir, render_parameters_dir, render_dir, render_profiles_dir,
               env_specific_resource_profile_map, all_instances_dir, render_context, templates_dirs, render_context.is_external_cred_env)
     resulting_dir = post_process_env_after_rendering(env_name, render_env_dir, source_env_dir, all_instances_dir,
                                                      output_dir)
+    restore_excluded_namespaces(Path(resulting_dir), render_context.excluded_namespaces, initial_namespaces_dir)
     logger.info(f"External cred env is set as {render_context.is_external_cred_env}")
     return resulting_dir, render_context.is_external_cred_env
 
@@ -272,7 +305,7 @@ def validate_parameter_files(param_files):
     return errors
 
 
-def render_environment(env_name, cluster_name, templates_dirs, all_instances_dir, output_dir, work_dir):
+def render_environment(env_name, cluster_name, templates_dirs, all_instances_dir, output_dir, work_dir, tmp_dir=None):
     logger.info(f'env: {env_name}')
     logger.info(f'cluster_name: {cluster_name}')
     logger.info(f'templates_dirs: {templates_dirs}')
@@ -289,20 +322,85 @@ def render_environment(env_name, cluster_name, templates_dirs, all_instances_dir
     logger.info(f"Environment {env_name} directory is {env_dir}")
 
     resulting_env_dir, is_external_cred_env = build_environment(env_name, cluster_name, templates_dirs, env_dir, all_instances_dir,
-                                          output_dir, work_dir)
+                                          output_dir, work_dir, tmp_dir)
     create_credentials(resulting_env_dir, env_dir, all_instances_dir, is_external_cred_env)
-    apply_ns_build_filter()
+    record_written_paths(resulting_env_dir)
+
+
+@contextmanager
+def env_build_vars(cluster_name, env_name):
+    """Points environment variables read by build steps to the given environment, restores them on exit"""
+    previous = {name: os.environ.get(name) for name in ENV_BUILD_VARS}
+    os.environ.update({"CLUSTER_NAME": cluster_name, "ENVIRONMENT_NAME": env_name,
+                       "FULL_ENV_NAME": f"{cluster_name}/{env_name}"})
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _render_environment_task(task) -> EnvBuildResult:
+    full_env_name, templates_dirs, all_instances_dir, output_dir, work_dir, tmp_dir = task
+    cluster_name, env_name = full_env_name.split("/")
+    start = time.perf_counter()
+    try:
+        with env_build_vars(cluster_name, env_name):
+            render_environment(env_name, cluster_name, templates_dirs, all_instances_dir, output_dir, work_dir, tmp_dir)
+    except Exception as e:
+        logger.error(f"Build of environment {full_env_name} failed: {e}")
+        return EnvBuildResult(full_env_name, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+    return EnvBuildResult(full_env_name, time.perf_counter() - start)
+
+
+def render_environments(full_env_names, templates_dirs, all_instances_dir, output_dir, work_dir,
+                        max_workers=1) -> list[EnvBuildResult]:
+    """
+    Builds several environments given as cluster/env names in one process, so schemas, templates and caches are
+    loaded once. With max_workers > 1 environments are built in forked worker processes, each in its own tmp dir.
+    Failure of one environment doesn't stop the others, errors of all failed environments are raised at the end.
+    """
+    duplicated = sorted({name for name in full_env_names if full_env_names.count(name) > 1})
+    if duplicated:
+        # builds of the same environment would share its tmp dir and output dir
+        raise ValueError(f"Environments are listed more than once: {', '.join(duplicated)}")
+    base_dir = getenv_with_error('CI_PROJECT_DIR')
+    parallel = max_workers > 1 and len(full_env_names) > 1
+    tasks = [(name, templates_dirs, all_instances_dir, output_dir, work_dir,
+              f"{base_dir}/tmp/envs/{name}" if parallel else None) for name in full_env_names]
+    if parallel:
+        results = run_in_parallel(_render_environment_task, tasks, "Environments build",
+                                  describe=lambda task: task[0], max_workers=max_workers)
+    else:
+        results = [_render_environment_task(task) for task in tasks]
+
+    for result in results:
+        status = f"failed: {result.error}" if result.error else "built"
+        logger.info(f"Environment {result.full_env_name} {status} in {result.elapsed:.2f}s")
+    failed = [f"{result.full_env_name}: {result.error}" for result in results if result.error]
+    if failed:
+        raise ReferenceError(f"Failed to build {len(failed)} of {len(results)} environments:\n" + "\n".join(failed))
+    return results
 
 
 if __name__ == "__main__":
     base_dir = getenv_with_error('CI_PROJECT_DIR')
-    cluster = getenv_with_error("CLUSTER_NAME")
-    environment = getenv_with_error("ENVIRONMENT_NAME")
     g_template_dirs = get_template_dirs()
     g_all_instances_dir = f"{base_dir}/environments"
     g_output_dir = f"{base_dir}/environments"
     g_work_dir = get_parent_dir_for_dir(g_all_instances_dir)
 
-    decrypt_all_cred_files_for_env()
-    render_environment(environment, cluster, g_template_dirs, g_all_instances_dir, g_output_dir, g_work_dir)
+    if os.getenv("MULTI_ENV_BUILD", "false").lower() == "true":
+        env_names = [name.strip() for name in split_multi_value_param(getenv_with_error("ENV_NAMES"))]
+        decrypt_all_cred_files_for_env()
+        render_environments(env_names, g_template_dirs, g_all_instances_dir, g_output_dir, g_work_dir,
+                            max_workers=int(os.getenv("ENV_BUILD_WORKERS", "1")))
+    else:
+        cluster = getenv_with_error("CLUSTER_NAME")
+        environment = getenv_with_error("ENVIRONMENT_NAME")
+        decrypt_all_cred_files_for_env()
+        render_environment(environment, cluster, g_template_dirs, g_all_instances_dir, g_output_dir, g_work_dir)
     encrypt_all_cred_files_for_env()
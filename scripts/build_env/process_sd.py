@@ -8,6 +8,7 @@
 import envgenehelper as helper
 import yaml
 from artifact_searcher import artifact
+from artifact_searcher.registry_client import get_registry_client, run_with_registry_client
 from artifact_searcher.utils import models as artifact_models
 from envgenehelper.business_helper import getenv_and_log, getenv_with_error
 from envgenehelper.collections_helper import split_multi_value_param
@@ -289,41 +290,59 @@ def download_sds_with_version(env, base_sd_path, sd_version, effective_merge_mod
         logger.error("No valid SD versions found in SD_VERSION")
         exit(1)
 
-    app_def_getter_plugins = PluginEngine(plugins_dir='/module/scripts/handle_sd_plugins/app_def_getter')
-    sd_data_list = []
-    for entry in sd_entries:  # appvers
+    appvers = []
+    for entry in sd_entries:
         if ":" not in entry:
             logger.error(f"Invalid SD_VERSION format: '{entry}'. Expected 'name:version'")
             exit(1)
-
         source_name, version = entry.split(":", 1)
-        logger.info(f"Starting download of SD: {source_name}-{version}")
-
-        sd_data = download_sd_by_appver(source_name, version, app_def_getter_plugins)
+        appvers.append((source_name, version))
 
-        sd_data_list.append(sd_data)
+    app_def_getter_plugins = PluginEngine(plugins_dir='/module/scripts/handle_sd_plugins/app_def_getter')
+    sd_data_list = download_sds(appvers, app_def_getter_plugins)
 
     sd_data_json = json.dumps(sd_data_list)
     extract_sds_from_json(env, base_sd_path, sd_data_json, effective_merge_mode)
 
 
-def download_sd_by_appver(app_name: str, version: str, plugins: PluginEngine) -> dict[str, object]:
-    if 'SNAPSHOT' in version:
-        raise ValueError("SNAPSHOT is not supported version of Solution Descriptor artifacts")
-    # TODO: check if job would fail without plugins
-    app_def = get_appdef_for_app(f"{app_name}:{version}", app_name, plugins)
+def download_sds(appvers: list[tuple[str, str]], plugins: PluginEngine) -> list[dict[str, object]]:
+    """Downloads SDs concurrently over the shared registry client, results are in the order of appvers"""
+    for app_name, version in appvers:
+        if 'SNAPSHOT' in version:
+            raise ValueError("SNAPSHOT is not supported version of Solution Descriptor artifacts")
 
+    # credentials are decrypted once, AppDefs and auth headers are resolved once per appver and registry
     env_creds = helper.get_cred_config()
-    auth_headers = app_def.registry.resolve_auth(env_creds)
-
-    artifact_info = asyncio.run(
-        artifact.check_artifact_async(app_def, artifact.FileExtension.JSON, version,
-                                      auth_headers=auth_headers))
+    app_defs = {}
+    registry_auth_headers = {}
+    downloads = []
+    for app_name, version in appvers:
+        appver = f"{app_name}:{version}"
+        if appver not in app_defs:
+            # TODO: check if job would fail without plugins
+            app_defs[appver] = get_appdef_for_app(appver, app_name, plugins)
+        app_def = app_defs[appver]
+        if app_def.registry.name not in registry_auth_headers:
+            registry_auth_headers[app_def.registry.name] = app_def.registry.resolve_auth(env_creds)
+        downloads.append((app_def, version, registry_auth_headers[app_def.registry.name]))
+        logger.info(f"Starting download of SD: {app_name}-{version}")
+
+    async def download_all():
+        return await asyncio.gather(*(download_sd_async(*download) for download in downloads))
+
+    return list(run_with_registry_client(download_all()))
+
+
+async def download_sd_async(app_def: artifact_models.Application, version: str,
+                            auth_headers: dict | None) -> dict[str, object]:
+    artifact_info = await artifact.check_artifact_async(app_def, artifact.FileExtension.JSON, version,
+                                                        auth_headers=auth_headers)
     if not artifact_info:
         raise ValueError(
-            f'Solution descriptor content was not received for {app_name}:{version}')
+            f'Solution descriptor content was not received for {app_def.name}:{version}')
     sd_url, _ = artifact_info
-    return artifact.download_json_content(sd_url, auth_headers=auth_headers)
+    session = get_registry_client().with_headers(auth_headers)
+    return await artifact.download_json_content_async(session, sd_url)
 
 
 def get_appdef_for_app(appver: str, app_name: str, plugins: PluginEngine) -> artifact_models.Application:
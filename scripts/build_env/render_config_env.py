@@ -6,12 +6,15 @@
 from deepmerge import always_merger
 from envgenehelper import *
 from envgenehelper.business_helper import get_bgd_object, get_namespaces, get_namespace_role, NamespaceRole
+from envgenehelper.parallel_helper import run_in_parallel
 from envgenehelper.validation import ensure_valid_fields, ensure_required_keys
-from jinja2 import Template, TemplateError
-from pydantic import BaseModel, Field
+from jinja2 import TemplateError
+from pydantic import BaseModel, Field, PrivateAttr
 
 from jinja.jinja import create_jinja_env
-from jinja.replace_ansible_stuff import replace_ansible_stuff, escaping_quotation
+from jinja.replace_ansible_stuff import escaping_quotation
+from jinja.template_cache import TemplateCache
+from filter_namespaces import get_ns_build_filter, is_namespace_selected
 
 SCHEMAS_DIR = Path(__file__).resolve().parents[2] / "schemas"
 APPDEF_SCHEMA = str(SCHEMAS_DIR / "appdef.schema.json")
@@ -20,9 +23,13 @@
 TD_SCHEMA = str(SCHEMAS_DIR / "template-descriptor.schema.json")
 COMPOSITE_SCHEMA = str(SCHEMAS_DIR / "composite-structure.schema.json")
 EXTERNAL_CRED_COMMENT="external credential template"
+# namespaces are rendered in worker processes only if there are enough of them to cover process startup
+NS_RENDER_PARALLEL_THRESHOLD = 4
 
 yml = create_yaml_processor()
 
+_MISSING = object()
+
 
 class Context(BaseModel):
     env: Optional[str] = ''
@@ -58,18 +65,55 @@ class Context(BaseModel):
     start_time: datetime | None = Field(default=None, exclude=True)
     end_time: datetime | None = Field(default=None, exclude=True)
 
+    # version is increased on every effective change, snapshot is rebuilt lazily when it is outdated
+    _version: int = PrivateAttr(default=0)
+    _snapshot: dict | None = PrivateAttr(default=None)
+    _snapshot_version: int = PrivateAttr(default=-1)
+
     class Config:
         extra = "allow"
         validate_assignment = True
 
-    def update(self, data: dict | None = None, **kwargs):
+    def __setattr__(self, name, value):
+        if name in self.__private_attributes__:
+            super().__setattr__(name, value)
+            return
+        if self._is_unchanged(name, value):
+            return
+        super().__setattr__(name, value)
+        self._version += 1
+
+    def _is_unchanged(self, name, value) -> bool:
+        current = getattr(self, name, _MISSING)
+        return current is value or current == value
+
+    def _set_without_validation(self, name, value):
+        if self._is_unchanged(name, value):
+            return
+        if name in type(self).model_fields:
+            self.__dict__[name] = value
+            self.__pydantic_fields_set__.add(name)
+        else:
+            self.__pydantic_extra__[name] = value
+        self._version += 1
+
+    def update(self, data: dict | None = None, validate: bool = True, **kwargs):
+        """
+        Sets context attributes. validate=False is a fast path for internal assignments of
+        already valid values, it skips pydantic validation of the assigned values.
+        """
+        set_attr = (lambda key, value: setattr(self, key, value)) if validate else self._set_without_validation
         if data:
             for key, value in data.items():
-                setattr(self, key, value)
+                set_attr(key, value)
         for key, value in kwargs.items():
-            setattr(self, key, value)
+            set_attr(key, value)
         logger.debug(f"Context updated: {data or kwargs}")
 
+    def invalidate(self):
+        # must be called after in-place modification of mutable attributes (e.g. ctx.env_vars.update(...))
+        self._version += 1
+
     @contextmanager
     def use(self):
         self.start_time = datetime.now()
@@ -84,19 +128,38 @@ def use(self):
             )
 
     def as_dict(self, include_none: bool = False) -> dict:
-        return self.model_dump(exclude_none=not include_none)
+        if include_none:
+            return self.model_dump()
+        if self._snapshot_version != self._version:
+            self._snapshot = self.model_dump(exclude_none=True)
+            self._snapshot_version = self._version
+        # nested values are shared between calls and must be treated as read only
+        return dict(self._snapshot)
+
+
+def render_obj_by_context(template: dict, context: Context, templates: TemplateCache | None = None) -> dict:
+    templates = templates or TemplateCache()
+    rendered_str = templates.from_string(dumpYamlToStr(template)).render(context.as_dict())
+    return yml.load(rendered_str)
 
 
-def render_obj_by_context(template: dict, context: Context) -> dict:
-    template_str = replace_ansible_stuff(template_str=dumpYamlToStr(template))
-    rendered_str = create_jinja_env().from_string(template_str).render(context.as_dict())
-    return yml.load(rendered_str)
+# generator and namespaces used by namespace render workers, inherited by forked worker processes
+_ns_render_generator: "EnvGenerator | None" = None
+_ns_render_namespaces: list = []
+
+
+def _render_namespace_task(ns_index: int) -> str:
+    return _ns_render_generator.render_namespace(_ns_render_namespaces[ns_index])
 
 
 class EnvGenerator:
     def __init__(self):
         self.ctx = Context()
+        self.templates = TemplateCache()
         self.is_external_cred_env = False
+        self._bgd = None
+        # postfix -> name of namespaces excluded by NS_BUILD_FILTER, they are not rendered
+        self.excluded_namespaces: dict[str, str] = {}
         logger.debug("EnvGenerator initialized with context: %s",
                      self.ctx.dict(exclude_none=True, exclude={"env_vars"}))
 
@@ -171,6 +234,7 @@ def setup_base_context(self, extra_env: dict):
         all_vars = dict(os.environ)
         self.ctx.update(extra_env)
         self.ctx.env_vars.update(all_vars)
+        self.ctx.invalidate()
 
         self.set_inventory()
         self.set_cloud_passport()
@@ -215,10 +279,15 @@ def validate_bgd(self):
     def _get_bgd_suffix(self, ns_name: str | None) -> str:
         if not ns_name:
             return ""
-        bgd = get_bgd_object(Path(self.ctx.current_env_dir))
-        role = get_namespace_role(ns_name, bgd)
+        role = get_namespace_role(ns_name, self._get_bgd())
         return {NamespaceRole.ORIGIN: "-origin", NamespaceRole.PEER: "-peer"}.get(role, "")
 
+    def _get_bgd(self):
+        # BG domain object is loaded once per run, after bg_domain.yml is rendered
+        if self._bgd is None:
+            self._bgd = get_bgd_object(Path(self.ctx.current_env_dir))
+        return self._bgd
+
     def _get_ns_name_for_bgd(self, ns: dict, ns_template_path: str) -> str | None:
         override_name = self._fetch_template_override_name(ns)
         if override_name:
@@ -245,7 +314,7 @@ def _resolve_template_path(self, template_path_expr: str, templates_dir: Path =
         ctx = self.ctx.as_dict()
         if templates_dir is not None:
             ctx["templates_dir"] = str(templates_dir)
-        return Template(template_path_expr).render(ctx)
+        return self.templates.render_expression(template_path_expr, ctx)
 
     def _find_ns_config_by_name(self, env_template: dict, ns_name: str, templates_dir: Path = None) -> dict | None:
         for ns in env_template.get("namespaces", []):
@@ -279,7 +348,7 @@ def generate_solution_structure(self):
             namespaces = self.ctx.current_env_template.get("namespaces", [])
             postfix_template_map = {}
             for ns in namespaces:
-                namespace_template_path = Template(ns["template_path"]).render(self.ctx.as_dict())
+                namespace_template_path = self.templates.render_expression(ns["template_path"], self.ctx.as_dict())
                 postfix = self.generate_ns_postfix(ns, namespace_template_path)
                 postfix_template_map[postfix] = namespace_template_path
 
@@ -305,25 +374,21 @@ def generate_solution_structure(self):
                 always_merger.merge(solution_structure, small_dict)
 
             always_merger.merge(self.ctx.current_env, {"solution_structure": solution_structure})
+            self.ctx.invalidate()
         logger.info(f"Rendered solution_structure: {solution_structure}")
 
     def render_from_file_to_file(self, src_template_path: str, target_file_path: str):
-        template = openFileAsString(src_template_path)
-        template = replace_ansible_stuff(template_str=template, template_path=src_template_path)
-        rendered = create_jinja_env().from_string(template).render(self.ctx.as_dict())
+        rendered = self.templates.from_file(src_template_path).render(self.ctx.as_dict())
         logger.debug(f"Rendered entity: \n{rendered}")
         writeYamlToFile(target_file_path, readYaml(escaping_quotation(rendered)))
 
     def render_from_file_to_obj(self, src_template_path) -> dict:
-        template = openFileAsString(src_template_path)
-        template = replace_ansible_stuff(template_str=template, template_path=src_template_path)
-        rendered = create_jinja_env().from_string(template).render(self.ctx.as_dict())
+        rendered = self.templates.from_file(src_template_path).render(self.ctx.as_dict())
         logger.debug(f"Rendered entity: \n{rendered}")
         return readYaml(escaping_quotation(rendered))
 
     def render_from_obj_to_file(self, template, target_file_path):
-        template = replace_ansible_stuff(template_str=dumpYamlToStr(template))
-        rendered = create_jinja_env().from_string(template).render(self.ctx.as_dict())
+        rendered = self.templates.from_string(dumpYamlToStr(template)).render(self.ctx.as_dict())
         logger.debug(f"Rendered entity: \n{rendered}")
         writeYamlToFile(target_file_path, readYaml(escaping_quotation(rendered)))
 
@@ -331,7 +396,7 @@ def generate_tenant_file(self):
         logger.info(f"Generate Tenant yaml for {self.ctx.tenant}")
         tenant_file = f'{self.ctx.current_env_dir}/tenant.yml'
         tenant_tmpl_path = self.ctx.current_env_template["tenant"]
-        self.render_from_file_to_file(Template(tenant_tmpl_path).render(self.ctx.as_dict()), tenant_file)
+        self.render_from_file_to_file(self.templates.render_expression(tenant_tmpl_path, self.ctx.as_dict()), tenant_file)
 
     def generate_override_template(self, template_override, template_path: Path, name):
         if template_override:
@@ -348,13 +413,13 @@ def generate_cloud_file(self):
         if is_template_override:
             logger.info(f"Generate Cloud yaml for cloud {cloud} using cloud.template_path value")
             cloud_tmpl_path = cloud_template["template_path"]
-            self.render_from_file_to_file(Template(cloud_tmpl_path).render(context), cloud_file)
+            self.render_from_file_to_file(self.templates.render_expression(cloud_tmpl_path, context), cloud_file)
 
             template_override = cloud_template.get("template_override")
             self.generate_override_template(template_override, Path(f'{current_env_dir}/cloud.yml_override'), cloud)
         else:
             logger.info(f"Generate Cloud yaml for cloud {cloud}")
-            self.render_from_file_to_file(Template(cloud_template).render(context), cloud_file)
+            self.render_from_file_to_file(self.templates.render_expression(cloud_template, context), cloud_file)
 
     def generate_bgd_file(self):
         logger.info(f"Generate bg domain yaml for {self.ctx.bgd}")
@@ -363,45 +428,94 @@ def generate_bgd_file(self):
         if not template:
             logger.info("'bg_domain' key not found in template descriptor, skipping bg domain rendering")
             return
-        self.render_from_file_to_file(Template(template).render(self.ctx.as_dict()), target_path)
+        self.render_from_file_to_file(self.templates.render_expression(template, self.ctx.as_dict()), target_path)
+        self._bgd = None
 
     def _fetch_template_override_name(self, ns: dict) -> str:
         template_override = ns.get("template_override")
         if not template_override:
             return ""
-        rendered = create_jinja_env().from_string(str(template_override)).render(self.ctx.as_dict())
+        rendered = self.templates.from_string(str(template_override), preprocess=False).render(self.ctx.as_dict())
         if not rendered:
             return ""
         return readYaml(rendered).get("name", "")
 
-    def generate_namespace_files(self):
+    def render_namespace(self, ns: dict) -> str:
         context = self.ctx.as_dict()
-        bgd = get_bgd_object(Path(self.ctx.current_env_dir))
-
-        for ns in self.ctx.current_env_template["namespaces"]:
-            ns_template_path = Template(ns["template_path"]).render(context)
-            postfix = self.generate_ns_postfix(ns, ns_template_path)
+        ns_template_path = self.templates.render_expression(ns["template_path"], context)
+        postfix = self.generate_ns_postfix(ns, ns_template_path)
 
+        ns_name = self._get_ns_name_for_bgd(ns, ns_template_path)
+        role = get_namespace_role(ns_name, self._get_bgd()) if ns_name else NamespaceRole.COMMON
+
+        role_templates_dir = self._get_template_dir_for_role(role)
+        role_env_template = self._get_env_template_for_role(role)
+
+        effective_ns = ns
+        effective_template_path = ns_template_path
+
+        if role != NamespaceRole.COMMON and role_env_template is not self.ctx.current_env_template:
+            role_ns_config = self._find_ns_config_by_name(role_env_template, ns_name, role_templates_dir)
+            if role_ns_config:
+                effective_ns = role_ns_config
+                effective_template_path = self._resolve_template_path(role_ns_config["template_path"], role_templates_dir)
+                logger.info(f"Using {role.name} template for namespace {ns_name}")
+
+        logger.info(f"Generate Namespace yaml for {postfix}")
+        ns_dir = Path(self.ctx.current_env_dir) / "Namespaces" / postfix
+        self.render_from_file_to_file(effective_template_path, str(ns_dir / "namespace.yml"))
+        self.generate_override_template(effective_ns.get("template_override"), ns_dir / "namespace.yml_override", postfix)
+        return postfix
+
+    def select_namespaces_to_render(self, namespaces: list) -> list:
+        self.excluded_namespaces = {}
+        ns_filter = get_ns_build_filter()
+        if not ns_filter:
+            return namespaces
+        context = self.ctx.as_dict()
+        selected = []
+        for ns in namespaces:
+            ns_template_path = self.templates.render_expression(ns["template_path"], context)
             ns_name = self._get_ns_name_for_bgd(ns, ns_template_path)
-            role = get_namespace_role(ns_name, bgd) if ns_name else NamespaceRole.COMMON
-
-            role_templates_dir = self._get_template_dir_for_role(role)
-            role_env_template = self._get_env_template_for_role(role)
-
-            effective_ns = ns
-            effective_template_path = ns_template_path
+            if is_namespace_selected(ns_name, ns_filter, self._get_bgd()):
+                selected.append(ns)
+            else:
+                self.excluded_namespaces[self.generate_ns_postfix(ns, ns_template_path)] = ns_name
+        logger.info(f"Namespaces excluded from rendering by NS_BUILD_FILTER: {self.excluded_namespaces}")
+        return selected
 
-            if role != NamespaceRole.COMMON and role_env_template is not self.ctx.current_env_template:
-                role_ns_config = self._find_ns_config_by_name(role_env_template, ns_name, role_templates_dir)
-                if role_ns_config:
-                    effective_ns = role_ns_config
-                    effective_template_path = self._resolve_template_path(role_ns_config["template_path"], role_templates_dir)
-                    logger.info(f"Using {role.name} template for namespace {ns_name}")
+    def generate_namespace_files(self):
+        # prepared before forking, so that workers don't load them again
+        self._get_bgd()
+        self.ctx.as_dict()
+        namespaces = self.select_namespaces_to_render(self.ctx.current_env_template["namespaces"])
+
+        if len(namespaces) < NS_RENDER_PARALLEL_THRESHOLD:
+            # rendered in order in current process, with the same errors as in worker processes
+            self._render_namespaces(namespaces, max_workers=1)
+            return
 
-            logger.info(f"Generate Namespace yaml for {postfix}")
-            ns_dir = Path(self.ctx.current_env_dir) / "Namespaces" / postfix
-            self.render_from_file_to_file(effective_template_path, str(ns_dir / "namespace.yml"))
-            self.generate_override_template(effective_ns.get("template_override"), ns_dir / "namespace.yml_override", postfix)
+        postfixes = self._render_namespaces(namespaces)
+        # namespaces with the same postfix overwrite each other, so order of their rendering matters
+        duplicated = {p for p in postfixes if postfixes.count(p) > 1}
+        if duplicated:
+            logger.warning(f"Several namespaces in template descriptor are rendered to the same postfix: {duplicated}. "
+                           f"Rendering them sequentially")
+            for ns, postfix in zip(namespaces, postfixes):
+                if postfix in duplicated:
+                    self.render_namespace(ns)
+
+    def _render_namespaces(self, namespaces: list, max_workers: int | None = None) -> list[str]:
+        global _ns_render_generator, _ns_render_namespaces
+        _ns_render_generator = self
+        _ns_render_namespaces = namespaces
+        try:
+            return run_in_parallel(_render_namespace_task, range(len(namespaces)), "Namespace rendering",
+                                   describe=lambda index: namespaces[index]["template_path"],
+                                   max_workers=max_workers)
+        finally:
+            _ns_render_generator = None
+            _ns_render_namespaces = []
 
     def calculate_cloud_name(self) -> str:
         inv = self.ctx.env_definition["inventory"]
@@ -432,7 +546,8 @@ def generate_composite_structure(self):
             current_env_dir = self.ctx.current_env_dir
             cs_file = Path(current_env_dir) / "composite_structure.yml"
             cs_file.parent.mkdir(parents=True, exist_ok=True)
-            self.render_from_file_to_file(Template(composite_structure).render(self.ctx.as_dict()), str(cs_file))
+            self.render_from_file_to_file(self.templates.render_expression(composite_structure, self.ctx.as_dict()),
+                                          str(cs_file))
             validate_yaml_by_scheme_or_fail(cs_file, COMPOSITE_SCHEMA)
     
     def generate_external_cred(self):
@@ -440,14 +555,14 @@ def generate_external_cred(self):
         external_credential_template = self.ctx.current_env_template.get("external_credential_template")
         if not external_credential_template:
             return
-        external_cred_path = Template(external_credential_template).render(self.ctx.as_dict())
+        external_cred_path = self.templates.render_expression(external_credential_template, self.ctx.as_dict())
         logger.info(f"Found external template. Render external credentials for {external_cred_path}")
         external_creds = openYaml(external_cred_path)
         default_remote_path = "{{ current_env.cloud }}/{{ current_env.name }}"
         for cred_config in external_creds.values():
                if isinstance(cred_config, dict) and "remoteRefPath" not in cred_config:
                    cred_config["remoteRefPath"] = default_remote_path
-        rendered_external_creds = render_obj_by_context(external_creds, self.ctx)
+        rendered_external_creds = render_obj_by_context(external_creds, self.ctx, self.templates)
         logger.debug(f"Rendered external credentials is: \n{rendered_external_creds}")
 
         #validate secret file
@@ -471,7 +586,8 @@ def generate_paramset_templates(self):
             target_path = self.get_rendered_target_path(template_path)
             try:
                 logger.info(f"Try to render paramset {template_name}")
-                self.render_from_file_to_file(Template(str(template_path)).render(self.ctx.as_dict()), target_path)
+                self.render_from_file_to_file(self.templates.render_expression(str(template_path), self.ctx.as_dict()),
+                                              target_path)
                 logger.info(f"Successfully generated paramset: {template_name}")
                 if template_path.exists():
                     template_path.unlink()
@@ -507,7 +623,7 @@ def render_app_defs(self):
                 "app_lookup_key": f"{group_id}:{artifact_id}",
                 "groupId": group_id,
                 "artifactId": artifact_id,
-            })
+            }, validate=False)
             app_def_trg_path = f"{self.ctx.current_env_dir}/AppDefs/{app_name}.yml"
             writeYamlToFile(app_def_trg_path, app_def)
 
@@ -565,6 +681,7 @@ def set_appreg_def_overrides(self):
 
         self.ctx.appdefs["overrides"] = always_merger.merge(global_appdefs, cluster_appdefs)
         self.ctx.regdefs["overrides"] = always_merger.merge(global_regdefs, cluster_regdefs)
+        self.ctx.invalidate()
 
     def generate_profiles(self, profile_names: Iterable[str]):
         logger.info(f"Start rendering profiles from list: {profile_names}")
@@ -585,9 +702,8 @@ def validate_appregdefs(self):
             appdef_files = findAllYamlsInDir(appdef_dir)
             if not appdef_files:
                 logger.warning(f"No AppDef YAMLs found in {appdef_dir}")
-            for file in appdef_files:
-                logger.info(f"AppDef file: {file}")
-                validate_yaml_by_scheme_or_fail(file, APPDEF_SCHEMA)
+            logger.info(f"AppDef files: {appdef_files}")
+            validate_many(appdef_files, APPDEF_SCHEMA)
 
         if os.path.exists(regdef_dir):
             regdef_files = findAllYamlsInDir(regdef_dir)
@@ -637,7 +753,7 @@ def render_config_env(self, env_name: str, extra_env: dict):
                 "ND_CMDB_CONFIG_REF_NAME": all_vars.get("CI_COMMIT_REF_NAME", "No Ref Name"),
                 "ND_CMDB_CONFIG_TAG": all_vars.get("CI_COMMIT_TAG", "No Ref tag"),
                 "ND_CDMB_REPOSITORY_URL": all_vars.get("CI_REPOSITORY_URL", "No Ref URL"),
-            })
+            }, validate=False)
             env_template = self.ctx.env_template
             if env_template:
                 self.ctx.update({
@@ -668,5 +784,6 @@ def render_config_env(self, env_name: str, extra_env: dict):
             ensure_required_keys(self.ctx.as_dict(),
                                  required=["templates_dir", "env_instances_dir", "cluster_name", "current_env_dir"])
             logger.info(f"Rendering of templates for environment {env_name} generation was successful")
+            logger.debug(f"Jinja template cache usage: {self.templates.stats()}")
 
             self.validate_bgd()
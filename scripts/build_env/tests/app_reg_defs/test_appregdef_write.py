@@ -1,6 +1,6 @@
 import pytest
 
-from appregdef_render import write_app_reg_defs
+from appregdef_render import get_app_reg_defs_render_dir, write_app_reg_defs
 
 class TestWriteAppRegDefs:
 
@@ -62,3 +62,7 @@ def test_not_preserves_existing_files_on_env(self):
         assert stale.exists()
         assert not (stale / "old.yaml").exists()
         assert (stale / "file.yaml").exists()
+
+
+def test_render_dir_is_unique_per_cluster_and_environment():
+    assert get_app_reg_defs_render_dir("cluster-01", "env-01") != get_app_reg_defs_render_dir("cluster-02", "env-01")
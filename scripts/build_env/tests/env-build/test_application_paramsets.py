@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+import pytest
+from envgenehelper import deleteFileIfExists, openYaml, writeYamlToFile
+
+import build_env
+from build_env import convertParameterSetsToParameters, flushApplicationParameters
+from tests.base_test import BaseTest
+
+
+def create_paramset(path, name, app_params):
+    writeYamlToFile(path, {
+        "name": name,
+        "parameters": {f"{name}_param": "value"},
+        "applications": [{"appName": app, "parameters": params} for app, params in app_params.items()],
+    })
+    return {"filePath": str(path), "envSpecific": False}
+
+
+class TestApplicationParamsetsFlush(BaseTest):
+    @pytest.fixture(autouse=True)
+    def change_test_dir(self, monkeypatch):
+        monkeypatch.chdir(self.base_dir)
+
+    @pytest.fixture
+    def template(self, tmp_path):
+        paramset_map = {
+            "ps-1": [create_paramset(tmp_path / "ps-1.yml", "ps-1", {"app-a": {"a1": "x"}, "app-b": {"b1": "y"}})],
+            "ps-2": [create_paramset(tmp_path / "ps-2.yml", "ps-2", {"app-a": {"a2": "z"}})],
+            "ps-tech": [create_paramset(tmp_path / "ps-tech.yml", "ps-tech", {"app-a": {"t1": 1}})],
+        }
+        template_path = tmp_path / "env" / "cloud.yml"
+        writeYamlToFile(template_path, {
+            "deployParameters": {}, "deployParameterSets": ["ps-1", "ps-2"],
+            "technicalConfigurationParameters": {}, "technicalConfigurationParameterSets": ["ps-tech"],
+        })
+        return str(template_path), openYaml(template_path), paramset_map
+
+    def convert(self, template, app_definitions):
+        template_path, template_content, paramset_map = template
+        env_specific_params_map = {"deployParameters": {}, "technicalConfigurationParameters": {}, "applications": {}}
+        for paramsets_tag, parameters_tag in [("deployParameterSets", "deployParameters"),
+                                              ("technicalConfigurationParameterSets",
+                                               "technicalConfigurationParameters")]:
+            convertParameterSetsToParameters(template_path, template_content, paramsets_tag, parameters_tag,
+                                             paramset_map, env_specific_params_map, app_definitions=app_definitions)
+
+    def test_application_files_are_written_once_per_template(self, template):
+        app_definitions = {}
+        with patch.object(build_env, "writeBeautifiedYaml", wraps=build_env.writeBeautifiedYaml) as beautify:
+            self.convert(template, app_definitions)
+            assert beautify.call_count == 0
+            flushApplicationParameters(app_definitions)
+        assert beautify.call_count == 2
+        assert app_definitions == {}
+
+        app_a = openYaml(template[0].replace("cloud.yml", "Applications/app-a.yml"))
+        assert dict(app_a["deployParameters"]) == {"a1": "x", "a2": "z"}
+        assert dict(app_a["technicalConfigurationParameters"]) == {"t1": 1}
+
+    def test_batched_result_matches_per_paramset_writes(self, template):
+        self.convert(template, None)
+        app_file = template[0].replace("cloud.yml", "Applications/app-a.yml")
+        with open(app_file) as f:
+            expected = f.read()
+        for app in ("app-a", "app-b"):
+            deleteFileIfExists(template[0].replace("cloud.yml", f"Applications/{app}.yml"))
+
+        app_definitions = {}
+        self.convert(template, app_definitions)
+        flushApplicationParameters(app_definitions)
+        with open(app_file) as f:
+            assert f.read() == expected
@@ -0,0 +1,185 @@
+import os
+import time
+
+import pytest
+from envgenehelper import openYaml, writeYamlToFile
+
+import create_credentials
+from create_credentials import (CRED_TYPE_SECRET, CRED_TYPE_USERPASS, ENTITY_CLOUD_APPLICATION, ENTITY_NAMESPACE,
+                                CredentialRegistry, discoverEntityFiles, extractEntityCreds, getNamespaceCreds,
+                                mergeAndSaveYaml, mergeCreds)
+
+
+def cred_item(cred_id, comment, cred_type=CRED_TYPE_USERPASS):
+    return {"cred": {"credentialsId": cred_id, "type": cred_type}, "comment": comment}
+
+
+def synthetic_namespace(params_count, creds_count):
+    deploy_parameters = {}
+    for i in range(params_count):
+        cred_id = f"cred-{i % creds_count}"
+        if i % 5 == 0:
+            deploy_parameters[f"PARAM_{i}"] = f"${{creds.get('{cred_id}').secret}}"
+        else:
+            deploy_parameters[f"PARAM_{i}"] = f"${{creds.get('{cred_id}').username}}"
+    return {
+        "name": "ns",
+        "credentialsId": "ns-cred",
+        "deployParameters": deploy_parameters,
+        "e2eParameters": {},
+        "technicalConfigurationParameters": {},
+    }
+
+
+def collect_and_save(namespace_content, creds_path):
+    registry = CredentialRegistry()
+    mergeCreds(getNamespaceCreds(namespace_content, "tenant", "cloud", "ns"), registry)
+    mergeAndSaveYaml(str(creds_path), registry)
+    return registry
+
+
+def test_registry_keeps_first_definition_and_provenance():
+    registry = CredentialRegistry()
+    result = mergeCreds([cred_item("b", "tenant"), cred_item("a", "tenant"), cred_item("b", "cloud")], registry)
+    assert result["countAdded"] == 2
+    assert mergeCreds([cred_item("a", "namespace ns", CRED_TYPE_SECRET)], registry)["countAdded"] == 0
+
+    assert registry.ids() == ["b", "a"]
+    assert [item["cred"]["type"] for item in registry] == [CRED_TYPE_USERPASS, CRED_TYPE_USERPASS]
+    assert registry.provenance("a") == ["tenant", "namespace ns"]
+    assert registry.provenance("b") == ["tenant", "cloud"]
+    assert "a" in registry and "c" not in registry
+    assert len(registry) == 2
+
+
+def test_existing_credentials_are_kept(tmp_path):
+    creds_path = tmp_path / "Credentials" / "credentials.yml"
+    writeYamlToFile(creds_path, {"a": {"type": CRED_TYPE_SECRET, "data": {"secret": "filled"}}})
+    registry = CredentialRegistry()
+    registry.merge([cred_item("a", "tenant"), cred_item("b", "cloud", CRED_TYPE_SECRET)])
+
+    mergeAndSaveYaml(str(creds_path), registry)
+
+    creds = openYaml(creds_path)
+    assert list(creds) == ["a", "b"]
+    assert creds["a"]["data"]["secret"] == "filled"
+    assert creds["b"]["type"] == CRED_TYPE_SECRET
+
+
+@pytest.fixture
+def env_dir(tmp_path):
+    def app(name, cred_macro):
+        return {"name": name, "deployParameters": {"PARAM": cred_macro}, "technicalConfigurationParameters": {}}
+
+    writeYamlToFile(tmp_path / "Applications" / "cloud-app.yml", app("cloud-app", "${creds.get('shared').username}"))
+    for ns in ("ns-1", "ns-2", "ns"):
+        namespace = synthetic_namespace(3, 3)
+        namespace["name"] = f"{ns}-name"
+        namespace["credentialsId"] = f"{ns}-cred"
+        writeYamlToFile(tmp_path / "Namespaces" / ns / "namespace.yml", namespace)
+        writeYamlToFile(tmp_path / "Namespaces" / ns / "Applications" / "app.yml",
+                        app("app", "${creds.get('shared').secret}"))
+    writeYamlToFile(tmp_path / "Namespaces" / "ns" / "Applications" / "app-2.yaml", {
+        "name": "app-2", "deployParameters": {"#credsns{user,password}": "ns-app-cred"},
+        "technicalConfigurationParameters": {},
+    })
+    return tmp_path
+
+
+def entity_tasks(entity_files):
+    tasks = [(ENTITY_CLOUD_APPLICATION, p, [], "tenant", "cloud", False) for p in entity_files["cloudApplications"]]
+    tasks += [(ENTITY_NAMESPACE, p, entity_files["applicationsByNamespace"][p], "tenant", "cloud", False)
+              for p in entity_files["namespaces"]]
+    return tasks
+
+
+def test_entity_files_are_discovered_in_one_walk(env_dir):
+    entity_files = discoverEntityFiles(str(env_dir))
+
+    assert entity_files["cloudApplications"] == [str(env_dir / "Applications" / "cloud-app.yml")]
+    assert entity_files["namespaces"] == [str(env_dir / "Namespaces" / ns / "namespace.yml")
+                                          for ns in ("ns-1", "ns-2", "ns")]
+    ns_dir = env_dir / "Namespaces" / "ns"
+    assert entity_files["applicationsByNamespace"][str(ns_dir / "namespace.yml")] == [
+        str(ns_dir / "Applications" / "app-2.yaml"), str(ns_dir / "Applications" / "app.yml")]
+    assert len(entity_files["namespaceApplications"]) == 4
+
+
+def test_parallel_extraction_matches_sequential(env_dir, monkeypatch):
+    tasks = entity_tasks(discoverEntityFiles(str(env_dir)))
+    sequential = extractEntityCreds(tasks)
+    monkeypatch.setattr(create_credentials, "CREDS_EXTRACT_PARALLEL_THRESHOLD", 1)
+    parallel = extractEntityCreds(tasks)
+
+    assert parallel == sequential
+    assert [r["namespaceName"] for r in parallel] == ["", "ns-1-name", "ns-2-name", "ns-name"]
+    app_2 = str(env_dir / "Namespaces" / "ns" / "Applications" / "app-2.yaml")
+    assert parallel[3]["creds"][app_2][0]["cred"]["credentialsId"] == "tenant-cloud-ns-name-ns-app-cred"
+
+
+@pytest.mark.parametrize("threshold", [1, 100])
+def test_extraction_raises_from_first_error(env_dir, monkeypatch, threshold):
+    writeYamlToFile(env_dir / "Namespaces" / "ns-1" / "Applications" / "app.yml", {
+        "name": "app", "deployParameters": {"BROKEN": "${creds.get.username}"}, "technicalConfigurationParameters": {},
+    })
+    monkeypatch.setattr(create_credentials, "CREDS_EXTRACT_PARALLEL_THRESHOLD", threshold)
+
+    with pytest.raises(RuntimeError, match="Credentials extraction failed: .*/Namespaces/ns-1/") as e:
+        extractEntityCreds(entity_tasks(discoverEntityFiles(str(env_dir))))
+    assert isinstance(e.value.__cause__, ReferenceError)
+
+
+def test_synthetic_env_credentials(tmp_path):
+    registry = collect_and_save(synthetic_namespace(5000, 1000), tmp_path / "credentials.yml")
+
+    assert len(registry) == 1001
+    creds = openYaml(tmp_path / "credentials.yml")
+    assert len(creds) == 1001
+    assert creds["cred-0"]["type"] == CRED_TYPE_SECRET
+    assert creds["cred-1"]["type"] == CRED_TYPE_USERPASS
+    assert len(registry.provenance("cred-1")) == 5
+
+
+def test_credential_collection_work_grows_linearly(tmp_path, monkeypatch):
+    calls = {"add": 0, "write": 0}
+    original_add = CredentialRegistry.add
+    original_write = create_credentials.writeCredToYaml
+
+    def counting_add(self, credItem):
+        calls["add"] += 1
+        return original_add(self, credItem)
+
+    def counting_write(credItem, credsYaml):
+        calls["write"] += 1
+        return original_write(credItem, credsYaml)
+
+    monkeypatch.setattr(CredentialRegistry, "add", counting_add)
+    monkeypatch.setattr(create_credentials, "writeCredToYaml", counting_write)
+
+    def work(params_count, creds_count):
+        calls.update(add=0, write=0)
+        collect_and_save(synthetic_namespace(params_count, creds_count), tmp_path / f"credentials-{params_count}.yml")
+        return dict(calls)
+
+    # every cred reference is merged once and every unique cred is written once
+    assert work(1250, 250) == {"add": 1251, "write": 251}
+    assert work(5000, 1000) == {"add": 5001, "write": 1001}
+
+
+@pytest.mark.skipif(not os.getenv("ENVGENE_BENCHMARKS"), reason="benchmarks run only when ENVGENE_BENCHMARKS is set")
+def test_credential_collection_time_grows_linearly(tmp_path):
+    scale = 4
+
+    def best_time(params_count, creds_count):
+        timings = []
+        for attempt in range(3):
+            namespace = synthetic_namespace(params_count, creds_count)
+            start = time.perf_counter()
+            collect_and_save(namespace, tmp_path / f"credentials-{params_count}-{attempt}.yml")
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    small = best_time(5000 // scale, 1000 // scale)
+    large = best_time(5000, 1000)
+    # linear growth gives ratio close to scale, quadratic one close to scale^2
+    assert large / small < scale * 2
@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+import pytest
+from envgenehelper import writeYamlToFile
+
+import build_env
+from build_env import get_paramset_template_context, reset_env_definition_cache
+
+
+@pytest.fixture
+def env_dir(tmp_path):
+    env_dir = tmp_path / "environments" / "cluster-01" / "env-01"
+    writeYamlToFile(env_dir / "Inventory" / "env_definition.yml", {
+        "inventory": {"cloudName": "cloud-01"},
+        "envTemplate": {"additionalTemplateVariables": {"cloud_api_port": "6443"}},
+    })
+    reset_env_definition_cache()
+    yield env_dir
+    reset_env_definition_cache()
+
+
+class TestParamsetTemplateContextCache:
+
+    def test_env_definition_is_parsed_once(self, env_dir):
+        with patch.object(build_env, "openYaml", wraps=build_env.openYaml) as open_yaml:
+            cloud_context = get_paramset_template_context(str(env_dir / "cloud.yml"))
+            get_paramset_template_context(str(env_dir / "cloud.yml"))
+            ns_context = get_paramset_template_context(str(env_dir / "Namespaces" / "core" / "namespace.yml"))
+        assert open_yaml.call_count == 1
+        assert cloud_context["env_definition"] is ns_context["env_definition"]
+
+    def test_context_is_derived_from_folder_structure(self, env_dir):
+        context = get_paramset_template_context(str(env_dir / "cloud.yml"))
+        current_env = context["current_env"]
+        assert current_env["name"] == "env-01"
+        assert current_env["cloudNameWithCluster"] == "cloud-01-cluster-01"
+        assert current_env["cluster"]["cloud_api_port"] == "6443"
+
+    def test_failure_is_cached(self, tmp_path):
+        reset_env_definition_cache()
+        template_path = str(tmp_path / "no_env_structure" / "cloud.yml")
+        with patch.object(build_env, "findEnvDefinitionFromTemplatePath",
+                          wraps=build_env.findEnvDefinitionFromTemplatePath) as find_env_definition:
+            for _ in range(2):
+                with pytest.raises(ReferenceError):
+                    get_paramset_template_context(template_path)
+        assert find_env_definition.call_count == 1
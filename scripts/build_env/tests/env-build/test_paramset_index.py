@@ -0,0 +1,58 @@
+from envgenehelper.business_helper import NamespaceRole
+
+from build_env import create_paramset_index, create_paramset_map
+
+
+def create_parameters_dir(tmp_path):
+    files = [
+        "from_template/common.yml",
+        "from_template/app.yaml.j2",
+        "from_origin_template/common.yml",
+        "from_peer_template/common.json",
+        "from_instance/common.yaml",
+        "cluster.yml",
+        "README.md",
+    ]
+    for f in files:
+        path = tmp_path / f
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("name: test\n")
+    return str(tmp_path)
+
+
+class TestParamsetIndex:
+
+    def test_index_contains_all_paramset_files_with_tags(self, tmp_path):
+        index = create_paramset_index(create_parameters_dir(tmp_path))
+        assert set(index) == {"common", "app.yaml", "cluster"}
+        assert sorted(e["source"] for e in index["common"]) == [
+            "from_instance", "from_origin_template", "from_peer_template", "from_template"]
+        assert all(e["size"] > 0 and e["mtime"] > 0 for entries in index.values() for e in entries)
+
+    def test_role_views_exclude_other_template_dirs(self, tmp_path):
+        parameters_dir = create_parameters_dir(tmp_path)
+        index = create_paramset_index(parameters_dir)
+
+        origin_map = create_paramset_map(parameters_dir, NamespaceRole.ORIGIN, True, True, index)
+        common_map = create_paramset_map(parameters_dir, NamespaceRole.COMMON, True, True, index)
+        origin_paths = [e["filePath"] for e in origin_map["common"]]
+        common_paths = [e["filePath"] for e in common_map["common"]]
+        assert not any("from_template" in p or "from_peer_template" in p for p in origin_paths)
+        assert not any("from_origin_template" in p or "from_peer_template" in p for p in common_paths)
+        assert len(origin_paths) == 2 and len(common_paths) == 2
+
+    def test_role_views_do_not_share_entries(self, tmp_path):
+        parameters_dir = create_parameters_dir(tmp_path)
+        index = create_paramset_index(parameters_dir)
+        origin_map = create_paramset_map(parameters_dir, NamespaceRole.ORIGIN, False, False, index)
+        common_map = create_paramset_map(parameters_dir, NamespaceRole.COMMON, False, False, index)
+
+        for entry in origin_map["cluster"]:
+            entry["envSpecific"] = True
+        assert all(not e["envSpecific"] for e in common_map["cluster"])
+
+    def test_map_without_index_matches_map_from_index(self, tmp_path):
+        parameters_dir = create_parameters_dir(tmp_path)
+        index = create_paramset_index(parameters_dir)
+        assert (create_paramset_map(parameters_dir, NamespaceRole.PEER, False, True) ==
+                create_paramset_map(parameters_dir, NamespaceRole.PEER, False, True, index))
@@ -1,10 +1,13 @@
+import shutil
 from os import environ
+from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 from envgenehelper import *
 from envgenehelper.business_helper import NamespaceRole
 
-from main import render_environment
+from main import render_environment, render_environments
 from envgenehelper.test_helpers import TestHelpers
 
 from tests.base_test import BaseTest
@@ -50,3 +53,73 @@ def test_render_envs(self, cluster_name, env_name, version, extra_templates):
         logger.info(dump_as_yaml_format(files_to_compare))
         TestHelpers.assert_dirs_content(source_dir, generated_dir, True, False)
 
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_render_several_envs_in_one_process(self, max_workers):
+        g_templates_dirs = {
+            NamespaceRole.COMMON: str((self.test_data_dir / "test_templates").resolve())
+        }
+        g_inventory_dir = str((self.test_data_dir / "test_environments").resolve())
+        g_output_dir = str((self.base_dir / "/tmp/test_environments_multi").resolve())
+        env_names = ["cluster-01/env-02", "cluster-01/env-04", "cluster01/env01"]
+
+        os.environ['CI_COMMIT_REF_NAME'] = "branch_name"
+        environ['FULL_ENV_NAME'] = "cluster-01/env-01"
+
+        results = render_environments(env_names, g_templates_dirs, g_inventory_dir, g_output_dir, self.test_data_dir,
+                                      max_workers=max_workers)
+
+        assert [result.full_env_name for result in results] == env_names
+        assert environ['FULL_ENV_NAME'] == "cluster-01/env-01"
+        for env_name in env_names:
+            TestHelpers.assert_dirs_content(f"{g_inventory_dir}/{env_name}", f"{g_output_dir}/{env_name}", True, False)
+
+    def test_failed_env_does_not_stop_others(self):
+        g_templates_dirs = {
+            NamespaceRole.COMMON: str((self.test_data_dir / "test_templates").resolve())
+        }
+        g_inventory_dir = str((self.test_data_dir / "test_environments").resolve())
+        g_output_dir = str((self.base_dir / "/tmp/test_environments_multi").resolve())
+
+        os.environ['CI_COMMIT_REF_NAME'] = "branch_name"
+
+        with pytest.raises(ReferenceError, match="cluster-01/missing-env"):
+            render_environments(["cluster-01/missing-env", "cluster-01/env-04"], g_templates_dirs, g_inventory_dir,
+                                g_output_dir, self.test_data_dir)
+        TestHelpers.assert_dirs_content(f"{g_inventory_dir}/cluster-01/env-04", f"{g_output_dir}/cluster-01/env-04",
+                                        True, False)
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_duplicated_env_names_are_rejected(self, max_workers):
+        with patch("main._render_environment_task") as render_task:
+            with pytest.raises(ValueError, match="listed more than once: cluster-01/env-04"):
+                render_environments(["cluster-01/env-04", "cluster-01/env-02", "cluster-01/env-04"], {}, "", "",
+                                    self.test_data_dir, max_workers=max_workers)
+        render_task.assert_not_called()
+
+    def test_ns_build_filter_renders_only_selected_namespaces(self, tmp_path, monkeypatch):
+        g_templates_dirs = {
+            NamespaceRole.COMMON: str((self.test_data_dir / "test_templates").resolve())
+        }
+        g_inventory_dir = str((self.test_data_dir / "test_environments").resolve())
+        expected_dir = Path(g_inventory_dir) / "bgd-cluster" / "bgd-env"
+        # output dir is the environments dir of the instance repository, as in the pipeline
+        env_dir = tmp_path / "environments" / "bgd-cluster" / "bgd-env"
+        shutil.copytree(expected_dir / "Namespaces", env_dir / "Namespaces")
+        marker = "# built before\n"
+        for namespace_file in env_dir.glob("Namespaces/*/namespace.yml"):
+            namespace_file.write_text(marker + namespace_file.read_text())
+
+        monkeypatch.setenv("CI_PROJECT_DIR", str(tmp_path))
+        monkeypatch.setenv("FULL_ENV_NAME", "bgd-cluster/bgd-env")
+        monkeypatch.setenv("NS_BUILD_FILTER", "@peer")
+        os.environ['CI_COMMIT_REF_NAME'] = "branch_name"
+
+        render_environment("bgd-env", "bgd-cluster", g_templates_dirs, g_inventory_dir, str(tmp_path / "environments"),
+                           self.test_data_dir, str(tmp_path / "tmp"))
+
+        TestHelpers.assert_dirs_content(str(expected_dir / "Namespaces" / "app-peer"),
+                                        str(env_dir / "Namespaces" / "app-peer"), True, False)
+        kept = sorted(path.parent.name for path in env_dir.glob("Namespaces/*/namespace.yml")
+                      if path.read_text().startswith(marker))
+        assert kept == ["app-origin", "bg-controller", "bg-plugin", "other-app"]
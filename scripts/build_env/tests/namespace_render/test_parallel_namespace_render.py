@@ -0,0 +1,59 @@
+import pytest
+from envgenehelper import openYaml, writeYamlToFile
+from envgenehelper.business_helper import NamespaceRole
+
+import render_config_env
+from render_config_env import EnvGenerator
+
+NAMESPACES = ["ns-a", "ns-b", "ns-c", "ns-d", "ns-e"]
+
+
+def prepare_generator(tmp_path, namespaces):
+    templates_dir = tmp_path / "templates"
+    env_dir = tmp_path / "render" / "env-01"
+    for ns in NAMESPACES:
+        template = templates_dir / "namespaces" / f"{ns}.yml.j2"
+        template.parent.mkdir(parents=True, exist_ok=True)
+        template.write_text(f'name: "{{{{ tenant }}}}-{ns}"\n')
+    writeYamlToFile(env_dir / "bg_domain.yml", {
+        "name": "bgd",
+        "originNamespace": {"name": "tenant-01-ns-b"},
+        "peerNamespace": {"name": "tenant-01-ns-c"},
+    })
+
+    generator = EnvGenerator()
+    generator.ctx.update({
+        "tenant": "tenant-01",
+        "current_env_dir": str(env_dir),
+        "templates_dirs": {NamespaceRole.COMMON: str(templates_dir)},
+        "templates_dir": str(templates_dir),
+        "current_env_template": {
+            "namespaces": [{"template_path": "{{ templates_dir }}/namespaces/%s.yml.j2" % ns} for ns in namespaces]
+        },
+    })
+    return generator, env_dir
+
+
+def test_parallel_render_matches_template_descriptor(tmp_path):
+    generator, env_dir = prepare_generator(tmp_path, NAMESPACES)
+    generator.generate_namespace_files()
+
+    expected_postfixes = {"ns-a", "ns-b-origin", "ns-c-peer", "ns-d", "ns-e"}
+    assert {p.name for p in (env_dir / "Namespaces").iterdir()} == expected_postfixes
+    assert openYaml(env_dir / "Namespaces" / "ns-b-origin" / "namespace.yml")["name"] == "tenant-01-ns-b"
+
+
+@pytest.mark.parametrize("threshold", [4, 100])
+def test_render_aggregates_errors(tmp_path, monkeypatch, threshold):
+    monkeypatch.setattr(render_config_env, "NS_RENDER_PARALLEL_THRESHOLD", threshold)
+    generator, env_dir = prepare_generator(tmp_path, NAMESPACES)
+    namespaces = generator.ctx.current_env_template["namespaces"]
+    namespaces[1]["template_path"] = "{{ templates_dir }}/namespaces/missing-1.yml.j2"
+    namespaces[3]["template_path"] = "{{ templates_dir }}/namespaces/missing-2.yml.j2"
+    generator.ctx.invalidate()
+
+    with pytest.raises(RuntimeError) as e:
+        generator.generate_namespace_files()
+    message = str(e.value)
+    assert message.index("missing-1.yml.j2") < message.index("missing-2.yml.j2")
+    assert (env_dir / "Namespaces" / "ns-a" / "namespace.yml").exists()
@@ -0,0 +1,47 @@
+from render_config_env import Context
+
+
+def test_snapshot_is_reused_until_context_changes():
+    ctx = Context(env="env-01")
+    ctx.as_dict()
+    snapshot = ctx._snapshot
+
+    ctx.as_dict()
+    assert ctx._snapshot is snapshot
+
+    ctx.update({"env": "env-02"})
+    assert ctx.as_dict()["env"] == "env-02"
+    assert ctx._snapshot is not snapshot
+
+
+def test_assignment_of_same_value_keeps_snapshot():
+    ctx = Context(env="env-01", tenant="tenant-01")
+    ctx.as_dict()
+    version = ctx._version
+
+    ctx.env = "env-01"
+    ctx.update({"tenant": "tenant-01"})
+    assert ctx._version == version
+
+
+def test_as_dict_returns_independent_top_level_dict():
+    ctx = Context(env="env-01")
+    ctx.as_dict()["templates_dir"] = "/templates"
+    assert "templates_dir" not in ctx.as_dict()
+
+
+def test_update_without_validation_sets_fields_and_extras():
+    ctx = Context()
+    ctx.update({"env": "env-01", "app_lookup_key": "group:artifact"}, validate=False)
+    context_dict = ctx.as_dict()
+    assert ctx.env == "env-01"
+    assert context_dict["env"] == "env-01"
+    assert context_dict["app_lookup_key"] == "group:artifact"
+
+
+def test_invalidate_after_in_place_modification():
+    ctx = Context()
+    ctx.as_dict()
+    ctx.env_vars.update({"CI_COMMIT_REF_NAME": "branch"})
+    ctx.invalidate()
+    assert ctx.as_dict()["env_vars"]["CI_COMMIT_REF_NAME"] == "branch"
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
-from unittest.mock import patch
+import asyncio
+from unittest.mock import MagicMock, patch
 
 import pytest
 from envgenehelper.env_helper import Environment
@@ -12,6 +13,7 @@
 os.environ['CLUSTER_NAME'] = "temporary"
 os.environ['CI_PROJECT_DIR'] = "temporary"
 
+import process_sd
 from process_sd import handle_sd
 from envgenehelper import SD_FILE_NAME, logger, openJson
 
@@ -51,7 +53,7 @@ def setup_method(self):
         os.environ["CLUSTER_NAME"] = self.cluster
 
     @pytest.mark.parametrize("test_case_name", TEST_CASES_POSITIVE)
-    @patch("process_sd.download_sd_by_appver")
+    @patch("process_sd.download_sds")
     def test_sd_positive(self, mock_download_sd, test_case_name):
         env = Environment(self.output_dir, self.cluster, self.env_name)
         do_prerequisites(SD_FILE_NAME, self.test_data_dir, self.output_dir, test_case_name, env, test_suits_map)
@@ -62,7 +64,7 @@ def test_sd_positive(self, mock_download_sd, test_case_name):
 
         file_path = Path(self.test_data_dir, test_case_name, "mock_sd.json")
         sd_data = openJson(file_path)
-        mock_download_sd.return_value = sd_data
+        mock_download_sd.side_effect = lambda appvers, plugins: [sd_data for _ in appvers]
 
         handle_sd(env, sd_source_type, sd_version, sd_data, sd_delta, sd_merge_mode)
 
@@ -70,7 +72,7 @@ def test_sd_positive(self, mock_download_sd, test_case_name):
         logger.info(f"=====SUCCESS - {test_case_name}======")
 
     @pytest.mark.parametrize("test_case_name,expected_exception", [(k, v) for k, v in TEST_CASES_NEGATIVE.items()])
-    @patch("process_sd.download_sd_by_appver")
+    @patch("process_sd.download_sds")
     def test_sd_negative(self, mock_download_sd, test_case_name, expected_exception):
 
         env = Environment(str(Path(self.output_dir, test_case_name)), self.cluster, self.env_name)
@@ -82,9 +84,48 @@ def test_sd_negative(self, mock_download_sd, test_case_name, expected_exception)
 
         file_path = Path(self.test_data_dir, test_case_name, "mock_sd.json")
         sd_data = openJson(file_path)
-        mock_download_sd.return_value = sd_data
+        mock_download_sd.side_effect = lambda appvers, plugins: [sd_data for _ in appvers]
 
         with pytest.raises(expected_exception):
             handle_sd(env, sd_source_type, sd_version, sd_data, sd_delta, sd_merge_mode)
 
         logger.info(f"=====SUCCESS - {test_case_name}======")
+
+
+class TestDownloadSds:
+    def test_sds_are_downloaded_concurrently_in_input_order(self):
+        appvers = [("sd-a", "1.0"), ("sd-b", "2.0"), ("sd-a", "1.0")]
+        started = []
+        started_while_first_downloads = []
+
+        async def download_sd(app_def, version, auth_headers):
+            started.append(app_def.name)
+            if len(started) == 1:
+                # the first SD is the slowest, results must keep input order anyway
+                await asyncio.sleep(0.05)
+                started_while_first_downloads.extend(started)
+            return {"name": app_def.name, "version": version, "auth": auth_headers}
+
+        def get_appdef(appver, app_name, plugins):
+            app_def = MagicMock()
+            app_def.name = app_name
+            app_def.registry.name = "registry"
+            app_def.registry.resolve_auth.return_value = {"Authorization": "Basic token"}
+            return app_def
+
+        with patch.object(process_sd.helper, "get_cred_config", return_value={}) as get_cred_config, \
+                patch.object(process_sd, "get_appdef_for_app", side_effect=get_appdef) as get_appdef_for_app, \
+                patch.object(process_sd, "download_sd_async", side_effect=download_sd):
+            result = process_sd.download_sds(appvers, plugins=None)
+
+        assert [(sd["name"], sd["version"]) for sd in result] == appvers
+        assert all(sd["auth"] == {"Authorization": "Basic token"} for sd in result)
+        assert started_while_first_downloads == ["sd-a", "sd-b", "sd-a"]
+        assert get_cred_config.call_count == 1
+        assert get_appdef_for_app.call_count == 2
+
+    def test_snapshot_versions_are_rejected_before_download(self):
+        with patch.object(process_sd.helper, "get_cred_config") as get_cred_config:
+            with pytest.raises(ValueError, match="SNAPSHOT"):
+                process_sd.download_sds([("sd-a", "1.0"), ("sd-b", "2.0-SNAPSHOT")], plugins=None)
+        get_cred_config.assert_not_called()
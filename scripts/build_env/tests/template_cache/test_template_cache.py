@@ -0,0 +1,45 @@
+from jinja.template_cache import TemplateCache
+
+
+def test_same_content_is_compiled_once(tmp_path):
+    first = tmp_path / "first.yml.j2"
+    second = tmp_path / "second.yml.j2"
+    first.write_text("name: {{ env }}\n")
+    second.write_text("name: {{ env }}\n")
+
+    templates = TemplateCache()
+    assert templates.from_file(first) is templates.from_file(second)
+    assert templates.from_file(first).render({"env": "env-01"}) == "name: env-01"
+    assert templates.misses == 1
+    assert templates.hits == 2
+
+
+def test_ansible_stuff_is_replaced_before_compilation():
+    templates = TemplateCache()
+    rendered = templates.from_string("---\nname: {{ _tenant }}").render({"tenant": "tenant-01"})
+    assert rendered == "name: tenant-01"
+
+
+def test_preprocessing_is_part_of_cache_key():
+    templates = TemplateCache()
+    raw = templates.from_string("name: {{ _tenant }}", preprocess=False)
+    processed = templates.from_string("name: {{ _tenant }}")
+    assert raw is not processed
+    assert raw.render({"_tenant": "raw", "tenant": "processed"}) == "name: raw"
+    assert processed.render({"_tenant": "raw", "tenant": "processed"}) == "name: processed"
+
+
+def test_render_expression_uses_default_undefined():
+    templates = TemplateCache()
+    context = {"templates_dir": "/templates"}
+    assert templates.render_expression("{{ templates_dir }}/ns.yml.j2", context) == "/templates/ns.yml.j2"
+    assert templates.render_expression("{{ missing }}/ns.yml.j2", context) == "/ns.yml.j2"
+
+
+def test_bytecode_cache_is_shared_between_sessions(tmp_path):
+    cache_dir = tmp_path / "jinja_cache"
+    TemplateCache(str(cache_dir)).from_string("name: {{ env }}")
+    assert any(cache_dir.iterdir())
+
+    rendered = TemplateCache(str(cache_dir)).from_string("name: {{ env }}").render({"env": "env-02"})
+    assert rendered == "name: env-02"